@@ -0,0 +1,90 @@
+"""Measure backplane delivery latency and throughput between two workers, in-process vs. over the Redis protocol.
+
+Over redis:// two Backplane instances stand in for two hypercorn workers:
+one publishes to a user channel, the other holds the subscription. It goes
+through the local stand-in server unless --url points at a real Redis. The
+memory:// run is one worker publishing to itself, the single-process baseline.
+
+    python -m benchmarks.backplane --messages 20000
+    python -m benchmarks.backplane --url redis://127.0.0.1:6379/0
+"""
+import argparse
+import asyncio
+import time
+
+from quart import Quart
+
+from src.extensions.backplane import Backplane
+from src.extensions.fake_redis import FakeRedisServer
+
+
+async def start_worker(name, url):
+    app = Quart(name)
+    app.config["BACKPLANE_URL"] = url
+    backplane = Backplane()
+    backplane.init_app(app)
+    await backplane.backend.start(backplane._dispatch)
+    return backplane
+
+
+async def measure(label, url, messages):
+    sender = await start_worker("sender", url)
+    # memory:// only reaches its own process
+    receiver = sender if url.startswith("memory:") else await start_worker("receiver", url)
+    latencies = []
+    done = asyncio.Event()
+
+    def on_message(message):
+        latencies.append(time.perf_counter() - message["sent"])
+        if len(latencies) == messages:
+            done.set()
+
+    receiver.subscribe("user:1", on_message)
+    # Wait until the subscription is live: the first message that arrives proves it
+    while not latencies:
+        sender.notify_user(1, {"sent": time.perf_counter()})
+        await asyncio.sleep(0.05)
+    latencies.clear()
+
+    start = time.perf_counter()
+    for i in range(messages):
+        sender.notify_user(1, {"sent": time.perf_counter(), "seq": i})
+        if i % 100 == 99:
+            await asyncio.sleep(0)
+    await asyncio.wait_for(done.wait(), timeout=60)
+    elapsed = time.perf_counter() - start
+
+    hits = 1000
+    hit_start = time.perf_counter()
+    await asyncio.gather(*(sender.hit("chat:1", 60) for _ in range(hits)))
+    hit_elapsed = time.perf_counter() - hit_start
+
+    latencies.sort()
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    print(f"{label:<10} {messages / elapsed:9.0f} msg/s   p50={p50 * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms"
+          f"   rate-limit hits {hits / hit_elapsed:8.0f}/s")
+    for backplane in {sender, receiver}:
+        await backplane.backend.stop()
+
+
+async def run(messages, url):
+    await measure("memory", "memory://", messages)
+    server = None
+    if url is None:
+        server = FakeRedisServer()
+        url = f"redis://127.0.0.1:{await server.start()}/0"
+    await measure("redis", url, messages)
+    if server is not None:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--url", help="redis:// URL of a real server (default: a local stand-in)")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.url))
+
+
+if __name__ == "__main__":
+    main()
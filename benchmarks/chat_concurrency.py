@@ -0,0 +1,43 @@
+"""Measure AIClient throughput with many concurrent chats against the fake upstream.
+
+    OPENAI_FAKE_LATENCY=0.5 python -m benchmarks.chat_concurrency --chats 200
+"""
+import argparse
+import asyncio
+import time
+
+from quart import Quart
+from config import Config
+from src.extensions.ai_client import AIClient
+
+
+async def run(chats, concurrency, latency):
+    app = Quart(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        OPENAI_FAKE_UPSTREAM=True,
+        OPENAI_FAKE_LATENCY=latency,
+        OPENAI_MAX_CONCURRENCY=concurrency,
+    )
+    client = AIClient()
+    client.init_app(app)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client.get_response(f"message {i}") for i in range(chats)))
+    elapsed = time.perf_counter() - start
+
+    print(f"chats={chats} concurrency={concurrency} upstream_latency={latency:.3f}s")
+    print(f"elapsed={elapsed:.3f}s throughput={chats / elapsed:.1f} chats/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=Config.OPENAI_MAX_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=Config.OPENAI_FAKE_LATENCY)
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.concurrency, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare time-to-first-token with total latency for streamed chats against the fake upstream.
+
+    python -m benchmarks.chat_streaming --chats 100 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from quart import Quart
+from config import Config
+from src.extensions.ai_client import AIClient
+
+
+async def run(chats, latency):
+    app = Quart(__name__)
+    app.config.from_object(Config)
+    app.config.update(OPENAI_FAKE_UPSTREAM=True, OPENAI_FAKE_LATENCY=latency)
+    client = AIClient()
+    client.init_app(app)
+
+    async def buffered(i):
+        start = time.perf_counter()
+        await client.get_response(f"what is on my schedule for day {i} of the month")
+        return time.perf_counter() - start
+
+    async def streamed(i):
+        async for _ in client.stream_response(f"what is on my schedule for day {i} of the month"):
+            pass
+
+    buffered_times = await asyncio.gather(*(buffered(i) for i in range(chats)))
+    await asyncio.gather(*(streamed(i) for i in range(chats)))
+
+    stats = client.stream_stats()
+    print(f"chats={chats} upstream_latency={latency:.3f}s")
+    print(f"buffered: first byte p50={sorted(buffered_times)[len(buffered_times) // 2]:.3f}s")
+    print(f"streamed: first token p50={stats['first_token']['p50']:.3f}s p95={stats['first_token']['p95']:.3f}s")
+    print(f"streamed: total       p50={stats['total']['p50']:.3f}s p95={stats['total']['p95']:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=Config.OPENAI_FAKE_LATENCY)
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare per-row commits with write-behind batched inserts for Chat rows on a local SQLite file.
+
+    python -m benchmarks.chat_writes --chats 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+
+from quart import Quart
+
+from src.extensions.db import db
+from src.modules.chats.models import Chat
+from src.modules.chats.writer import ChatWriter
+from src.modules.users.models import User
+
+
+def new_chat(i):
+    created_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+    return Chat(user_id=1, message=f"message {i}", response="ok", created_at=created_at)
+
+
+async def run_concurrently(chats, concurrency, fn):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            await fn(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(chats)))
+    return time.perf_counter() - start
+
+
+async def run(chats, concurrency, batch_size):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = Quart(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+        CHAT_WRITE_BEHIND=True,
+        CHAT_WRITE_BATCH_SIZE=batch_size,
+        CHAT_WRITE_QUEUE_SIZE=chats,
+    )
+    db.init_app(app)
+    await db.create_all()
+    async with db.session() as session:
+        session.add(User(username="bench", password="bench", email="bench@example.com"))
+        await session.commit()
+
+    async def per_row(i):
+        async with db.session() as session:
+            session.add(new_chat(i))
+            await session.commit()
+
+    elapsed = await run_concurrently(chats, concurrency, per_row)
+    print(f"per-row commit: {chats / elapsed:9.1f} rows/s")
+
+    writer = ChatWriter()
+    writer.init_app(app, Chat)
+    writer.start()
+
+    async def write_behind(i):
+        await writer.submit(new_chat(i))
+
+    elapsed = await run_concurrently(chats, concurrency, write_behind)
+    await writer.stop()
+    print(f"write-behind:   {chats / elapsed:9.1f} rows/s ({writer.stats()})")
+    await db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.concurrency, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare blocking (sync session on the event loop) and async engine access against a local SQLite file.
+
+Reports chat inserts/s, history reads/s and the worst event-loop stall seen
+while the work runs.
+
+    python -m benchmarks.db_sqlite --chats 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from quart import Quart
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.extensions.db import db
+from src.modules.chats.models import Chat
+from src.modules.users.models import User
+
+
+async def watch_loop_lag(stop, interval=0.005):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def measure(label, chats, concurrency, insert, read):
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop_lag(stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(fn, i):
+        async with semaphore:
+            await fn(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(insert, i) for i in range(chats)))
+    inserted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(read, i) for i in range(chats)))
+    read_time = time.perf_counter() - start
+
+    stop.set()
+    lag = await watcher
+    print(f"{label:>8}: inserts={chats / inserted:8.1f}/s reads={chats / read_time:8.1f}/s worst_loop_stall={lag * 1000:7.1f}ms")
+
+
+async def run(chats, concurrency):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = Quart(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}")
+    db.init_app(app)
+    await db.create_all()
+    async with db.session() as session:
+        session.add(User(username="bench", password="bench", email="bench@example.com"))
+        await session.commit()
+
+    sync_engine = create_engine(f"sqlite:///{path}")
+
+    async def sync_insert(i):
+        with Session(sync_engine) as session:
+            session.add(Chat(user_id=1, message=f"sync {i}", response="ok"))
+            session.commit()
+
+    async def sync_read(i):
+        with Session(sync_engine) as session:
+            session.scalars(db.select(Chat).filter_by(user_id=1).order_by(Chat.created_at.desc()).limit(20)).all()
+
+    async def async_insert(i):
+        async with db.session() as session:
+            session.add(Chat(user_id=1, message=f"async {i}", response="ok"))
+            await session.commit()
+
+    async def async_read(i):
+        async with db.session() as session:
+            (await session.scalars(db.select(Chat).filter_by(user_id=1).order_by(Chat.created_at.desc()).limit(20))).all()
+
+    await measure("blocking", chats, concurrency, sync_insert, sync_read)
+    await measure("async", chats, concurrency, async_insert, async_read)
+    sync_engine.dispose()
+    await db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Drive the HTTP and websocket endpoints of create_app() and report latency, throughput and memory.
+
+The app runs in-process against a fresh SQLite file and the fake OpenAI
+upstream, so results are reproducible without network access or MySQL.
+
+    python -m benchmarks.endpoints --requests 500 --concurrency 50
+    python -m benchmarks.endpoints --scenarios chat,ws_chat --latency 0.2 --json
+
+Scenarios run in the order given (history reads the chats written before it):
+users, users_list, chat, history, ws_chat, ws_audio.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import resource
+import tempfile
+import time
+
+SCENARIOS = ("users", "users_list", "chat", "history", "ws_chat", "ws_audio")
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def sine_pcm(seconds, sample_rate, frequency=220.0, amplitude=8000):
+    import numpy as np
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * math.pi * frequency * t)).astype("<i2").tobytes()
+
+
+async def run_scenario(name, requests, concurrency, warmup, fn):
+    """Call fn(i, worker_id) for i in range(requests), at most `concurrency` at a time; fn returns its latency.
+
+    The first `warmup` calls per worker (worker pool start-up, connection set-up) are not measured.
+    """
+    await asyncio.gather(*(fn(requests + w * warmup + k, w) for w in range(concurrency) for k in range(warmup)))
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+    rss_before = rss_bytes()
+
+    async def worker(worker_id):
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            try:
+                latency = await fn(i, worker_id)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "rss_delta_mb": (rss_bytes() - rss_before) / 2 ** 20,
+        "peak_rss_mb": peak_rss_bytes() / 2 ** 20,
+    }
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    response = await coro
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    await response.get_data()
+    return elapsed
+
+
+class Connections:
+    """One websocket per concurrent worker, opened on first use and kept for the whole scenario."""
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.contexts = {}
+        self.sockets = {}
+
+    async def get(self, worker_id):
+        if worker_id not in self.sockets:
+            context = self.client.websocket(self.path)
+            self.contexts[worker_id] = context
+            self.sockets[worker_id] = await context.__aenter__()
+        return self.sockets[worker_id]
+
+    async def close(self):
+        for context in self.contexts.values():
+            await context.__aexit__(None, None, None)
+
+
+async def receive_until(ws, accept):
+    while True:
+        message = await ws.receive_json()
+        if accept(message):
+            return message
+
+
+async def run(args):
+    from src.main import create_app
+    from src.extensions.db import db
+
+    app = create_app()
+    await db.create_all()
+    sample_rate = app.config["AUDIO_SAMPLE_RATE"]
+    utterance = sine_pcm(args.utterance_seconds, sample_rate)
+    frame_bytes = int(sample_rate * 0.02) * 2
+    results = []
+
+    async with app.test_app() as test_app:
+        client = test_app.test_client()
+        response = await client.post("/api/users/", json={"username": "bench", "email": "bench@example.com", "password": "bench"})
+        user_id = (await response.get_json())["id"]
+
+        async def create_user(i, worker_id):
+            return await timed(client.post("/api/users/", json={
+                "username": f"user{i}", "email": f"user{i}@example.com", "password": "secret"}))
+
+        async def list_users(i, worker_id):
+            return await timed(client.get("/api/users/"))
+
+        async def create_chat(i, worker_id):
+            return await timed(client.post("/api/chat/", json={"user_id": user_id, "message": f"benchmark message {i}"}))
+
+        async def read_history(i, worker_id):
+            return await timed(client.get(f"/api/chat/{user_id}/history?amount=20"))
+
+        chat_sockets = Connections(client, "/ws/chat")
+
+        async def ws_chat(i, worker_id):
+            ws = await chat_sockets.get(worker_id)
+            start = time.perf_counter()
+            await ws.send_json({"type": "chat", "request_id": str(i), "user_id": user_id, "message": f"websocket message {i}"})
+            message = await receive_until(ws, lambda m: m.get("request_id") == str(i) and m["type"] in ("done", "error"))
+            if message["type"] == "error":
+                raise RuntimeError(message["error"])
+            return time.perf_counter() - start
+
+        audio_sockets = Connections(client, "/ws/audio")
+
+        async def ws_audio(i, worker_id):
+            # Latency is from the end of the utterance to its transcript
+            ws = await audio_sockets.get(worker_id)
+            for offset in range(0, len(utterance), frame_bytes):
+                await ws.send(utterance[offset:offset + frame_bytes])
+            start = time.perf_counter()
+            await ws.send(json.dumps({"type": "end"}))
+            await receive_until(ws, lambda m: m["type"] == "transcript")
+            return time.perf_counter() - start
+
+        scenarios = {
+            "users": create_user,
+            "users_list": list_users,
+            "chat": create_chat,
+            "history": read_history,
+            "ws_chat": ws_chat,
+            "ws_audio": ws_audio,
+        }
+        for name in args.scenarios:
+            results.append(await run_scenario(name, args.requests, args.concurrency, args.warmup, scenarios[name]))
+        await chat_sockets.close()
+        await audio_sockets.close()
+
+    return results
+
+
+def report(results, as_json):
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'scenario':<11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7} {'rss +MB':>8} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['scenario']:<11} {r['throughput_rps']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} "
+              f"{r['max_ms']:9.2f} {r['errors']:7d} {r['rss_delta_mb']:8.1f} {r['peak_rss_mb']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests (or turns/utterances) per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured calls per worker before each scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake upstream latency in seconds")
+    parser.add_argument("--utterance-seconds", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON for comparing runs")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Config reads the environment at import time, so set it before the app is imported
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["OPENAI_FAKE_UPSTREAM"] = "1"
+    os.environ["OPENAI_FAKE_LATENCY"] = str(args.latency)
+    os.environ.setdefault("LOG_TERMINAL", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Every chat message is unique, but keep the cache out of the upstream numbers anyway
+    os.environ.setdefault("COMPLETION_CACHE_BACKEND", "none")
+    os.chdir(workdir)
+
+    report(asyncio.run(run(args)), args.json)
+
+
+if __name__ == "__main__":
+    main()
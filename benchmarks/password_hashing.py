@@ -0,0 +1,68 @@
+"""Show event-loop latency during a signup burst, hashing on the loop vs. on the credentials thread pool.
+
+A ticker measures how late asyncio.sleep wakes up while `--signups`
+passwords are hashed concurrently; on the loop every hash is a stall.
+
+    python -m benchmarks.password_hashing --signups 64 --n 16384
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from quart import Quart
+
+from src.extensions.credentials import Credentials, _scrypt
+
+
+async def watch_loop_lag(stop, interval=0.005):
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return sorted(lags)
+
+
+async def measure(label, signups, hash_one):
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop_lag(stop))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(hash_one(f"password-{i}") for i in range(signups)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags = await watcher
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+    print(f"{label:<20} {signups / elapsed:8.1f} hashes/s   loop lag p99={p99 * 1000:8.2f}ms max={lags[-1] * 1000 if lags else 0:8.2f}ms")
+
+
+async def run(signups, n, r, p, threads):
+    app = Quart(__name__)
+    app.config.update(PASSWORD_SCRYPT_N=n, PASSWORD_SCRYPT_R=r, PASSWORD_SCRYPT_P=p,
+                      PASSWORD_HASH_THREADS=threads, PASSWORD_HASH_MAX_PENDING=signups)
+    credentials = Credentials()
+    credentials.init_app(app)
+
+    async def inline(password):
+        _scrypt(password, os.urandom(16), n, r, p)
+
+    print(f"signups={signups} scrypt n={n} r={r} p={p} threads={threads}")
+    await measure("on the event loop", signups, inline)
+    await measure("thread pool", signups, credentials.hash)
+    credentials.executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--signups", type=int, default=64)
+    parser.add_argument("--n", type=int, default=2 ** 14)
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+    asyncio.run(run(args.signups, args.n, args.r, args.p, args.threads))
+
+
+if __name__ == "__main__":
+    main()
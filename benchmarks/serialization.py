@@ -0,0 +1,90 @@
+"""Compare per-request marshmallow dumps + stdlib jsonify with cached compiled dumpers + orjson.
+
+Serializes a history page of Chat rows and a list of User rows the way the
+routes do, without touching the database.
+
+    python -m benchmarks.serialization --rows 100 --rounds 2000
+"""
+import argparse
+import datetime
+import time
+
+from quart import Quart
+from flask.json.provider import DefaultJSONProvider
+
+from src.modules.chats.models import Chat
+from src.modules.chats.schemas import ChatSchema, dump_chat
+from src.modules.users.models import LISTABLE_FIELDS, User
+from src.modules.users.schemas import UserSchema, user_list_dumper
+from src.utils.serialization import FastJSONProvider
+
+
+def make_rows(rows):
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    chats = [
+        Chat(id=i, user_id=1, message=f"message {i} " * 8, response=f"response {i} " * 16,
+             created_at=now + datetime.timedelta(seconds=i))
+        for i in range(rows)
+    ]
+    users = [
+        User(id=i, username=f"user{i}", password="x" * 60, email=f"user{i}@example.com",
+             created_at=now, updated_at=now)
+        for i in range(rows)
+    ]
+    return chats, users
+
+
+def bench(label, rounds, fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<42} {elapsed / rounds * 1e6:10.1f} us/response")
+    return elapsed
+
+
+async def run(rows, rounds):
+    chats, users = make_rows(rows)
+    app = Quart(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app) if FastJSONProvider.available else stdlib
+
+    async with app.app_context():
+        def chats_baseline():
+            return stdlib.response({"messages": ChatSchema(many=True).dump(chats), "has_more": False})
+
+        def chats_fast():
+            return fast.response({"messages": [dump_chat(chat) for chat in chats], "has_more": False})
+
+        def users_baseline():
+            return stdlib.response(UserSchema(many=True, only=LISTABLE_FIELDS).dump(users))
+
+        def users_fast():
+            dump = user_list_dumper(LISTABLE_FIELDS)
+            return fast.response([dump(user) for user in users])
+
+        assert stdlib.loads(await chats_baseline().get_data()) == stdlib.loads(await chats_fast().get_data())
+        assert stdlib.loads(await users_baseline().get_data()) == stdlib.loads(await users_fast().get_data())
+
+        print(f"rows={rows} rounds={rounds} orjson={'yes' if FastJSONProvider.available else 'no'}")
+        base = bench("history: marshmallow + json", rounds, chats_baseline)
+        new = bench("history: compiled dumper + fast json", rounds, chats_fast)
+        print(f"{'':<42} {base / new:10.1f}x")
+        base = bench("users: marshmallow + json", rounds, users_baseline)
+        new = bench("users: compiled dumper + fast json", rounds, users_fast)
+        print(f"{'':<42} {base / new:10.1f}x")
+
+
+def main():
+    import asyncio
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Measure cold start: a fresh interpreter importing the app and running create_app().
+
+Each run is a new process, so module imports are included, as they are for
+a worker boot or a CLI command.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from src.main import create_app
+app = create_app()
+print(json.dumps({"create_app": time.perf_counter() - start, **app.extensions["startup"].phases}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.getcwd(),
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+        "LOG_TERMINAL": "0",
+    }
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=workdir, check=True,
+                                capture_output=True, text=True).stdout
+        phases = json.loads(output.strip().splitlines()[-1])
+        phases["process"] = time.perf_counter() - start
+        runs.append(phases)
+
+    print(f"runs={args.runs} (median)")
+    for name in runs[0]:
+        print(f"{name:<12} {statistics.median(run[name] for run in runs) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Time to first audio for a streamed reply: sentence-by-sentence synthesis vs. synthesizing the whole reply, with and without the phrase cache.
+
+The reply arrives as word deltas at --tokens-per-second, like a streaming
+completion. "whole reply" waits for the full text and then synthesizes it
+in one piece; "streamed" is SpeechOutput, which starts on the first
+sentence. The stub synthesizer runs inline, so timings are mostly the
+reply's own pacing plus synthesis and encoding.
+
+    python -m benchmarks.tts --replies 20 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from quart import Quart
+
+from src.modules.audio.phrase_cache import phrase_cache
+from src.modules.audio.processing import encode_audio, synthesize_tones
+from src.modules.audio.speech import SpeechOutput
+
+REPLIES = [
+    "Sure, I've added that to your calendar. You have two other meetings that afternoon. Want me to move either of them?",
+    "Done. Your reminder is set for tomorrow at nine. I'll ping you ten minutes before.",
+    "You have three open tasks. The most urgent one is the quarterly report, due on Friday.",
+]
+
+
+async def stream_words(text, tokens_per_second):
+    for word in text.split(" "):
+        await asyncio.sleep(1 / tokens_per_second)
+        yield word + " "
+
+
+async def whole_reply(text, tokens_per_second, sample_rate):
+    start = time.perf_counter()
+    parts = [delta async for delta in stream_words(text, tokens_per_second)]
+    encode_audio(synthesize_tones("".join(parts), sample_rate), "mulaw")
+    return time.perf_counter() - start
+
+
+async def streamed_reply(app, text, tokens_per_second):
+    first_audio = asyncio.get_running_loop().create_future()
+    start = time.perf_counter()
+
+    async def send_json(message):
+        pass
+
+    async def send_bytes(chunk):
+        if not first_audio.done():
+            first_audio.set_result(time.perf_counter() - start)
+
+    speech = SpeechOutput(app.config, send_json, send_bytes)
+    runner = asyncio.create_task(speech.run())
+    async for delta in stream_words(text, tokens_per_second):
+        await speech.feed(delta)
+    await speech.finish()
+    await speech.close()
+    await runner
+    return first_audio.result()
+
+
+def summarize(label, seconds):
+    seconds = sorted(seconds)
+    print(f"{label:<22} first audio p50={seconds[len(seconds) // 2] * 1000:8.1f}ms max={seconds[-1] * 1000:8.1f}ms")
+
+
+async def run(replies, tokens_per_second):
+    texts = [REPLIES[i % len(REPLIES)] for i in range(replies)]
+    app = Quart(__name__)
+    app.config.update(TTS_ENCODING="mulaw", TTS_SAMPLE_RATE=16000)
+    summarize("whole reply", [await whole_reply(text, tokens_per_second, 16000) for text in texts])
+
+    app.config["TTS_CACHE_DIR"] = ""
+    phrase_cache.init_app(app)
+    summarize("streamed, no cache", [await streamed_reply(app, text, tokens_per_second) for text in texts])
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app.config["TTS_CACHE_DIR"] = cache_dir
+        phrase_cache.init_app(app)
+        for text in REPLIES:
+            await streamed_reply(app, text, tokens_per_second)
+        # Give the background cache writes a moment to land
+        await asyncio.sleep(0.2)
+        summarize("streamed, cached", [await streamed_reply(app, text, tokens_per_second) for text in texts])
+        print(f"phrase cache: {phrase_cache.hits} hits, {phrase_cache.misses} misses, "
+              f"{phrase_cache.total_bytes / 1024:.0f} KiB in {len(os.listdir(cache_dir))} shards")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replies", type=int, default=20)
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    args = parser.parse_args()
+    asyncio.run(run(args.replies, args.tokens_per_second))
+
+
+if __name__ == "__main__":
+    main()
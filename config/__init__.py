@@ -10,6 +10,115 @@ DB_NAME = os.getenv('DB_NAME')
 DB_PORT = os.getenv('DB_PORT')
 
 class Config:
-    SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # DATABASE_URL overrides the MySQL settings, e.g. sqlite:///local.db for local runs
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
\ No newline at end of file
+    SQLALCHEMY_ECHO = os.getenv('SQLALCHEMY_ECHO', '0') == '1'
+    SQLALCHEMY_POOL_SIZE = int(os.getenv('SQLALCHEMY_POOL_SIZE', 10))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.getenv('SQLALCHEMY_MAX_OVERFLOW', 20))
+    SQLALCHEMY_POOL_RECYCLE = int(os.getenv('SQLALCHEMY_POOL_RECYCLE', 1800))
+    SQLALCHEMY_POOL_TIMEOUT = float(os.getenv('SQLALCHEMY_POOL_TIMEOUT', 30))
+    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', 32))
+    OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 64))
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 60))
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5))
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+    OPENAI_RETRY_BASE_DELAY = float(os.getenv('OPENAI_RETRY_BASE_DELAY', 0.5))
+    OPENAI_RETRY_MAX_DELAY = float(os.getenv('OPENAI_RETRY_MAX_DELAY', 20))
+    # Account rate limits; 0 means unlimited
+    OPENAI_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 0))
+    OPENAI_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', 0))
+    # Share one upstream call between identical requests that are in flight at the same time
+    OPENAI_SINGLE_FLIGHT = os.getenv('OPENAI_SINGLE_FLIGHT', '1') == '1'
+    # Serve completions from a local fake instead of the OpenAI API (no network needed)
+    OPENAI_FAKE_UPSTREAM = os.getenv('OPENAI_FAKE_UPSTREAM', '0') == '1'
+    OPENAI_FAKE_LATENCY = float(os.getenv('OPENAI_FAKE_LATENCY', 0.5))
+    OPENAI_FAKE_ERROR_RATE = float(os.getenv('OPENAI_FAKE_ERROR_RATE', 0))
+    # Logging (logs/<LOG_FILE>); LOG_QUEUE moves formatting and file writes to a background thread
+    LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_JSON = os.getenv('LOG_JSON', '0') == '1'
+    LOG_QUEUE = os.getenv('LOG_QUEUE', '1') == '1'
+    LOG_TERMINAL = os.getenv('LOG_TERMINAL', '1') == '1'
+    LOG_CLEAR = os.getenv('LOG_CLEAR', '0') == '1'
+    # Keep one in N per-frame audio log records
+    LOG_AUDIO_FRAME_SAMPLE = int(os.getenv('LOG_AUDIO_FRAME_SAMPLE', 100))
+    # Encode JSON responses with orjson when it is installed
+    JSON_FAST = os.getenv('JSON_FAST', '1') == '1'
+    # Prometheus text endpoint
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+    METRICS_PATH = os.getenv('METRICS_PATH', '/metrics')
+    # /ws/chat session limits
+    WS_MAX_IN_FLIGHT = int(os.getenv('WS_MAX_IN_FLIGHT', 4))
+    WS_SEND_QUEUE_SIZE = int(os.getenv('WS_SEND_QUEUE_SIZE', 64))
+    WS_HEARTBEAT_INTERVAL = float(os.getenv('WS_HEARTBEAT_INTERVAL', 20))
+    WS_IDLE_TIMEOUT = float(os.getenv('WS_IDLE_TIMEOUT', 60))
+    # /ws/audio ingest (mono PCM16)
+    AUDIO_SAMPLE_RATE = int(os.getenv('AUDIO_SAMPLE_RATE', 16000))
+    AUDIO_RING_BUFFER_SECONDS = float(os.getenv('AUDIO_RING_BUFFER_SECONDS', 10))
+    AUDIO_MAX_UTTERANCE_SECONDS = float(os.getenv('AUDIO_MAX_UTTERANCE_SECONDS', 8))
+    AUDIO_SEGMENT_QUEUE_SIZE = int(os.getenv('AUDIO_SEGMENT_QUEUE_SIZE', 2))
+    STT_BACKEND = os.getenv('STT_BACKEND', 'stub')
+    STT_SAMPLE_RATE = int(os.getenv('STT_SAMPLE_RATE', 16000))
+    AUDIO_VAD_FRAME_MS = int(os.getenv('AUDIO_VAD_FRAME_MS', 20))
+    AUDIO_VAD_BLOCK_MS = int(os.getenv('AUDIO_VAD_BLOCK_MS', 200))
+    AUDIO_VAD_ENERGY_THRESHOLD = float(os.getenv('AUDIO_VAD_ENERGY_THRESHOLD', 500))
+    AUDIO_VAD_ZCR_THRESHOLD = float(os.getenv('AUDIO_VAD_ZCR_THRESHOLD', 0.5))
+    AUDIO_VAD_PADDING_MS = int(os.getenv('AUDIO_VAD_PADDING_MS', 200))
+    AUDIO_VAD_SILENCE_MS = int(os.getenv('AUDIO_VAD_SILENCE_MS', 400))
+    # Spoken replies on /ws/audio: sentences are synthesized as the reply streams in
+    TTS_ENABLED = os.getenv('TTS_ENABLED', '1') == '1'
+    TTS_BACKEND = os.getenv('TTS_BACKEND', 'stub')
+    TTS_VOICE = os.getenv('TTS_VOICE', 'default')
+    TTS_SAMPLE_RATE = int(os.getenv('TTS_SAMPLE_RATE', 16000))
+    TTS_ENCODING = os.getenv('TTS_ENCODING', 'mulaw')  # mulaw or pcm16
+    TTS_CHUNK_MS = int(os.getenv('TTS_CHUNK_MS', 200))
+    TTS_MAX_AHEAD = int(os.getenv('TTS_MAX_AHEAD', 2))
+    TTS_MIN_SENTENCE_CHARS = int(os.getenv('TTS_MIN_SENTENCE_CHARS', 12))
+    TTS_MAX_SENTENCE_CHARS = int(os.getenv('TTS_MAX_SENTENCE_CHARS', 240))
+    # On-disk cache of synthesized phrases (empty dir disables it)
+    TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'cache/tts')
+    TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 256 * 2 ** 20))
+    # Process pool for CPU-bound audio work (0 = one worker per CPU)
+    WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', 0))
+    WORKER_POOL_MAX_PENDING = int(os.getenv('WORKER_POOL_MAX_PENDING', 64))
+    WORKER_POOL_QUEUE_TIMEOUT = float(os.getenv('WORKER_POOL_QUEUE_TIMEOUT', 5))
+    # Password hashing (scrypt work factors; changing them rehashes passwords at next login)
+    PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14))
+    PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+    PASSWORD_HASH_THREADS = int(os.getenv('PASSWORD_HASH_THREADS', 0))  # 0 = min(4, CPUs)
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+    # Pub/sub between workers and shared counters: memory:// (one process) or redis://host:port/db
+    BACKPLANE_URL = os.getenv('BACKPLANE_URL', 'memory://')
+    BACKPLANE_PREFIX = os.getenv('BACKPLANE_PREFIX', 'assistant:')
+    # Chats per user per window, across all workers (0 = unlimited)
+    CHAT_RATE_LIMIT = int(os.getenv('CHAT_RATE_LIMIT', 0))
+    CHAT_RATE_WINDOW = int(os.getenv('CHAT_RATE_WINDOW', 60))
+    # Per-user cache of recent chat history pages
+    CHAT_HISTORY_CACHE_USERS = int(os.getenv('CHAT_HISTORY_CACHE_USERS', 1024))
+    CHAT_HISTORY_CACHE_PAGES = int(os.getenv('CHAT_HISTORY_CACHE_PAGES', 8))
+    CHAT_HISTORY_CACHE_TTL = float(os.getenv('CHAT_HISTORY_CACHE_TTL', 30))
+    # Per-user cache of the current week's calendar occurrences
+    CALENDAR_CACHE_USERS = int(os.getenv('CALENDAR_CACHE_USERS', 1024))
+    CALENDAR_CACHE_TTL = float(os.getenv('CALENDAR_CACHE_TTL', 300))
+    # Conversation context sent with each chat
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', 2000))
+    CHAT_CONTEXT_SUMMARY_TOKENS = int(os.getenv('CHAT_CONTEXT_SUMMARY_TOKENS', 200))
+    CHAT_CONTEXT_HISTORY_ROWS = int(os.getenv('CHAT_CONTEXT_HISTORY_ROWS', 50))
+    CHAT_CONTEXT_USERS = int(os.getenv('CHAT_CONTEXT_USERS', 1024))
+    CHAT_CONTEXT_TTL = float(os.getenv('CHAT_CONTEXT_TTL', 3600))
+    # Reply cache checked before calling the model: none, exact or semantic
+    COMPLETION_CACHE_BACKEND = os.getenv('COMPLETION_CACHE_BACKEND', 'none')
+    COMPLETION_CACHE_SIZE = int(os.getenv('COMPLETION_CACHE_SIZE', 1024))
+    COMPLETION_CACHE_TTL = float(os.getenv('COMPLETION_CACHE_TTL', 300))
+    COMPLETION_CACHE_SCOPE = os.getenv('COMPLETION_CACHE_SCOPE', 'user')
+    COMPLETION_CACHE_SIMILARITY = float(os.getenv('COMPLETION_CACHE_SIMILARITY', 0.9))
+    # Write-behind batching for Chat rows (each reply waits for its batch to commit)
+    CHAT_WRITE_BEHIND = os.getenv('CHAT_WRITE_BEHIND', '0') == '1'
+    CHAT_WRITE_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BATCH_SIZE', 200))
+    CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv('CHAT_WRITE_FLUSH_INTERVAL', 0.05))
+    CHAT_WRITE_QUEUE_SIZE = int(os.getenv('CHAT_WRITE_QUEUE_SIZE', 5000))
@@ -0,0 +1,27 @@
+"""Add chat history index
+
+Revision ID: 3c51a7d2e9f4
+Revises: a0078beafcb6
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c51a7d2e9f4'
+down_revision = 'a0078beafcb6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves keyset pagination of a user's history: WHERE user_id = ? AND (created_at, id) < cursor ORDER BY created_at DESC, id DESC
+    with op.batch_alter_table('chat', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_user_id_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_user_id_created_at_id')
@@ -0,0 +1,58 @@
+"""Add tasks and events
+
+Revision ID: 5b8f2c6d1e37
+Revises: 7d1e5b9c4a20
+Create Date: 2026-10-17 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8f2c6d1e37'
+down_revision = '7d1e5b9c4a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tasks',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.String(length=1000), nullable=True),
+    sa.Column('priority', sa.SmallInteger(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Open tasks in priority order for one user
+    op.create_index('ix_tasks_user_id_completed_at_priority_due_at', 'tasks', ['user_id', 'completed_at', 'priority', 'due_at'], unique=False)
+    op.create_table('events',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.String(length=1000), nullable=True),
+    sa.Column('start_at', sa.DateTime(), nullable=False),
+    sa.Column('end_at', sa.DateTime(), nullable=False),
+    sa.Column('recurrence', sa.String(length=16), nullable=True),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('until', sa.DateTime(), nullable=True),
+    sa.Column('series_end_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Calendar windows: every event of a user that starts before the window ends and whose series ends after it starts
+    op.create_index('ix_events_user_id_start_at_series_end_at', 'events', ['user_id', 'start_at', 'series_end_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_events_user_id_start_at_series_end_at', table_name='events')
+    op.drop_table('events')
+    op.drop_index('ix_tasks_user_id_completed_at_priority_due_at', table_name='tasks')
+    op.drop_table('tasks')
@@ -0,0 +1,56 @@
+"""Add chat full-text index
+
+Revision ID: 7d1e5b9c4a20
+Revises: 3c51a7d2e9f4
+Create Date: 2026-10-17 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1e5b9c4a20'
+down_revision = '3c51a7d2e9f4'
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5("
+    "message, response, content='chat', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS chat_fts_ai AFTER INSERT ON chat BEGIN "
+    "INSERT INTO chat_fts(rowid, message, response) VALUES (new.id, new.message, new.response); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_fts_ad AFTER DELETE ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, message, response) VALUES ('delete', old.id, old.message, old.response); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_fts_au AFTER UPDATE OF message, response ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, message, response) VALUES ('delete', old.id, old.message, old.response); "
+    "INSERT INTO chat_fts(rowid, message, response) VALUES (new.id, new.message, new.response); END",
+    # Index the rows that already exist
+    "INSERT INTO chat_fts(chat_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS chat_fts_au",
+    "DROP TRIGGER IF EXISTS chat_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_fts_ai",
+    "DROP TABLE IF EXISTS chat_fts",
+)
+
+
+def upgrade():
+    # Serves /api/chat/<user_id>/search; InnoDB and the SQLite triggers keep the index current as chats are inserted
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ft_chat_message_response', 'chat', ['message', 'response'], unique=False, mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_chat_message_response', table_name='chat')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,66 @@
+"""Index chat search by user
+
+Revision ID: c2e9a4f17b85
+Revises: 5b8f2c6d1e37
+Create Date: 2026-10-17 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e9a4f17b85'
+down_revision = '5b8f2c6d1e37'
+branch_labels = None
+depends_on = None
+
+DROP_SQLITE_FTS = (
+    "DROP TRIGGER IF EXISTS chat_fts_au",
+    "DROP TRIGGER IF EXISTS chat_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_fts_ai",
+    "DROP TABLE IF EXISTS chat_fts",
+)
+
+SQLITE_UPGRADE = DROP_SQLITE_FTS + (
+    "CREATE VIRTUAL TABLE chat_fts USING fts5("
+    "user_id, message, response, content='chat', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER chat_fts_ai AFTER INSERT ON chat BEGIN "
+    "INSERT INTO chat_fts(rowid, user_id, message, response) VALUES (new.id, new.user_id, new.message, new.response); END",
+    "CREATE TRIGGER chat_fts_ad AFTER DELETE ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, user_id, message, response) "
+    "VALUES ('delete', old.id, old.user_id, old.message, old.response); END",
+    "CREATE TRIGGER chat_fts_au AFTER UPDATE OF user_id, message, response ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, user_id, message, response) "
+    "VALUES ('delete', old.id, old.user_id, old.message, old.response); "
+    "INSERT INTO chat_fts(rowid, user_id, message, response) VALUES (new.id, new.user_id, new.message, new.response); END",
+    # Index the rows that already exist
+    "INSERT INTO chat_fts(chat_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = DROP_SQLITE_FTS + (
+    "CREATE VIRTUAL TABLE chat_fts USING fts5("
+    "message, response, content='chat', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER chat_fts_ai AFTER INSERT ON chat BEGIN "
+    "INSERT INTO chat_fts(rowid, message, response) VALUES (new.id, new.message, new.response); END",
+    "CREATE TRIGGER chat_fts_ad AFTER DELETE ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, message, response) VALUES ('delete', old.id, old.message, old.response); END",
+    "CREATE TRIGGER chat_fts_au AFTER UPDATE OF message, response ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, message, response) VALUES ('delete', old.id, old.message, old.response); "
+    "INSERT INTO chat_fts(rowid, message, response) VALUES (new.id, new.message, new.response); END",
+    "INSERT INTO chat_fts(chat_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    # SQLite only: the FTS5 table gains an indexed user_id so a search intersects the user's rows with the words.
+    # InnoDB FULLTEXT indexes can't hold an integer column; MySQL keeps filtering on ix_chat_user_id_created_at_id.
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
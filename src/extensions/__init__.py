@@ -1,5 +1,15 @@
-from .db import create_db
-from .ai_client import AIClient
+from .db import db
+from .ai_client import AIClient, ai_client
+from .backplane import Backplane, backplane
+from .completion_cache import CompletionCache, completion_cache
+from .credentials import Credentials, credentials
+from .metrics import Metrics, metrics
+from .workers import WorkerPool, worker_pool
 
 def register_extensions(app):
-    create_db(app)
+    metrics.init_app(app)
+    backplane.init_app(app)
+    ai_client.init_app(app)
+    completion_cache.init_app(app)
+    credentials.init_app(app)
+    worker_pool.init_app(app)
@@ -1,23 +1,363 @@
-import openai
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import itertools
+import json
+import random
+import time
+from .fake_openai import FakeAsyncOpenAI
+from .metrics import metrics
+from src.utils.singleflight import SingleFlight
+from src.utils.stats import LatencyStats
+
+# Scheduling priorities for upstream calls; lower runs first
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Budget that refills continuously at per_minute / 60 units per second, holding at most a minute's worth.
+
+    A per_minute of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def delay(self, amount):
+        """Seconds until amount can be taken."""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount):
+        if self.rate:
+            self._refill()
+            self.level -= amount
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class UpstreamScheduler:
+    """Admits upstream calls in priority order within concurrency, requests/min and tokens/min budgets.
+
+    Callers wait in a heap ordered by (priority, arrival); the head is admitted
+    as soon as a concurrency slot is free and both buckets can cover it, so an
+    interactive turn never queues behind background work.
+    """
+
+    def __init__(self, max_concurrency, requests_per_minute=0, tokens_per_minute=0):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.wait_time = LatencyStats()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._timer = None
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority, tokens):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), tokens, future))
+        start = time.perf_counter()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted but cancelled before it ran: nothing went upstream, so hand back what admission took
+                self.requests.consume(-1)
+                self.tokens.consume(-tokens)
+                self._release()
+            raise
+        self.wait_time.record(time.perf_counter() - start)
+
+        lease = Lease(tokens)
+        try:
+            yield lease
+        finally:
+            if lease.used is not None:
+                self.tokens.consume(lease.used - tokens)
+            self._release()
+
+    def pause(self, seconds):
+        """Hold all admissions, e.g. after upstream answered 429 with Retry-After."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self._dispatch()
+
+    def stats(self):
+        return {
+            "queue_depth": sum(1 for *_, future in self._waiting if not future.done()),
+            "in_flight": self.in_flight,
+            "wait": self.wait_time.summary(),
+        }
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting and self.in_flight < self.max_concurrency:
+            _, _, tokens, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            delay = max(self.paused_until - time.monotonic(), self.requests.delay(1), self.tokens.delay(tokens))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiting)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+
+class Lease:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.used = None
+
 
 class AIClient:
     def __init__(self):
         self.api_key = None
+        self.model = None
+        self._client = None
+        self._client_options = None
+        # Exception types that mean the connection failed; filled in when the real client is built
+        self._connection_errors = ()
+        self.scheduler = None
+        self.max_retries = None
+        self.retry_base_delay = None
+        self.retry_max_delay = None
+        self.retries = 0
+        # Identical requests already in flight share one upstream call
+        self._inflight = SingleFlight()
+        self.single_flight = True
+        # Streaming latency: time to first token vs. time to the full completion
+        self.first_token_latency = LatencyStats()
+        self.stream_latency = LatencyStats()
 
     def init_app(self, app):
-        self.api_key = app.config.get("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY is not set in the configuration.")
-        openai.api_key = self.api_key  # Optional: can also pass in each call
+        self.model = app.config.get("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.scheduler = UpstreamScheduler(
+            app.config.get("OPENAI_MAX_CONCURRENCY", 32),
+            requests_per_minute=app.config.get("OPENAI_REQUESTS_PER_MINUTE", 0),
+            tokens_per_minute=app.config.get("OPENAI_TOKENS_PER_MINUTE", 0),
+        )
+        self.max_retries = app.config.get("OPENAI_MAX_RETRIES", 2)
+        self.retry_base_delay = app.config.get("OPENAI_RETRY_BASE_DELAY", 0.5)
+        self.retry_max_delay = app.config.get("OPENAI_RETRY_MAX_DELAY", 20)
+        self.single_flight = app.config.get("OPENAI_SINGLE_FLIGHT", True)
 
-    def get_response(self, prompt, **kwargs):
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                api_key=self.api_key,  # safer than setting global
-                **kwargs
+        self._client = None
+        if app.config.get("OPENAI_FAKE_UPSTREAM"):
+            self._client = FakeAsyncOpenAI(
+                latency=app.config.get("OPENAI_FAKE_LATENCY", 0.5),
+                error_rate=app.config.get("OPENAI_FAKE_ERROR_RATE", 0),
             )
-            return response.choices[0].message['content']
-        except Exception as e:
-            raise RuntimeError(f"Error calling OpenAI API: {e}")
+        else:
+            self.api_key = app.config.get("OPENAI_API_KEY")
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY is not set in the configuration.")
+            self._client_options = {
+                "max_connections": app.config.get("OPENAI_MAX_CONNECTIONS", 64),
+                "timeout": app.config.get("OPENAI_TIMEOUT", 60),
+                "connect_timeout": app.config.get("OPENAI_CONNECT_TIMEOUT", 5),
+            }
+
+        app.extensions["ai_client"] = self
+        metrics.register_collector(
+            "upstream_queue_depth", "Upstream calls waiting for the scheduler.",
+            lambda: {(): self.scheduler.stats()["queue_depth"]})
+        metrics.register_collector(
+            "upstream_in_flight", "Upstream calls in progress.", lambda: {(): self.scheduler.in_flight})
+
+        @app.after_serving
+        async def close_ai_client():
+            client, self._client = self._client, None
+            if client is not None:
+                await client.close()
+
+    @property
+    def client(self):
+        # The openai SDK takes about a second to import; processes that never call the model
+        # (the CLI, worker processes) skip it entirely
+        if self._client is None:
+            self._client = self._build_client(**self._client_options)
+        return self._client
+
+    def _build_client(self, max_connections, timeout, connect_timeout):
+        import httpx
+        import openai
+
+        self._connection_errors = (openai.APIConnectionError, httpx.TransportError)
+        timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        # One pooled HTTP client for the whole app, so connections (and TLS sessions) are reused.
+        # Retries are done here rather than in the SDK so they go back through the scheduler.
+        return openai.AsyncOpenAI(
+            api_key=self.api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=timeout,
+            ),
+        )
+
+    async def get_response(self, messages, priority=NORMAL, **kwargs):
+        messages = self._as_messages(messages)
+        if not self.single_flight:
+            return await self._complete(messages, priority, **kwargs)
+        key = self._request_key(messages, kwargs, stream=False)
+        return await self._inflight.do(key, lambda: self._complete(messages, priority, **kwargs))
+
+    async def stream_response(self, messages, priority=NORMAL, **kwargs):
+        messages = self._as_messages(messages)
+        if not self.single_flight:
+            source = self._stream(messages, priority, **kwargs)
+        else:
+            key = self._request_key(messages, kwargs, stream=True)
+            source = self._inflight.stream(key, lambda: self._stream(messages, priority, **kwargs))
+        async for delta in source:
+            yield delta
+
+    async def _complete(self, messages, priority, **kwargs):
+        model = kwargs.pop("model", self.model)
+        tokens = self._estimate_tokens(messages, kwargs)
+        for attempt in itertools.count():
+            try:
+                async with self.scheduler.slot(priority, tokens) as lease:
+                    start = time.perf_counter()
+                    response = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        **kwargs
+                    )
+                    metrics.upstream_request_seconds.labels(model, "complete").observe(time.perf_counter() - start)
+                    if getattr(response, "usage", None):
+                        lease.used = response.usage.total_tokens
+                        self._record_usage(model, response.usage)
+                break
+            except Exception as e:
+                metrics.upstream_errors.labels(getattr(e, "status_code", None) or "error").inc()
+                if attempt >= self.max_retries or not self._retryable(e):
+                    raise RuntimeError(f"Error calling OpenAI API: {e}")
+                await self._backoff(e, attempt)
+
+        if not response.choices or not hasattr(response.choices[0], "message"):
+            raise RuntimeError("Invalid response from OpenAI.")
+        return response.choices[0].message.content
+
+    async def _stream(self, messages, priority, **kwargs):
+        model = kwargs.pop("model", self.model)
+        tokens = self._estimate_tokens(messages, kwargs)
+        for attempt in itertools.count():
+            started = False
+            try:
+                async with self.scheduler.slot(priority, tokens) as lease:
+                    start = time.perf_counter()
+                    stream = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **kwargs
+                    )
+                    async for chunk in stream:
+                        if getattr(chunk, "usage", None):
+                            lease.used = chunk.usage.total_tokens
+                            self._record_usage(model, chunk.usage)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if not started:
+                                started = True
+                                elapsed = time.perf_counter() - start
+                                self.first_token_latency.record(elapsed)
+                                metrics.upstream_first_token_seconds.labels(model).observe(elapsed)
+                            yield delta
+                elapsed = time.perf_counter() - start
+                self.stream_latency.record(elapsed)
+                metrics.upstream_request_seconds.labels(model, "stream").observe(elapsed)
+                return
+            except Exception as e:
+                metrics.upstream_errors.labels(getattr(e, "status_code", None) or "error").inc()
+                # Once deltas have gone out a retry would repeat them, so only retry before the first one
+                if started or attempt >= self.max_retries or not self._retryable(e):
+                    raise RuntimeError(f"Error calling OpenAI API: {e}")
+                await self._backoff(e, attempt)
+
+    @staticmethod
+    def _record_usage(model, usage):
+        metrics.upstream_tokens.labels(model, "prompt").inc(usage.prompt_tokens)
+        metrics.upstream_tokens.labels(model, "completion").inc(usage.completion_tokens)
+
+    def _retryable(self, error):
+        if isinstance(error, self._connection_errors):
+            return True
+        return getattr(error, "status_code", None) in RETRY_STATUSES
+
+    async def _backoff(self, error, attempt):
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if getattr(error, "status_code", None) == 429:
+            # The whole process is over budget, not just this request
+            self.scheduler.pause(delay)
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    @staticmethod
+    def _estimate_tokens(messages, kwargs):
+        prompt = sum(len(message.get("content") or "") for message in messages) // 4 + 4 * len(messages)
+        return prompt + kwargs.get("max_tokens", 256)
+
+    @staticmethod
+    def _as_messages(messages):
+        if isinstance(messages, str):
+            return [{"role": "user", "content": messages}]
+        return messages
+
+    def _request_key(self, messages, kwargs, stream):
+        payload = json.dumps([kwargs.get("model", self.model), messages, kwargs, stream], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def scheduler_stats(self):
+        return {**self.scheduler.stats(), "retries": self.retries}
+
+    def single_flight_stats(self):
+        return {"upstream_calls": self._inflight.started, "coalesced": self._inflight.coalesced}
+
+    def stream_stats(self):
+        return {
+            "first_token": self.first_token_latency.summary(),
+            "total": self.stream_latency.summary(),
+        }
+
+
+ai_client = AIClient()
@@ -0,0 +1,429 @@
+import asyncio
+import collections
+import json
+import random
+import time
+import uuid
+from urllib.parse import urlsplit
+from src.utils.cache import LRUCache
+from .metrics import metrics
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*args):
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader):
+    """Read one RESP2 reply. Error replies are returned as RedisError instances, not raised."""
+    line = await reader.readuntil(b"\r\n")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body
+    if prefix == b"-":
+        return RedisError(body.decode(errors="replace"))
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply from server: {line[:32]!r}")
+
+
+# Bytes a connection may buffer for the socket before senders wait (asyncio's own default for streams)
+WRITE_BUFFER_HIGH_WATER = 64 * 1024
+
+
+class RESPConnection:
+    """One Redis-protocol connection over asyncio streams.
+
+    Commands are written as soon as they're sent and replies are matched to
+    them in order, so callers pipeline without waiting on each other. Pub/sub
+    "message" pushes go to on_push instead of a pending command. execute()
+    and drain() wait while the socket's write buffer is over its high-water
+    mark, so a slow server pushes back on callers instead of buffering
+    without bound; `congested` tells fire-and-forget senders to do the same.
+    """
+
+    def __init__(self, host, port, on_push=None):
+        self.host = host
+        self.port = port
+        self.on_push = on_push
+        self.writer = None
+        self.pending = collections.deque()
+        self.closed = asyncio.Event()
+        self._reader_task = None
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.closed.is_set()
+
+    @property
+    def congested(self):
+        return self.connected and self.writer.transport.get_write_buffer_size() > WRITE_BUFFER_HIGH_WATER
+
+    async def connect(self, db=0, password=None, timeout=5):
+        reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout)
+        self.closed.clear()
+        self._reader_task = asyncio.create_task(self._read_loop(reader))
+        if password:
+            await asyncio.wait_for(self.execute("AUTH", password), timeout)
+        if db:
+            await asyncio.wait_for(self.execute("SELECT", db), timeout)
+
+    def send(self, *args):
+        """Write a command now; the returned future resolves to its reply."""
+        if not self.connected:
+            raise ConnectionError(f"Not connected to {self.host}:{self.port}.")
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(future)
+        self.writer.write(encode_command(*args))
+        return future
+
+    async def execute(self, *args):
+        reply = self.send(*args)
+        await self.drain()
+        return await reply
+
+    async def drain(self):
+        await self.writer.drain()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        self._fail_pending(ConnectionError("Connection closed."))
+        self.closed.set()
+
+    async def _read_loop(self, reader):
+        try:
+            while True:
+                reply = await read_reply(reader)
+                if self.on_push is not None and isinstance(reply, list) and reply and reply[0] == b"message":
+                    self.on_push(reply[1], reply[2])
+                    continue
+                if not self.pending:
+                    continue
+                future = self.pending.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            self._fail_pending(ConnectionError(f"Lost connection to {self.host}:{self.port}: {e}"))
+        finally:
+            self.closed.set()
+
+    def _fail_pending(self, error):
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+
+class MemoryBackend:
+    """Pub/sub and counters inside this process; right for a single worker."""
+
+    def __init__(self, url=None, logger=None, max_keys=100_000, **options):
+        self.counters = LRUCache(maxsize=max_keys)
+        self.on_message = None
+
+    async def start(self, on_message):
+        self.on_message = on_message
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, channel):
+        pass
+
+    def unsubscribe(self, channel):
+        pass
+
+    def publish(self, channel, payload):
+        if self.on_message is None:
+            return
+        try:
+            # Deliver on the next loop iteration, like a remote backend would, never re-entrantly
+            asyncio.get_running_loop().call_soon(self.on_message, channel, payload)
+        except RuntimeError:
+            self.on_message(channel, payload)
+
+    async def incr(self, key, ttl):
+        count = self.counters.get(key, 0) + 1
+        self.counters.set(key, count, ttl=ttl)
+        return count
+
+
+class RedisBackend:
+    """Pub/sub and counters on a Redis (or protocol-compatible) server, shared by every worker that points at it.
+
+    Uses two connections: one for commands and one held in subscribe mode.
+    The subscriber reconnects with backoff and re-subscribes every channel;
+    messages published while it is down are lost, as with Redis pub/sub itself.
+    After the command connection fails to connect, commands fail fast for a
+    cooldown (doubling up to 30s) instead of each waiting out a new connect.
+    """
+
+    MAX_COOLDOWN = 30.0
+    # Publishes waiting for a connection (or for a congested one to drain) before new ones are dropped
+    MAX_PENDING_PUBLISHES = 10_000
+
+    def __init__(self, url, logger=None, **options):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.password = parts.password
+        self.logger = logger
+        self.channels = set()
+        self.commands = None
+        self.pubsub = None
+        self.on_message = None
+        self._lock = asyncio.Lock()
+        self._supervisor = None
+        self._cooldown = 0.0
+        self._retry_at = 0.0
+        self._pending_publishes = 0
+
+    async def start(self, on_message):
+        self.on_message = on_message
+        self._supervisor = asyncio.create_task(self._keep_subscribed())
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+        for connection in (self.pubsub, self.commands):
+            if connection is not None:
+                await connection.close()
+        self.pubsub = self.commands = None
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+        self._send_pubsub("SUBSCRIBE", channel)
+
+    def unsubscribe(self, channel):
+        self.channels.discard(channel)
+        self._send_pubsub("UNSUBSCRIBE", channel)
+
+    def publish(self, channel, payload):
+        if self.commands is not None and self.commands.connected and not self.commands.congested:
+            self.commands.send("PUBLISH", channel, payload).add_done_callback(self._log_failure)
+        elif self._pending_publishes < self.MAX_PENDING_PUBLISHES:
+            self._pending_publishes += 1
+            asyncio.ensure_future(self._publish_when_connected(channel, payload)).add_done_callback(self._publish_done)
+        else:
+            self.logger.warning(f"Backplane publish to {channel!r} dropped: too many publishes waiting.")
+
+    async def incr(self, key, ttl):
+        connection = await self._command_connection()
+        # Pipelined: both commands go out before either reply comes back
+        count = connection.send("INCR", key)
+        expire = connection.send("EXPIRE", key, ttl)
+        await connection.drain()
+        count, _ = await asyncio.gather(count, expire)
+        return count
+
+    async def _publish_when_connected(self, channel, payload):
+        connection = await self._command_connection()
+        await connection.execute("PUBLISH", channel, payload)
+
+    def _publish_done(self, future):
+        self._pending_publishes -= 1
+        self._log_failure(future)
+
+    async def _command_connection(self):
+        async with self._lock:
+            if self.commands is None or not self.commands.connected:
+                loop = asyncio.get_running_loop()
+                if loop.time() < self._retry_at:
+                    raise ConnectionError(
+                        f"Backplane at {self.host}:{self.port} unreachable, retrying in {self._retry_at - loop.time():.1f}s.")
+                connection = RESPConnection(self.host, self.port)
+                try:
+                    await connection.connect(self.db, self.password)
+                except (OSError, asyncio.TimeoutError, RedisError):
+                    await connection.close()
+                    self._cooldown = min(self._cooldown * 2, self.MAX_COOLDOWN) if self._cooldown else 1.0
+                    self._retry_at = loop.time() + self._cooldown
+                    raise
+                self._cooldown = 0.0
+                self.commands = connection
+        return self.commands
+
+    async def _keep_subscribed(self):
+        delay = 0.1
+        while True:
+            connection = RESPConnection(self.host, self.port, on_push=self._on_push)
+            try:
+                await connection.connect(self.db, self.password)
+                self.pubsub = connection
+                for channel in self.channels:
+                    connection.send("SUBSCRIBE", channel).add_done_callback(self._log_failure)
+                delay = 0.1
+                await connection.closed.wait()
+                self.logger.warning("Backplane subscriber disconnected, reconnecting.")
+            except (OSError, asyncio.TimeoutError, RedisError) as e:
+                self.logger.warning(f"Backplane connection to {self.host}:{self.port} failed: {e}")
+            finally:
+                self.pubsub = None
+                await connection.close()
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 5.0)
+
+    def _send_pubsub(self, command, channel):
+        if self.pubsub is not None and self.pubsub.connected:
+            self.pubsub.send(command, channel).add_done_callback(self._log_failure)
+
+    def _on_push(self, channel, payload):
+        self.on_message(channel.decode(), payload)
+
+    def _log_failure(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.warning(f"Backplane command failed: {future.exception()}")
+
+
+BACKPLANE_BACKENDS = {
+    "memory": MemoryBackend,
+    "redis": RedisBackend,
+}
+
+
+def register_backplane_backend(scheme, backend_cls):
+    BACKPLANE_BACKENDS[scheme] = backend_cls
+
+
+class Backplane:
+    """Messages and shared counters between every worker serving this app, so no sticky sessions are needed.
+
+    BACKPLANE_URL picks the transport: memory:// (the default, one process)
+    or redis://host:port/db for several hypercorn workers or nodes. Channel
+    handlers are plain callables run on the event loop; they must not block.
+    Messages are JSON. A worker holding a user's websocket subscribes to
+    "user:<id>", so notify_user() reaches it from any worker.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.prefix = ""
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.handlers = {}
+        self.invalidations = {}
+        self.logger = None
+        self.published = 0
+        self.received = 0
+
+    def init_app(self, app):
+        self.logger = app.logger
+        self.prefix = app.config.get("BACKPLANE_PREFIX", "assistant:")
+        url = app.config.get("BACKPLANE_URL") or "memory://"
+        backend_cls = BACKPLANE_BACKENDS.get(urlsplit(url).scheme)
+        if backend_cls is None:
+            raise ValueError(f"Unknown backplane URL scheme: {url!r}")
+        self.backend = backend_cls(url, logger=app.logger)
+        for channel in self.handlers:
+            self.backend.subscribe(self.prefix + channel)
+        app.extensions["backplane"] = self
+        metrics.register_collector(
+            "backplane_messages_total", "Backplane messages published and received by this worker.",
+            lambda: {("published",): self.published, ("received",): self.received}, ("direction",))
+
+        @app.before_serving
+        async def start_backplane():
+            await self.backend.start(self._dispatch)
+
+        @app.after_serving
+        async def stop_backplane():
+            await self.backend.stop()
+
+    def subscribe(self, channel, handler):
+        handlers = self.handlers.setdefault(channel, [])
+        handlers.append(handler)
+        if len(handlers) == 1:
+            self.backend.subscribe(self.prefix + channel)
+
+    def unsubscribe(self, channel, handler):
+        handlers = self.handlers.get(channel)
+        if handlers is None or handler not in handlers:
+            return
+        handlers.remove(handler)
+        if not handlers:
+            del self.handlers[channel]
+            self.backend.unsubscribe(self.prefix + channel)
+
+    def publish(self, channel, message):
+        self.published += 1
+        self.backend.publish(self.prefix + channel, json.dumps(message, separators=(",", ":")))
+
+    def notify_user(self, user_id, message):
+        """Deliver message to every websocket of this user, on whichever worker holds it."""
+        self.publish(f"user:{user_id}", message)
+
+    def invalidation(self, name, drop):
+        """Keep a per-worker cache coherent: returns notify(key), which calls drop(key) on every other worker.
+
+        Registering the same name again replaces the previous drop, so init_app can be called per app.
+        """
+        channel = f"invalidate:{name}"
+
+        def on_message(message):
+            if message["origin"] != self.worker_id:
+                drop(message["key"])
+
+        def notify(key):
+            self.publish(channel, {"origin": self.worker_id, "key": key})
+
+        previous = self.invalidations.get(name)
+        if previous is not None:
+            self.unsubscribe(channel, previous)
+        self.invalidations[name] = on_message
+        self.subscribe(channel, on_message)
+        return notify
+
+    async def hit(self, key, window):
+        """Count one hit against key in the current fixed window (seconds), across all workers.
+
+        Returns 0 if the backend can't be reached, so callers fail open.
+        """
+        bucket = int(time.time() // window)
+        try:
+            return await self.backend.incr(f"{self.prefix}rate:{key}:{bucket}", window)
+        except (OSError, RedisError, asyncio.TimeoutError) as e:
+            if self.logger is not None:
+                self.logger.warning(f"Rate limit check for {key!r} skipped: {e}")
+            return 0
+
+    def _dispatch(self, channel, payload):
+        self.received += 1
+        handlers = self.handlers.get(channel[len(self.prefix):])
+        if not handlers:
+            return
+        message = json.loads(payload)
+        for handler in list(handlers):
+            try:
+                handler(message)
+            except Exception as e:
+                self.logger.error(f"Backplane handler for {channel!r} failed: {e}")
+
+
+backplane = Backplane()
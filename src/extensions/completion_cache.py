@@ -0,0 +1,197 @@
+import hashlib
+import re
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+from src.utils.cache import LRUCache
+from .metrics import metrics
+
+_APOSTROPHES = re.compile(r"['\u2019]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# Prompts this short are keyed by the assistant turn they reply to as well
+FOLLOW_UP_WORDS = 3
+
+
+def normalize_prompt(text):
+    text = _APOSTROPHES.sub("", text.lower())
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+class ExactMatchBackend:
+    """Completions keyed by normalized prompt text."""
+
+    def __init__(self, maxsize, ttl, **options):
+        self.entries = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, scope, prompt):
+        return self.entries.get((scope, prompt)), "exact"
+
+    def set(self, scope, prompt, response):
+        self.entries.set((scope, prompt), response)
+
+
+class SemanticBackend:
+    """Exact matches first, then the most similar cached prompt above a cosine threshold.
+
+    Prompts are embedded into fixed slots of a preallocated matrix, so a
+    lookup is one matrix-vector product over at most maxsize rows. The default
+    embedding hashes character trigrams, which catches rewordings like
+    "what's on my schedule today?" vs "whats on my schedule today" without
+    a model call; pass embed= to use real embeddings.
+    """
+
+    def __init__(self, maxsize, ttl, similarity=0.9, dimensions=512, embed=None, **options):
+        self.ttl = ttl
+        self.similarity = similarity
+        self.dimensions = dimensions
+        self.embed = embed or self.hashed_trigrams
+        self.vectors = np.zeros((maxsize, dimensions), dtype=np.float32)
+        # Each live scope gets its own id (scope -> [id, slots using it]), so scopes are compared exactly
+        self.scopes = np.full(maxsize, -1, dtype=np.int64)
+        self.scope_ids = {}
+        self.next_scope_id = 0
+        self.expires = np.zeros(maxsize, dtype=np.float64)
+        self.responses = [None] * maxsize
+        self.slots = OrderedDict()
+        self.free = list(range(maxsize - 1, -1, -1))
+
+    def get(self, scope, prompt):
+        now = time.monotonic()
+        slot = self.slots.get((scope, prompt))
+        if slot is not None and self.expires[slot] > now:
+            self.slots.move_to_end((scope, prompt))
+            return self.responses[slot], "exact"
+        if scope not in self.scope_ids:
+            return None, None
+
+        scores = self.vectors @ self.embed(prompt)
+        scores[(self.scopes != self.scope_ids[scope][0]) | (self.expires <= now)] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity:
+            return self.responses[best], "semantic"
+        return None, None
+
+    def set(self, scope, prompt, response):
+        key = (scope, prompt)
+        slot = self.slots.get(key)
+        if slot is None:
+            if not self.free:
+                (evicted_scope, _), evicted = self.slots.popitem(last=False)
+                self._release_scope(evicted_scope)
+                self.free.append(evicted)
+            slot = self.free.pop()
+            self.scopes[slot] = self._acquire_scope(scope)
+        self.vectors[slot] = self.embed(prompt)
+        self.expires[slot] = time.monotonic() + self.ttl if self.ttl else np.inf
+        self.responses[slot] = response
+        self.slots[key] = slot
+        self.slots.move_to_end(key)
+
+    def hashed_trigrams(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        padded = f"  {text} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode()) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _acquire_scope(self, scope):
+        entry = self.scope_ids.get(scope)
+        if entry is None:
+            entry = self.scope_ids[scope] = [self.next_scope_id, 0]
+            self.next_scope_id += 1
+        entry[1] += 1
+        return entry[0]
+
+    def _release_scope(self, scope):
+        entry = self.scope_ids[scope]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.scope_ids[scope]
+
+
+CACHE_BACKENDS = {
+    "exact": ExactMatchBackend,
+    "semantic": SemanticBackend,
+}
+
+
+def register_cache_backend(name, backend_cls):
+    CACHE_BACKENDS[name] = backend_cls
+
+
+class CompletionCache:
+    """Cache of assistant replies consulted before calling the model.
+
+    Entries are keyed by the normalized prompt and scoped per user by default
+    (COMPLETION_CACHE_SCOPE=user) so one user's personal answers are never
+    served to another. A short follow-up ("yes", "the second one") only means
+    something after the question it answers, so prompts of up to
+    FOLLOW_UP_WORDS words are also keyed by the last assistant turn. Disabled
+    until init_app runs or when COMPLETION_CACHE_BACKEND is "none" (the
+    default).
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.per_user = True
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    def init_app(self, app):
+        name = app.config.get("COMPLETION_CACHE_BACKEND", "none")
+        if name == "none":
+            self.backend = None
+        elif name in CACHE_BACKENDS:
+            self.backend = CACHE_BACKENDS[name](
+                maxsize=app.config.get("COMPLETION_CACHE_SIZE", 1024),
+                ttl=app.config.get("COMPLETION_CACHE_TTL", 300),
+                similarity=app.config.get("COMPLETION_CACHE_SIMILARITY", 0.9),
+            )
+        else:
+            raise ValueError(f"Unknown completion cache backend: {name}")
+        self.per_user = app.config.get("COMPLETION_CACHE_SCOPE", "user") == "user"
+        app.extensions["completion_cache"] = self
+        metrics.register_collector(
+            "completion_cache_lookups", "Completion cache lookups since start.",
+            lambda: {**{(kind,): count for kind, count in self.hits.items()}, ("miss",): self.misses},
+            ("result",),
+        )
+
+    def get(self, user_id, message, context=()):
+        """Cached reply to message, given the messages sent before it (context), or None."""
+        if self.backend is None:
+            return None
+        prompt = normalize_prompt(message)
+        response, kind = self.backend.get(self._scope(user_id, prompt, context), prompt)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits[kind] += 1
+        return response
+
+    def set(self, user_id, message, response, context=()):
+        if self.backend is not None and response:
+            prompt = normalize_prompt(message)
+            self.backend.set(self._scope(user_id, prompt, context), prompt, response)
+
+    def stats(self):
+        lookups = self.misses + sum(self.hits.values())
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else 0.0,
+        }
+
+    def _scope(self, user_id, prompt, context):
+        user = user_id if self.per_user else None
+        if len(prompt.split()) > FOLLOW_UP_WORDS:
+            return user, None
+        reply_to = next((turn["content"] for turn in reversed(context) if turn["role"] == "assistant"), None)
+        if reply_to is None:
+            return user, None
+        return user, hashlib.blake2b(reply_to.encode(), digest_size=16).hexdigest()
+
+
+completion_cache = CompletionCache()
@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class CredentialsBusy(RuntimeError):
+    pass
+
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # OpenSSL needs about 128 * r * (n + p + 2) bytes; leave headroom over its 32 MiB default cap
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=128 * r * (n + p + 2) + 2 ** 20, dklen=KEY_BYTES)
+
+
+class Credentials:
+    """Hashes and verifies passwords with scrypt on a small thread pool, off the event loop.
+
+    hashlib.scrypt releases the GIL, so threads run in parallel. Hashes are
+    stored as ``scrypt$n$r$p$salt$hash``; verify() reports when a stored hash
+    was made with other parameters (or is a legacy plaintext value) so the
+    caller can rehash it on a successful login.
+    """
+
+    def __init__(self):
+        self.n = 2 ** 14
+        self.r = 8
+        self.p = 1
+        self.max_workers = 4
+        self.queue_timeout = 5
+        self.executor = None
+        self._slots = asyncio.Semaphore(64)
+        self._dummy = None
+
+    def init_app(self, app):
+        self.n = app.config.get("PASSWORD_SCRYPT_N", 2 ** 14)
+        self.r = app.config.get("PASSWORD_SCRYPT_R", 8)
+        self.p = app.config.get("PASSWORD_SCRYPT_P", 1)
+        self.max_workers = app.config.get("PASSWORD_HASH_THREADS") or min(4, os.cpu_count() or 1)
+        self.queue_timeout = app.config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 5)
+        self._slots = asyncio.Semaphore(app.config.get("PASSWORD_HASH_MAX_PENDING", 64))
+        self._dummy = None
+        app.extensions["credentials"] = self
+
+        @app.after_serving
+        async def stop_credentials_pool():
+            executor, self.executor = self.executor, None
+            if executor is not None:
+                await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        n, r, p = self.n, self.r, self.p
+        key = await self._run(_scrypt, password, salt, n, r, p)
+        return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+    async def verify(self, password, stored):
+        """Return (matches, needs_rehash)."""
+        try:
+            scheme, n, r, p, salt, key = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            salt, key = _b64decode(salt), _b64decode(key)
+        except ValueError:
+            # Rows written before hashing was added hold the password itself
+            return hmac.compare_digest(password.encode(), stored.encode()), True
+        if scheme != SCHEME:
+            return False, False
+        candidate = await self._run(_scrypt, password, salt, n, r, p)
+        matches = hmac.compare_digest(candidate, key)
+        return matches, matches and (n, r, p) != (self.n, self.r, self.p)
+
+    async def verify_missing(self, password):
+        """Spend as long as a real verify, so unknown usernames can't be told apart by timing."""
+        if self._dummy is None:
+            self._dummy = await self.hash(os.urandom(SALT_BYTES).hex())
+        await self.verify(password, self._dummy)
+        return False
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise CredentialsBusy("Too many password operations in progress.")
+        try:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="credentials")
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self._slots.release()
+
+
+credentials = Credentials()
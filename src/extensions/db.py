@@ -1,19 +1,71 @@
-from quart_sqlalchemy import SQLAlchemyConfig
-from quart_sqlalchemy.framework import QuartSQLAlchemy
-
-db = QuartSQLAlchemy(
-    config=SQLAlchemyConfig(
-        binds=dict(
-            default=dict(
-                engine=dict(
-                    url="sqlite:///",  # or your config string
-                    echo=True,
-                    connect_args=dict(check_same_thread=False),
-                ),
-                session=dict(
-                    expire_on_commit=False,
-                ),
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url):
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+class Database:
+    """Async SQLAlchemy engine and session factory, configured from the app config.
+
+    Column types and helpers (db.Column, db.Integer, db.func, ...) resolve to
+    sqlalchemy / sqlalchemy.orm so model definitions read like Flask-SQLAlchemy.
+    Use sessions as ``async with db.session() as session: ...``.
+    """
+
+    def __init__(self):
+        self.Model = orm.declarative_base()
+        self.metadata = self.Model.metadata
+        self.engine = None
+        self.session = None
+        self._before_dispose = []
+
+    def __getattr__(self, name):
+        for module in (sa, orm):
+            if hasattr(module, name):
+                return getattr(module, name)
+        raise AttributeError(name)
+
+    def init_app(self, app):
+        url = async_url(app.config["SQLALCHEMY_DATABASE_URI"])
+        options = dict(echo=app.config.get("SQLALCHEMY_ECHO", False))
+        if not url.startswith("sqlite"):
+            options.update(
+                pool_size=app.config.get("SQLALCHEMY_POOL_SIZE", 10),
+                max_overflow=app.config.get("SQLALCHEMY_MAX_OVERFLOW", 20),
+                pool_recycle=app.config.get("SQLALCHEMY_POOL_RECYCLE", 1800),
+                pool_timeout=app.config.get("SQLALCHEMY_POOL_TIMEOUT", 30),
+                pool_pre_ping=True,
             )
-        )
-    )
-)
\ No newline at end of file
+        self.engine = create_async_engine(url, **options)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+        app.extensions["sqlalchemy"] = self
+        self._before_dispose = []
+
+        @app.after_serving
+        async def dispose_engine():
+            for func in self._before_dispose:
+                await func()
+            await self.engine.dispose()
+
+    def before_dispose(self, func):
+        """Run func (a coroutine function) at shutdown while the engine, and every extension registered after it, still work."""
+        self._before_dispose.append(func)
+        return func
+
+    async def create_all(self):
+        async with self.engine.begin() as connection:
+            await connection.run_sync(self.metadata.create_all)
+
+
+db = Database()
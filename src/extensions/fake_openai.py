@@ -0,0 +1,70 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+
+class FakeUpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Fake upstream returned {status_code}")
+        self.status_code = status_code
+        self.response = None
+
+
+class FakeAsyncOpenAI:
+    """Stand-in for AsyncOpenAI that answers locally after a fixed delay.
+
+    Only the surface used by AIClient is implemented (chat.completions.create
+    and close), which is enough to load test the server without network access.
+    error_rate makes that fraction of calls fail with a retryable 429 or 503.
+    """
+
+    def __init__(self, latency=0.5, error_rate=0.0):
+        self.chat = SimpleNamespace(completions=FakeCompletions(latency, error_rate))
+
+    async def close(self):
+        pass
+
+
+class FakeCompletions:
+    def __init__(self, latency, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+
+    async def create(self, model, messages, stream=False, stream_options=None, **kwargs):
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeUpstreamError(random.choice([429, 503]))
+        prompt = messages[-1]["content"] if messages else ""
+        content = f"Echo: {prompt}"
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt.split()),
+            completion_tokens=len(content.split()),
+            total_tokens=len(prompt.split()) + len(content.split()),
+        )
+        if stream:
+            include_usage = bool(stream_options and stream_options.get("include_usage"))
+            return self._stream(model, content, usage if include_usage else None)
+
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=SimpleNamespace(role="assistant", content=content))],
+            usage=usage,
+        )
+
+    async def _stream(self, model, content, usage=None):
+        # Spread the configured latency over the tokens so total time matches the non-streaming path
+        tokens = content.split(" ")
+        delay = self.latency / len(tokens)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(delay)
+            text = token if i == 0 else " " + token
+            yield SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=text), finish_reason=None)],
+            )
+        yield SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=None), finish_reason="stop")],
+        )
+        if usage is not None:
+            yield SimpleNamespace(model=model, choices=[], usage=usage)
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import time
+from .backplane import RedisError, read_reply
+
+
+def _encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RedisError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, bool):
+        return b"+OK\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode_reply(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeRedisServer:
+    """Stand-in for a Redis server speaking just the commands the backplane uses.
+
+    PING, AUTH, SELECT, PUBLISH, SUBSCRIBE, UNSUBSCRIBE, INCR, EXPIRE, GET,
+    SET and DEL over RESP2, with keys in one dict. Enough to run several
+    workers against BACKPLANE_URL=redis://127.0.0.1:<port> without a real
+    Redis: python -m src.extensions.fake_redis --port 6390
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.subscribers = {}
+        self.clients = set()
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._serve, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        channels = set()
+        self.clients.add(writer)
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    break
+                name, args = command[0].upper(), command[1:]
+                if name in (b"SUBSCRIBE", b"UNSUBSCRIBE"):
+                    for channel in args:
+                        if name == b"SUBSCRIBE":
+                            channels.add(channel)
+                            self.subscribers.setdefault(channel, set()).add(writer)
+                        else:
+                            channels.discard(channel)
+                            self.subscribers.get(channel, set()).discard(writer)
+                        writer.write(_encode_reply([name.lower(), channel, len(channels)]))
+                    continue
+                writer.write(_encode_reply(self._execute(name, args)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for channel in channels:
+                self.subscribers.get(channel, set()).discard(writer)
+            self.clients.discard(writer)
+            writer.close()
+
+    def _execute(self, name, args):
+        if name == b"PING":
+            return b"PONG"
+        if name in (b"AUTH", b"SELECT"):
+            return True
+        if name == b"PUBLISH":
+            channel, payload = args
+            receivers = list(self.subscribers.get(channel, ()))
+            for writer in receivers:
+                writer.write(_encode_reply([b"message", channel, payload]))
+            return len(receivers)
+        if name == b"INCR":
+            value = int(self._get(args[0]) or 0) + 1
+            self.data[args[0]] = str(value).encode()
+            return value
+        if name == b"EXPIRE":
+            if self._get(args[0]) is None:
+                return 0
+            self.expires[args[0]] = time.monotonic() + int(args[1])
+            return 1
+        if name == b"GET":
+            return self._get(args[0])
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            self.expires.pop(args[0], None)
+            return True
+        if name == b"DEL":
+            removed = sum(self.data.pop(key, None) is not None for key in args)
+            for key in args:
+                self.expires.pop(key, None)
+            return removed
+        return RedisError(f"ERR unknown command '{name.decode()}'")
+
+    def _get(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            del self.expires[key]
+        return self.data.get(key)
+
+
+async def _main(host, port):
+    server = FakeRedisServer()
+    port = await server.start(host, port)
+    print(f"Fake Redis listening on {host}:{port}")
+    await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=FakeRedisServer.__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port))
@@ -0,0 +1,255 @@
+import bisect
+import time
+from quart import Response, g, request, websocket
+from sqlalchemy import event
+
+# Seconds; covers fast DB queries up to slow upstream completions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._unlabelled = self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabelled.inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabelled.inc(amount)
+
+    def dec(self, amount=1):
+        self._unlabelled.dec(amount)
+
+    def set(self, value):
+        self._unlabelled.set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bound plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled.observe(value)
+
+    def _render_child(self, values, child):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            total += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {total}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+
+class Metrics:
+    """In-process metrics in the Prometheus text format, served on /metrics.
+
+    Recording is a dict lookup plus an integer increment, so hot paths call
+    it unconditionally; values that already live elsewhere (queue depths,
+    cache sizes) are read by collectors only when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self.registry = []
+        self.collectors = {}
+        self.http_request_seconds = self.histogram(
+            "http_request_seconds", "HTTP request latency until the response is returned.", ("method", "route", "status"))
+        self.websocket_connections = self.gauge(
+            "websocket_connections", "Open websocket connections.", ("route",))
+        self.websocket_connection_seconds = self.histogram(
+            "websocket_connection_seconds", "Websocket connection lifetime.", ("route",),
+            buckets=(1, 5, 15, 60, 300, 900, 3600))
+        self.websocket_message_seconds = self.histogram(
+            "websocket_message_seconds", "Time to handle one websocket message.", ("route", "type"))
+        self.upstream_request_seconds = self.histogram(
+            "upstream_request_seconds", "Model completion latency.", ("model", "mode"))
+        self.upstream_first_token_seconds = self.histogram(
+            "upstream_first_token_seconds", "Time to first streamed token.", ("model",))
+        self.upstream_tokens = self.counter(
+            "upstream_tokens_total", "Tokens reported by the model.", ("model", "kind"))
+        self.upstream_errors = self.counter(
+            "upstream_errors_total", "Failed upstream calls, including retried ones.", ("status",))
+        self.db_query_seconds = self.histogram(
+            "db_query_seconds", "Database statement execution time.", ("operation",))
+        self.audio_bytes = self.counter(
+            "audio_bytes_total", "PCM bytes received on /ws/audio; rate() gives bytes/sec.")
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name, documentation, collect, labelnames=()):
+        """Add a gauge refreshed at scrape time; collect() returns {label values tuple: value}.
+
+        Registering the same name again replaces the collector, so init_app can be called per app.
+        """
+        gauge = Gauge(name, documentation, labelnames)
+        self.collectors[name] = (gauge, collect)
+        return gauge
+
+    def _register(self, metric):
+        self.registry.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.registry:
+            lines.extend(metric.render())
+        for gauge, collect in list(self.collectors.values()):
+            for values, value in collect().items():
+                gauge.labels(*values).set(value)
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+    def init_app(self, app):
+        app.extensions["metrics"] = self
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+
+        @app.before_request
+        async def start_request_timer():
+            g.metrics_start = time.perf_counter()
+
+        @app.after_request
+        async def record_request(response):
+            start = g.pop("metrics_start", None)
+            if start is not None:
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                self.http_request_seconds.labels(request.method, route, response.status_code).observe(
+                    time.perf_counter() - start)
+            return response
+
+        @app.before_websocket
+        async def open_websocket():
+            g.metrics_start = time.perf_counter()
+            self.websocket_connections.labels(websocket.url_rule.rule).inc()
+
+        @app.teardown_websocket
+        async def close_websocket(exc):
+            start = g.pop("metrics_start", None)
+            if start is not None:
+                route = websocket.url_rule.rule
+                self.websocket_connections.labels(route).dec()
+                self.websocket_connection_seconds.labels(route).observe(time.perf_counter() - start)
+
+        engine = app.extensions.get("sqlalchemy")
+        if engine is not None and engine.engine is not None:
+            self.instrument_engine(engine.engine.sync_engine)
+
+        async def metrics_view():
+            return Response(self.render(), content_type=CONTENT_TYPE)
+
+        app.add_url_rule(app.config.get("METRICS_PATH", "/metrics"), "metrics", metrics_view)
+
+    def instrument_engine(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+            context.metrics_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def record_query(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context.metrics_start
+            operation = statement.lstrip().partition(" ")[0].upper()
+            self.db_query_seconds.labels(operation).observe(elapsed)
+
+
+metrics = Metrics()
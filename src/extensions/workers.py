@@ -0,0 +1,79 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+
+class WorkerPoolFull(RuntimeError):
+    pass
+
+
+class WorkerPool:
+    """Process pool for CPU-bound work (audio decode, resample, synthesis) off the event loop.
+
+    PCM payloads are passed through shared memory instead of being pickled;
+    the callable receives a memoryview over the segment and must not keep a
+    reference to it after returning. Until the app is serving, work runs
+    inline so scripts and the CLI don't need worker processes.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.max_workers = None
+        self.queue_timeout = None
+        self._slots = None
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("WORKER_POOL_SIZE") or os.cpu_count()
+        self.queue_timeout = app.config.get("WORKER_POOL_QUEUE_TIMEOUT", 5)
+        self._slots = asyncio.Semaphore(app.config.get("WORKER_POOL_MAX_PENDING", 64))
+        app.extensions["worker_pool"] = self
+
+        @app.before_serving
+        async def start_worker_pool():
+            # Spawn rather than fork: forking a process that runs an event loop and threads is unsafe
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_context("spawn"))
+
+        @app.after_serving
+        async def stop_worker_pool():
+            executor, self.executor = self.executor, None
+            if executor is not None:
+                await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def submit(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise WorkerPoolFull("Worker pool queue is full.")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def submit_pcm(self, fn, pcm, *args):
+        """Run fn(pcm_view, *args) in a worker with pcm shared rather than pickled."""
+        if self.executor is None or not pcm:
+            return fn(memoryview(pcm), *args)
+        shm = shared_memory.SharedMemory(create=True, size=len(pcm))
+        try:
+            shm.buf[:len(pcm)] = pcm
+            return await self.submit(_call_with_shared_pcm, fn, shm.name, len(pcm), *args)
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _call_with_shared_pcm(fn, name, size, *args):
+    # Workers share the parent's resource tracker, so attaching here doesn't change who unlinks the segment
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf[:size]
+    try:
+        return fn(view, *args)
+    finally:
+        view.release()
+        shm.close()
+
+
+worker_pool = WorkerPool()
@@ -1,45 +1,79 @@
-from quart import Quart, websocket
-from quart_sqlalchemy import SQLAlchemyConfig
-from quart_sqlalchemy.framework import QuartSQLAlchemy
+import time
+
+_import_start = time.perf_counter()
+
+from quart import Quart
 from quart.cli import with_appcontext
-from config import Config
-from dotenv import load_dotenv
+from config import Config  # loads .env once, before Config reads the environment
 from src.modules import register_blueprints
+from src.modules import register_services
 from src.modules import register_websockets
 from src.extensions import register_extensions
 from src.extensions.db import db
+from src.extensions.metrics import metrics
+from src.utils.logger import setup_logger
+from src.utils.serialization import FastJSONProvider
+from src.utils.stats import PhaseTimer
 
 import click
 import os
 import asyncio
 
-load_dotenv()
+_import_seconds = time.perf_counter() - _import_start
 
 def create_app():
-    app = Quart(__name__)
-    app.config.from_object(Config)
-    db.init_app(app)
+    startup = PhaseTimer()
+    startup.record("imports", _import_seconds)
 
-    # Now pass db to your modules
-    register_extensions(app)
-    register_blueprints(app)
-    register_websockets(app)
+    with startup.phase("config"):
+        app = Quart(__name__)
+        app.config.from_object(Config)
 
+    with startup.phase("logging"):
+        setup_logger(
+            "src",
+            file=app.config["LOG_FILE"],
+            level=app.config["LOG_LEVEL"],
+            terminal=app.config["LOG_TERMINAL"],
+            json_format=app.config["LOG_JSON"],
+            queued=app.config["LOG_QUEUE"],
+            clear=app.config["LOG_CLEAR"],
+            sample_rates={"src.audio.frames": app.config["LOG_AUDIO_FRAME_SAMPLE"]},
+        )
+    if app.config["JSON_FAST"] and FastJSONProvider.available:
+        app.json = FastJSONProvider(app)
 
-    register_extensions(app)
-    register_blueprints(app)
-    register_websockets(app)
+    # Each subsystem is registered exactly once; clients (e.g. OpenAI) are built on first use
+    with startup.phase("database"):
+        db.init_app(app)
+    with startup.phase("extensions"):
+        register_extensions(app)
+    with startup.phase("services"):
+        register_services(app)
+    with startup.phase("blueprints"):
+        register_blueprints(app)
+    with startup.phase("websockets"):
+        register_websockets(app)
+
+    app.extensions["startup"] = startup
+    metrics.register_collector(
+        "startup_phase_seconds", "Time spent in each create_app phase, including module imports.",
+        lambda: {(name,): seconds for name, seconds in startup.phases.items()}, ("phase",))
+    app.logger.info(f"Startup: {startup.summary()}")
 
     @click.command("create-db")
     @with_appcontext
     def create_db():
-        db_uri = Config.SQLALCHEMY_DATABASE_URI
+        # Only this command needs sqlalchemy_utils, so don't pay for it at app startup
+        from sqlalchemy_utils import database_exists, create_database
+
+        db_uri = app.config["SQLALCHEMY_DATABASE_URI"]
         print(f"DB_URI: {db_uri}")
 
         try:
             if not database_exists(db_uri):
                 create_database(db_uri)
-                print(f"Database {Config.DB_NAME} created!")
+                print(f"Database {db_uri.rsplit('/', 1)[-1]} created!")
             else:
                 print("Database already exists.")
         except Exception as e:
@@ -47,7 +81,7 @@ def create_app():
             return
 
         try:
-            db.create_all()
+            asyncio.run(db.create_all())
             print("Tables created!")
         except Exception as e:
             print(f"Failed to create tables: {e}")
@@ -1,13 +1,30 @@
 from quart import Blueprint
 from .users.routes import user_bp
 from .chats.routes import chat_bp
+from .chats.context import chat_context
+from .chats.history import history_cache
+from .chats.models import Chat
+from .chats.writer import chat_writer
 from .chats.sockets import chat_ws
+from .tasks.calendar import calendar_cache
+from .tasks.routes import events_bp, tasks_bp
+from .audio.phrase_cache import phrase_cache
 from .audio.sockets import audio_ws
 
+def register_services(app):
+    # In dependency order: the caches sit on the backplane, the writer on the database and history_cache
+    history_cache.init_app(app)
+    chat_context.init_app(app)
+    chat_writer.init_app(app, Chat)
+    calendar_cache.init_app(app)
+    phrase_cache.init_app(app)
+
 def register_blueprints(app):
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
+    app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
 
 def register_websockets(app):
-    app.add_websocket('/ws/chat', chat_ws)
-    app.add_websocket('/ws/audio', audio_ws)
\ No newline at end of file
+    app.add_websocket('/ws/chat', view_func=chat_ws)
+    app.add_websocket('/ws/audio', view_func=audio_ws)
\ No newline at end of file
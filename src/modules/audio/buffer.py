@@ -0,0 +1,81 @@
+import asyncio
+
+
+class RingBuffer:
+    """Fixed-size byte ring for streaming PCM.
+
+    The backing bytearray is allocated once; writes copy straight into it and
+    readers get memoryviews over it (two views when the data wraps), so frames
+    are never copied into intermediate objects. Writers wait while the ring is
+    full, which is what pushes back on a client sending faster than we consume.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self.size = 0
+        self.written = 0
+        self.closed = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def free(self):
+        return self.capacity - self.size
+
+    @property
+    def read_position(self):
+        """Absolute stream offset of the oldest unconsumed byte."""
+        return self.written - self.size
+
+    async def write(self, data):
+        data = memoryview(data).cast("B")
+        async with self._changed:
+            while data:
+                await self._changed.wait_for(lambda: self.free or self.closed)
+                if self.closed:
+                    return
+                chunk = data[:self.free]
+                self._copy_in(chunk)
+                data = data[len(chunk):]
+                self._changed.notify_all()
+
+    def peek(self, n, offset=0):
+        """Return memoryviews over n unconsumed bytes starting offset bytes in, without copying."""
+        n = max(0, min(n, self.size - offset))
+        start = (self._start + offset) % self.capacity
+        first = min(n, self.capacity - start)
+        views = [self._view[start:start + first]]
+        if n > first:
+            views.append(self._view[:n - first])
+        return views
+
+    async def consume(self, n):
+        async with self._changed:
+            n = min(n, self.size)
+            self._start = (self._start + n) % self.capacity
+            self.size -= n
+            self._changed.notify_all()
+
+    async def wait_for(self, predicate):
+        async with self._changed:
+            await self._changed.wait_for(lambda: predicate() or self.closed)
+
+    async def notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def close(self):
+        async with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+    def _copy_in(self, data):
+        end = (self._start + self.size) % self.capacity
+        first = min(len(data), self.capacity - end)
+        self._view[end:end + first] = data[:first]
+        if len(data) > first:
+            self._view[:len(data) - first] = data[first:]
+        self.size += len(data)
+        self.written += len(data)
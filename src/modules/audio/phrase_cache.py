@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from src.extensions.metrics import metrics
+
+
+class PhraseCache:
+    """Content-addressed on-disk cache of synthesized phrases.
+
+    A phrase is stored under the sha256 of its voice, sample rate, encoding
+    and whitespace-normalized text, so frequent replies ("Done.", "Sure, I've
+    added that.") are synthesized once. Hits are memory-mapped and streamed
+    from the page cache rather than read into memory. Files are evicted least
+    recently used once the directory passes TTS_CACHE_MAX_BYTES. Workers may
+    share the directory: writes are atomic renames, and a file another worker
+    evicted is just a miss. Until init_app runs every lookup misses.
+
+    All file work (the directory scan that builds the index, opening and
+    mapping hits, writes and evictions) runs in the default executor; the
+    index lock is only ever taken there, never on the event loop.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.max_bytes = 0
+        self.index = None
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.logger = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config.get("TTS_CACHE_DIR") or None
+        self.max_bytes = app.config.get("TTS_CACHE_MAX_BYTES", 256 * 2 ** 20)
+        self.logger = app.logger
+        # Scanned when the app starts serving (or by the first lookup or store before that), off the event loop
+        self.index = None
+        self.total_bytes = 0
+        metrics.register_collector(
+            "tts_phrase_cache_lookups", "Synthesized phrase cache lookups since start.",
+            lambda: {("hit",): self.hits, ("miss",): self.misses}, ("result",))
+
+        @app.before_serving
+        async def index_phrase_cache():
+            if self.directory is not None:
+                future = asyncio.get_running_loop().run_in_executor(None, self._scan)
+                future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def key(text, voice, sample_rate, encoding):
+        phrase = " ".join(text.split())
+        return hashlib.sha256(f"{voice}\0{sample_rate}\0{encoding}\0{phrase}".encode()).hexdigest()
+
+    async def open(self, key):
+        """Return a read-only mmap of the phrase (the caller closes it), or None on a miss."""
+        if self.directory is None:
+            return None
+        audio = await asyncio.get_running_loop().run_in_executor(None, self._open, key)
+        if audio is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return audio
+
+    def store(self, key, audio):
+        """Write the phrase in the background; the reply doesn't wait for the disk."""
+        if self.directory is None or not audio:
+            return
+        future = asyncio.get_running_loop().run_in_executor(None, self._write, key, bytes(audio))
+        future.add_done_callback(self._log_failure)
+
+    def _open(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file, which mmap refuses
+            return None
+        with self._lock:
+            self._load_index()
+            if key not in self.index:
+                # Written by another worker
+                self.index[key] = len(audio)
+                self.total_bytes += len(audio)
+            self.index.move_to_end(key)
+        return audio
+
+    def _scan(self):
+        with self._lock:
+            self._load_index()
+
+    def _write(self, key, audio):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(audio)
+        os.replace(temp, path)
+        with self._lock:
+            self._load_index()
+            self.total_bytes += len(audio) - self.index.pop(key, 0)
+            self.index[key] = len(audio)
+            evicted = []
+            while self.total_bytes > self.max_bytes and len(self.index) > 1:
+                old_key, size = self.index.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def _load_index(self):
+        if self.index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        # Oldest first, so restarts keep roughly the same eviction order
+        entries.sort()
+        self.index = OrderedDict((name, size) for _, name, size in entries)
+        self.total_bytes = sum(size for _, _, size in entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _log_failure(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.warning(f"Phrase cache I/O failed: {future.exception()}")
+
+
+phrase_cache = PhraseCache()
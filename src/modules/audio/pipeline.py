@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+import numpy as np
+from quart import current_app
+from src.extensions.ai_client import INTERACTIVE
+from src.extensions.backplane import backplane
+from src.extensions.metrics import metrics
+from src.extensions.workers import worker_pool
+from src.modules.audio.buffer import RingBuffer
+from src.modules.audio.processing import prepare_pcm
+from src.modules.audio.speech import SpeechOutput
+from src.modules.audio.stt import get_stt_backend
+from src.modules.audio.vad import ConnectionStats, VoiceActivityDetector
+from src.modules.chats.models import Chat
+from src.modules.chats.schemas import dump_chat
+
+# Per-frame records; sampled by the logging setup (LOG_AUDIO_FRAME_SAMPLE)
+frame_logger = logging.getLogger("src.audio.frames")
+
+
+class AudioPipeline:
+    """Per-connection ingest: websocket -> ring buffer -> VAD segmenter -> speech-to-text.
+
+    Binary websocket messages are raw mono PCM16 at AUDIO_SAMPLE_RATE. The
+    segmenter classifies whole blocks of frames at a time and only passes
+    speech on, padded by AUDIO_VAD_PADDING_MS on both sides; an utterance ends
+    after AUDIO_VAD_SILENCE_MS of silence, at a {"type": "end"} message, or at
+    AUDIO_MAX_UTTERANCE_SECONDS. Every stage hands off through a bounded
+    buffer, so memory per connection is fixed no matter how fast the client
+    sends.
+
+    With send_bytes, replies are spoken back (see SpeechOutput): when the
+    connection has a user_id each transcript is answered as a chat from that
+    user, and {"type": "speak", "text": ...} speaks arbitrary text. A
+    connection with a user_id also receives the {"type": "notify", ...}
+    messages sent to that user through the backplane. At most TTS_MAX_AHEAD
+    replies are pending at a time: a "speak" beyond that is refused with a
+    429 error, and a transcript waits for room, which slows ingest down.
+    """
+
+    def __init__(self, config, send, send_bytes=None, user_id=None):
+        self.sample_rate = config.get("AUDIO_SAMPLE_RATE", 16000)
+        self.stt_sample_rate = config.get("STT_SAMPLE_RATE", self.sample_rate)
+        self.vad = VoiceActivityDetector(
+            self.sample_rate,
+            frame_ms=config.get("AUDIO_VAD_FRAME_MS", 20),
+            energy_threshold=config.get("AUDIO_VAD_ENERGY_THRESHOLD", 500.0),
+            zcr_threshold=config.get("AUDIO_VAD_ZCR_THRESHOLD", 0.5),
+        )
+        frame_bytes = self.vad.frame_bytes
+        frames_per_second = self.sample_rate * 2 / frame_bytes
+
+        def to_bytes(seconds):
+            return max(1, int(seconds * frames_per_second)) * frame_bytes
+
+        # Keep the ring frame-aligned so blocks only ever wrap on a frame boundary
+        self.ring = RingBuffer(to_bytes(config.get("AUDIO_RING_BUFFER_SECONDS", 10)))
+        self.block_bytes = to_bytes(config.get("AUDIO_VAD_BLOCK_MS", 200) / 1000)
+        self.padding = to_bytes(config.get("AUDIO_VAD_PADDING_MS", 200) / 1000)
+        self.silence = to_bytes(config.get("AUDIO_VAD_SILENCE_MS", 400) / 1000)
+        max_seconds = config.get("AUDIO_MAX_UTTERANCE_SECONDS", 8)
+        if max_seconds <= 0:
+            raise ValueError(f"AUDIO_MAX_UTTERANCE_SECONDS must be positive, got {max_seconds}.")
+        self.max_utterance = min(to_bytes(max_seconds), self.ring.capacity - self.block_bytes - self.padding)
+        if self.max_utterance < self.block_bytes:
+            raise ValueError(
+                f"Audio settings leave room for a {self.max_utterance / (self.sample_rate * 2):.3f}s utterance, "
+                f"shorter than one {self.block_bytes / (self.sample_rate * 2):.3f}s VAD block: raise "
+                "AUDIO_RING_BUFFER_SECONDS or AUDIO_MAX_UTTERANCE_SECONDS, or lower AUDIO_VAD_BLOCK_MS "
+                "or AUDIO_VAD_PADDING_MS."
+            )
+        self.segments = asyncio.Queue(maxsize=config.get("AUDIO_SEGMENT_QUEUE_SIZE", 2))
+        self.stt = get_stt_backend(config.get("STT_BACKEND", "stub"))
+        self.send = send
+        self.user_id = user_id
+        self.speech = None
+        if send_bytes is not None and config.get("TTS_ENABLED", True):
+            self.speech = SpeechOutput(config, send, send_bytes)
+        self.speaking = set()
+        self.reply_slots = asyncio.Semaphore(config.get("TTS_MAX_AHEAD", 2))
+        self.notifications = asyncio.Queue(maxsize=config.get("WS_SEND_QUEUE_SIZE", 64))
+        self.boundaries = deque()
+        self.stats = ConnectionStats()
+
+        self.scan_position = 0
+        self.segment_start = None
+        self.speech_end = 0
+        self.speech_end_at = 0.0
+
+    async def run(self, websocket):
+        workers = [
+            asyncio.create_task(self._segment_loop()),
+            asyncio.create_task(self._transcribe_loop()),
+        ]
+        if self.speech is not None:
+            workers.append(asyncio.create_task(self.speech.run()))
+        # Runs until the connection closes, so it's cancelled rather than awaited with the workers
+        notifier = None
+        if self.user_id:
+            backplane.subscribe(f"user:{self.user_id}", self._push)
+            notifier = asyncio.create_task(self._notify_loop())
+        try:
+            await self._receive_loop(websocket)
+            await self.ring.close()
+            await asyncio.gather(*workers[:2])
+            # Only now is the set final: the transcriber adds a reply for each transcript until it stops
+            await asyncio.gather(*self.speaking)
+            if self.speech is not None:
+                await self.speech.close()
+            await asyncio.gather(*workers)
+        finally:
+            if notifier is not None:
+                backplane.unsubscribe(f"user:{self.user_id}", self._push)
+                workers.append(notifier)
+            speaking = list(self.speaking)
+            for task in workers + speaking:
+                task.cancel()
+            await asyncio.gather(*workers, *speaking, return_exceptions=True)
+            if self.speech is not None:
+                self.speech.discard()
+            current_app.logger.info(f"Audio stream stats: {self.stats.summary()}")
+
+    async def _receive_loop(self, websocket):
+        while True:
+            data = await websocket.receive()
+            if isinstance(data, bytes):
+                self.stats.bytes_in += len(data)
+                metrics.audio_bytes.inc(len(data))
+                frame_logger.debug("Received %d audio bytes", len(data))
+                if self.ring.free < len(data):
+                    current_app.logger.debug("Audio ring buffer full, applying back-pressure.")
+                await self.ring.write(data)
+                continue
+
+            try:
+                message = json.loads(data)
+            except ValueError:
+                await self.send({"type": "error", "status": 400, "error": "Invalid JSON."})
+                continue
+            if not isinstance(message, dict):
+                await self.send({"type": "error", "status": 400, "error": "Invalid message format."})
+                continue
+            if message.get("type") == "end":
+                self.boundaries.append(self.ring.written)
+                await self.ring.notify()
+            elif message.get("type") == "stats":
+                await self.send({"type": "stats", **self.stats.summary()})
+            elif message.get("type") == "speak" and self.speech is not None and message.get("text"):
+                if self.reply_slots.locked():
+                    await self.send({"type": "error", "status": 429, "error": "Too many replies pending."})
+                    continue
+                # Don't hold up audio ingest while the text is synthesized
+                await self._speak(self.speech.say(str(message["text"])))
+            elif message.get("type") == "close":
+                return
+
+    def _push(self, message):
+        # Runs on the backplane's reader; never block it on a slow client
+        if self.notifications.full():
+            current_app.logger.warning("Audio websocket notification queue full, dropped a notification.")
+            return
+        self.notifications.put_nowait(message)
+
+    async def _notify_loop(self):
+        while True:
+            await self.send(await self.notifications.get())
+
+    def _block_ready(self):
+        return bool(self.boundaries) or self.ring.written - self.scan_position >= self.block_bytes
+
+    async def _segment_loop(self):
+        frame_bytes = self.vad.frame_bytes
+        while True:
+            await self.ring.wait_for(self._block_ready)
+            flush = False
+            if self.boundaries and self.boundaries[0] - self.scan_position < self.block_bytes:
+                end = max(self.boundaries.popleft(), self.scan_position)
+                flush = True
+            elif self.ring.written - self.scan_position >= self.block_bytes:
+                end = self.scan_position + self.block_bytes
+            else:
+                end = self.ring.written
+                flush = True
+
+            end -= (end - self.scan_position) % frame_bytes
+            if end > self.scan_position:
+                await self._scan(end)
+            if flush and self.segment_start is not None:
+                await self._emit(self.segment_start, min(self.speech_end + self.padding, self.scan_position))
+
+            if self.ring.closed and not self.boundaries and self.ring.written - self.scan_position < frame_bytes:
+                await self.segments.put(None)
+                return
+
+    async def _scan(self, end):
+        frame_bytes = self.vad.frame_bytes
+        offset = self.scan_position - self.ring.read_position
+        views = self.ring.peek(end - self.scan_position, offset)
+        mask = np.concatenate([self.vad.speech_mask(view) for view in views])
+        self.stats.frames_in += len(mask)
+
+        speech = np.flatnonzero(mask)
+        if speech.size:
+            # Group speech frames into runs separated by more than the silence window
+            silence_frames = self.silence // frame_bytes
+            breaks = np.flatnonzero(np.diff(speech) - 1 > silence_frames)
+            run_starts = np.concatenate(([speech[0]], speech[breaks + 1]))
+            run_ends = np.concatenate((speech[breaks], [speech[-1]])) + 1
+            now = time.perf_counter()
+            for run_start, run_end in zip(run_starts.tolist(), run_ends.tolist()):
+                first = self.scan_position + run_start * frame_bytes
+                if self.segment_start is not None and first - self.speech_end > self.silence:
+                    await self._emit(self.segment_start, min(self.speech_end + self.padding, end))
+                if self.segment_start is None:
+                    self.segment_start = max(self.ring.read_position, first - self.padding)
+                self.speech_end = self.scan_position + run_end * frame_bytes
+                self.speech_end_at = now
+
+        self.scan_position = end
+        if self.segment_start is not None and self.scan_position - self.speech_end > self.silence:
+            await self._emit(self.segment_start, min(self.speech_end + self.padding, self.scan_position))
+        elif self.segment_start is not None and self.scan_position - self.segment_start >= self.max_utterance:
+            await self._emit(self.segment_start, self.scan_position)
+            self.segment_start = self.scan_position
+
+        if self.segment_start is None:
+            # Silence: drop it, keeping just enough to pre-pad the next utterance
+            await self._drop_until(self.scan_position - self.padding)
+
+    async def _drop_until(self, position):
+        dropped = position - self.ring.read_position
+        if dropped > 0:
+            self.stats.frames_dropped += dropped // self.vad.frame_bytes
+            await self.ring.consume(dropped)
+
+    async def _emit(self, start, end):
+        self.segment_start = None
+        await self._drop_until(start)
+        if end <= start:
+            return
+        # The one copy per utterance: hand the backend an immutable buffer and free the ring
+        pcm = b"".join(self.ring.peek(end - start))
+        await self.ring.consume(end - start)
+        self.stats.segments += 1
+        await self.segments.put((pcm, self.speech_end_at))
+
+    async def _transcribe_loop(self):
+        while True:
+            item = await self.segments.get()
+            if item is None:
+                return
+            pcm, speech_end_at = item
+            pcm = await worker_pool.submit_pcm(prepare_pcm, pcm, self.sample_rate, self.stt_sample_rate)
+            text = await self.stt.transcribe(pcm, self.stt_sample_rate)
+            elapsed = time.perf_counter() - speech_end_at
+            self.stats.segment_latency.record(elapsed)
+            metrics.websocket_message_seconds.labels("/ws/audio", "segment").observe(elapsed)
+            if text:
+                await self.send({"type": "transcript", "text": text})
+                if self.speech is not None and self.user_id:
+                    # Answered alongside ingest; the speech lock keeps replies in transcript order
+                    await self._speak(self._answer(text))
+
+    async def _speak(self, coro):
+        try:
+            await self.reply_slots.acquire()
+        except asyncio.CancelledError:
+            coro.close()
+            raise
+        task = asyncio.create_task(coro)
+        self.speaking.add(task)
+        task.add_done_callback(self._spoken)
+
+    def _spoken(self, task):
+        self.speaking.discard(task)
+        self.reply_slots.release()
+
+    async def _answer(self, text):
+        # The reply is spoken sentence by sentence while it's still being generated
+        async with self.speech.lock:
+            try:
+                response, status = await Chat.create_chat(
+                    {"user_id": self.user_id, "message": text}, on_delta=self.speech.feed, priority=INTERACTIVE)
+            finally:
+                await self.speech.finish()
+        if status != 200:
+            await self.send({"type": "error", "status": status, "error": response})
+        else:
+            await self.send({"type": "reply", "chat": dump_chat(response)})
@@ -1,4 +1,4 @@
-from marshmallow import schema, fields
+from marshmallow import Schema, fields
 
 class AudioSchema(Schema):
     type = fields.Str(required=True)
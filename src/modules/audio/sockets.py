@@ -1,10 +1,20 @@
-from quart import websocket
+import asyncio
+from quart import current_app, websocket
+from src.modules.audio.pipeline import AudioPipeline
 
 async def audio_ws():
-    print("WebSocket connected")
+    current_app.logger.info("Audio websocket connected")
     try:
-        while True:
-            data = await websocket.receive()
-            print(f"Received: {len(data)} bytes")
+        pipeline = AudioPipeline(
+            current_app.config, send=websocket.send_json, send_bytes=websocket.send,
+            user_id=websocket.args.get("user_id", type=int),
+        )
+        await pipeline.run(websocket)
+    except asyncio.CancelledError:
+        # The client went away
+        current_app.logger.info("Audio websocket connection closed")
+        raise
     except Exception as e:
-        print("WebSocket connection closed:", str(e))
\ No newline at end of file
+        current_app.logger.error(f"Audio websocket failed: {e}", exc_info=True)
+    else:
+        current_app.logger.info("Audio websocket connection closed")
\ No newline at end of file
@@ -0,0 +1,170 @@
+import asyncio
+import mmap
+import re
+import time
+from src.extensions.metrics import metrics
+from src.extensions.workers import worker_pool
+from src.modules.audio.phrase_cache import phrase_cache
+from src.modules.audio.processing import encode_audio
+from src.modules.audio.tts import get_tts_backend
+
+# Sentence-ending punctuation (plus closing quotes/brackets) followed by whitespace, or a line break
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+_END_OF_REPLY = object()
+
+
+def _release(task):
+    # Cancel a sentence's synthesis; if it finishes anyway, close the audio no one will send
+    task.cancel()
+    task.add_done_callback(_close_audio)
+
+
+def _close_audio(task):
+    if not task.cancelled() and task.exception() is None:
+        audio, _ = task.result()
+        if isinstance(audio, mmap.mmap):
+            audio.close()
+
+
+class SentenceSplitter:
+    """Cuts streamed text into sentences as soon as each one is complete.
+
+    Pieces shorter than min_chars are held back and joined to the next
+    sentence ("Hi." is not worth a synthesis call of its own); run-on text is
+    cut at a space once it reaches max_chars so audio doesn't wait for it.
+    """
+
+    def __init__(self, min_chars=12, max_chars=240):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        while len(self.buffer) > self.max_chars:
+            cut = self.buffer.rfind(" ", 0, self.max_chars)
+            cut = cut if cut > 0 else self.max_chars
+            sentences.append(self.buffer[:cut].strip())
+            self.buffer = self.buffer[cut:]
+        return sentences
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return rest
+
+
+class SpeechOutput:
+    """Per-connection text-to-speech stage: reply text in as it streams, encoded audio out in order.
+
+    Each sentence is synthesized as soon as it's complete, up to TTS_MAX_AHEAD
+    sentences ahead of the one being sent, so the first audio goes out while
+    the model is still writing the rest. A sentence is announced with
+    {"type": "speech", "text", "encoding", "sample_rate", "bytes", "cached"}
+    and followed by binary messages of TTS_CHUNK_MS each; {"type":
+    "speech_end"} closes a reply. Phrases come from the phrase cache when
+    they have been synthesized before.
+    """
+
+    def __init__(self, config, send_json, send_bytes):
+        backend = config.get("TTS_BACKEND", "stub")
+        self.tts = get_tts_backend(backend)
+        self.voice = f"{backend}:{config.get('TTS_VOICE', 'default')}"
+        self.sample_rate = config.get("TTS_SAMPLE_RATE", 16000)
+        self.encoding = config.get("TTS_ENCODING", "mulaw")
+        bytes_per_sample = 1 if self.encoding == "mulaw" else 2
+        self.chunk_bytes = max(1, int(self.sample_rate * config.get("TTS_CHUNK_MS", 200) / 1000)) * bytes_per_sample
+        self.splitter = SentenceSplitter(config.get("TTS_MIN_SENTENCE_CHARS", 12), config.get("TTS_MAX_SENTENCE_CHARS", 240))
+        self.queue = asyncio.Queue(maxsize=config.get("TTS_MAX_AHEAD", 2))
+        self.send_json = send_json
+        self.send_bytes = send_bytes
+        # Held for a whole reply so two replies never interleave their sentences
+        self.lock = asyncio.Lock()
+        self.in_reply = False
+        self.reply_started_at = None
+
+    async def say(self, text):
+        async with self.lock:
+            await self.feed(text)
+            await self.finish()
+
+    async def feed(self, text):
+        if not self.in_reply:
+            self.in_reply = True
+            self.reply_started_at = time.perf_counter()
+        for sentence in self.splitter.feed(text):
+            await self._enqueue(sentence)
+
+    async def finish(self):
+        rest = self.splitter.flush()
+        if rest:
+            await self._enqueue(rest)
+        self.in_reply = False
+        await self.queue.put(_END_OF_REPLY)
+
+    async def close(self):
+        await self.queue.put(None)
+
+    def discard(self):
+        """Drop every queued sentence, cancelling its synthesis and closing any mapped audio; for teardown."""
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if isinstance(item, tuple):
+                _release(item[1])
+
+    async def run(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            if item is _END_OF_REPLY:
+                await self.send_json({"type": "speech_end"})
+                continue
+            text, task = item
+            try:
+                audio, cached = await task
+            except asyncio.CancelledError:
+                _release(task)
+                raise
+            except Exception as e:
+                await self.send_json({"type": "error", "status": 500, "error": f"Speech synthesis failed: {e}"})
+                continue
+            try:
+                await self._send(text, audio, cached)
+            finally:
+                if isinstance(audio, mmap.mmap):
+                    audio.close()
+
+    async def _enqueue(self, text):
+        # Synthesis starts now; run() awaits the results in order
+        await self.queue.put((text, asyncio.create_task(self._synthesize(text))))
+
+    async def _synthesize(self, text):
+        key = phrase_cache.key(text, self.voice, self.sample_rate, self.encoding)
+        audio = await phrase_cache.open(key)
+        if audio is not None:
+            return audio, True
+        pcm = await self.tts.synthesize(text, self.sample_rate)
+        audio = pcm if self.encoding == "pcm16" else await worker_pool.submit_pcm(encode_audio, pcm, self.encoding)
+        phrase_cache.store(key, audio)
+        return audio, False
+
+    async def _send(self, text, audio, cached):
+        await self.send_json({
+            "type": "speech", "text": text, "encoding": self.encoding,
+            "sample_rate": self.sample_rate, "bytes": len(audio), "cached": cached,
+        })
+        for offset in range(0, len(audio), self.chunk_bytes):
+            # Slicing an mmap copies just this chunk out of the page cache
+            await self.send_bytes(audio[offset:offset + self.chunk_bytes])
+            if self.reply_started_at is not None:
+                metrics.websocket_message_seconds.labels("/ws/audio", "first_audio").observe(
+                    time.perf_counter() - self.reply_started_at)
+                self.reply_started_at = None
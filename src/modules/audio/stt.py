@@ -0,0 +1,29 @@
+class SpeechToText:
+    """Base class for speech-to-text backends. Input is mono 16-bit little-endian PCM."""
+
+    async def transcribe(self, pcm, sample_rate):
+        raise NotImplementedError
+
+
+class StubSpeechToText(SpeechToText):
+    """Local backend that only reports how much audio it was given."""
+
+    async def transcribe(self, pcm, sample_rate):
+        seconds = len(pcm) / 2 / sample_rate
+        return f"[{seconds:.2f}s of speech]"
+
+
+STT_BACKENDS = {
+    "stub": StubSpeechToText,
+}
+
+
+def register_stt_backend(name, backend_cls):
+    STT_BACKENDS[name] = backend_cls
+
+
+def get_stt_backend(name):
+    try:
+        return STT_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown speech-to-text backend: {name}")
@@ -0,0 +1,32 @@
+from src.extensions.workers import worker_pool
+from src.modules.audio.processing import synthesize_tones
+
+
+class TextToSpeech:
+    """Base class for text-to-speech backends. Output is mono 16-bit little-endian PCM."""
+
+    async def synthesize(self, text, sample_rate):
+        raise NotImplementedError
+
+
+class StubTextToSpeech(TextToSpeech):
+    """Local backend that renders each word as a short tone, enough to test audio clients without a voice model."""
+
+    async def synthesize(self, text, sample_rate):
+        return await worker_pool.submit(synthesize_tones, text, sample_rate)
+
+
+TTS_BACKENDS = {
+    "stub": StubTextToSpeech,
+}
+
+
+def register_tts_backend(name, backend_cls):
+    TTS_BACKENDS[name] = backend_cls
+
+
+def get_tts_backend(name):
+    try:
+        return TTS_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown text-to-speech backend: {name}")
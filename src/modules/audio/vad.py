@@ -0,0 +1,48 @@
+import numpy as np
+from src.utils.stats import LatencyStats
+
+
+class VoiceActivityDetector:
+    """Energy / zero-crossing voice activity detection over blocks of PCM16 frames.
+
+    A block is classified in one shot: the samples are viewed as a
+    (frames, samples_per_frame) array, and RMS energy and zero-crossing rate
+    are computed per row, so the cost per call does not depend on frame count
+    in Python.
+    """
+
+    def __init__(self, sample_rate, frame_ms=20, energy_threshold=500.0, zcr_threshold=0.5):
+        self.frame_samples = int(sample_rate * frame_ms / 1000)
+        self.frame_bytes = self.frame_samples * 2
+        self.energy_threshold = energy_threshold
+        self.zcr_threshold = zcr_threshold
+
+    def speech_mask(self, block):
+        """Return one bool per whole frame in block: True where the frame looks like speech."""
+        frames = len(block) // self.frame_bytes
+        if not frames:
+            return np.zeros(0, dtype=bool)
+        samples = np.frombuffer(block, dtype="<i2", count=frames * self.frame_samples)
+        samples = samples.reshape(frames, self.frame_samples).astype(np.float32)
+        energy = np.sqrt(np.mean(samples * samples, axis=1))
+        signs = np.signbit(samples)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_samples
+        return (energy >= self.energy_threshold) & (zcr <= self.zcr_threshold)
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.bytes_in = 0
+        self.frames_in = 0
+        self.frames_dropped = 0
+        self.segments = 0
+        self.segment_latency = LatencyStats(size=256)
+
+    def summary(self):
+        return {
+            "bytes_in": self.bytes_in,
+            "frames_in": self.frames_in,
+            "frames_dropped": self.frames_dropped,
+            "segments": self.segments,
+            "segment_latency": self.segment_latency.summary(),
+        }
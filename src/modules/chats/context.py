@@ -0,0 +1,154 @@
+import itertools
+from collections import deque
+from src.extensions.backplane import backplane
+from src.extensions.db import db
+from src.utils.cache import LRUCache
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+
+class TokenCounter:
+    def __init__(self, model):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        # Roughly four characters per token for English text
+        return len(text) // 4 + 1
+
+
+class ConversationContext:
+    """One user's recent turns plus a short digest of the turns that no longer fit the budget.
+
+    Token counts are computed once per turn when it's appended, so building
+    the prompt for a new message never re-tokenizes history.
+    """
+
+    def __init__(self, budget, summary_budget, counter):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.counter = counter
+        self.turns = deque()
+        self.tokens = 0
+        self.summary = deque()
+        self.summary_tokens = 0
+
+    def append(self, message, response):
+        tokens = self.counter.count(message) + self.counter.count(response) + 8
+        self.turns.append((message, response, tokens))
+        self.tokens += tokens
+        while self.turns and self.tokens + self.summary_tokens > self.budget:
+            self._summarize(*self.turns.popleft())
+
+    def messages(self, message):
+        # The new message counts against the budget too: leave out as many of the oldest turns as it needs
+        available = self.budget - self.summary_tokens - self.counter.count(message)
+        skip, tokens = 0, self.tokens
+        while skip < len(self.turns) and tokens > available:
+            tokens -= self.turns[skip][2]
+            skip += 1
+
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": "Earlier in this conversation:\n" + "\n".join(line for line, _ in self.summary)})
+        for user_text, assistant_text, _ in itertools.islice(self.turns, skip, None):
+            messages.append({"role": "user", "content": user_text})
+            if assistant_text:
+                messages.append({"role": "assistant", "content": assistant_text})
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    def _summarize(self, message, response, tokens):
+        self.tokens -= tokens
+        line = f"- User: {_clip(message)} / Assistant: {_clip(response)}"
+        line_tokens = self.counter.count(line)
+        self.summary.append((line, line_tokens))
+        self.summary_tokens += line_tokens
+        while self.summary and self.summary_tokens > self.summary_budget:
+            _, dropped = self.summary.popleft()
+            self.summary_tokens -= dropped
+
+
+def _clip(text, limit=120):
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class ContextBuilder:
+    """Per-user rolling conversation context for chat completions, cached in memory.
+
+    A user's context is loaded from their recent Chat rows the first time it's
+    needed; after that each saved chat is appended to it in place, and other
+    workers drop their copy to reload it. Until init_app runs only the new
+    message is sent.
+    """
+
+    def __init__(self):
+        self.contexts = None
+        self.budget = None
+        self.summary_budget = None
+        self.history_rows = None
+        self.counter = None
+        self._notify = None
+
+    def init_app(self, app):
+        self.contexts = LRUCache(
+            maxsize=app.config.get("CHAT_CONTEXT_USERS", 1024),
+            ttl=app.config.get("CHAT_CONTEXT_TTL", 3600),
+        )
+        self.budget = app.config.get("CHAT_CONTEXT_TOKEN_BUDGET", 2000)
+        self.summary_budget = app.config.get("CHAT_CONTEXT_SUMMARY_TOKENS", 200)
+        self.history_rows = app.config.get("CHAT_CONTEXT_HISTORY_ROWS", 50)
+        self.counter = TokenCounter(app.config.get("OPENAI_MODEL", "gpt-3.5-turbo"))
+        self._notify = backplane.invalidation("context", self.contexts.pop)
+
+    async def build(self, user_id, message):
+        if self.contexts is None:
+            return [{"role": "user", "content": message}]
+        context = await self._get(user_id)
+        return context.messages(message)
+
+    def append(self, user_id, message, response):
+        if self.contexts is None:
+            return
+        context = self.contexts.get(user_id)
+        if context is not None:
+            context.append(message, response)
+        self._notify(user_id)
+
+    async def _get(self, user_id):
+        context = self.contexts.get(user_id)
+        if context is None:
+            context = ConversationContext(self.budget, self.summary_budget, self.counter)
+            for message, response in await self._load_turns(user_id):
+                context.append(message, response)
+            self.contexts.set(user_id, context)
+        return context
+
+    async def _load_turns(self, user_id):
+        from src.modules.chats.models import Chat  # models depend on this module
+
+        # Queried directly rather than through get_chat_history, so loading a context never fills history_cache
+        query = (
+            db.select(Chat.message, Chat.response)
+            .filter_by(user_id=user_id)
+            .order_by(Chat.created_at.desc(), Chat.id.desc())
+            .limit(self.history_rows)
+        )
+        async with db.session() as session:
+            rows = (await session.execute(query)).all()
+        return [(message, response) for message, response in reversed(rows)]
+
+
+chat_context = ContextBuilder()
@@ -0,0 +1,65 @@
+import itertools
+from src.extensions.backplane import backplane
+from src.utils.cache import LRUCache
+
+
+class HistoryCache:
+    """Recent chat history pages per user, dropped (on every worker) whenever that user gets a new chat.
+
+    The desktop client asks for "the last N messages" far more often than
+    history changes, so those pages are answered from memory. Until init_app
+    runs the cache is disabled and every lookup misses.
+
+    A page read from the database is only stored if no invalidation for that
+    user happened meanwhile: callers take generation(user_id) before the query
+    and pass it to set(), which drops the page if the generation has moved.
+    """
+
+    def __init__(self):
+        self.users = None
+        self.generations = None
+        self.pages_per_user = None
+        self.ttl = None
+        self._notify = None
+        self._counter = itertools.count(1)
+
+    def init_app(self, app):
+        users = app.config.get("CHAT_HISTORY_CACHE_USERS", 1024)
+        self.users = LRUCache(maxsize=users)
+        # Outlives the pages so a user evicted from `users` still remembers recent invalidations
+        self.generations = LRUCache(maxsize=users * 4)
+        self.pages_per_user = app.config.get("CHAT_HISTORY_CACHE_PAGES", 8)
+        self.ttl = app.config.get("CHAT_HISTORY_CACHE_TTL", 30)
+        self._notify = backplane.invalidation("history", self._drop)
+
+    def get(self, user_id, key):
+        if self.users is None:
+            return None
+        pages = self.users.get(user_id)
+        return pages.get(key) if pages is not None else None
+
+    def generation(self, user_id):
+        if self.generations is None:
+            return 0
+        return self.generations.get(user_id, 0)
+
+    def set(self, user_id, key, page, generation):
+        if self.users is None or self.generation(user_id) != generation:
+            return
+        pages = self.users.get(user_id)
+        if pages is None:
+            pages = LRUCache(maxsize=self.pages_per_user, ttl=self.ttl)
+            self.users.set(user_id, pages)
+        pages.set(key, page)
+
+    def invalidate(self, user_id):
+        if self.users is not None:
+            self._drop(user_id)
+            self._notify(user_id)
+
+    def _drop(self, user_id):
+        self.users.pop(user_id)
+        self.generations.set(user_id, next(self._counter))
+
+
+history_cache = HistoryCache()
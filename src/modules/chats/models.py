@@ -1,20 +1,42 @@
 from src.extensions.db import db
-from openai import OpenAI
+from sqlalchemy.dialects import sqlite
+from src.extensions.ai_client import NORMAL, ai_client
+from src.extensions.backplane import backplane
+from src.extensions.completion_cache import completion_cache
+from src.modules.chats.context import chat_context
+from src.modules.chats.history import history_cache
+from src.modules.chats.schemas import dump_chat
+from src.modules.chats.search import install_search_index, search_query, search_terms
+from src.modules.chats.writer import chat_writer
 from quart import current_app
 from src.utils.logger import logging
+import base64
+import binascii
 import datetime
 
 
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind datetimes in the same format so cursor range comparisons match
+SQLITE_DATETIME = sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d")
+
+
 class Chat(db.Model):
     __tablename__ = "chat"
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.String(1000), nullable=False)
     response = db.Column(db.String(1000))
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime().with_variant(SQLITE_DATETIME, "sqlite"), default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index("ix_chat_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+    # Load created_at as part of the INSERT so the row can be serialized without another round trip
+    __mapper_args__ = {"eager_defaults": True}
 
     @classmethod
-    def create_chat(cls, params):
+    async def create_chat(cls, params, on_delta=None, priority=NORMAL):
+        """Answer a message and save it; if on_delta is given, stream the reply through it as it's generated."""
         if not isinstance(params, dict):
             return "Invalid parameters format.", 400
 
@@ -23,71 +45,218 @@ class Chat(db.Model):
         if not user_id or not message:
             return "User ID and message are required.", 400
 
-        try:
-            current_app.logger.info("Initializing OpenAI client...")
-            openai_client = OpenAI(api_key=current_app.config['OPENAI_API_KEY'])
-            current_app.logger.info("OpenAI client initialized.")
+        # Counted on the backplane, so the limit holds however many workers the user's requests land on
+        limit = current_app.config.get("CHAT_RATE_LIMIT", 0)
+        if limit and await backplane.hit(f"chat:{user_id}", current_app.config.get("CHAT_RATE_WINDOW", 60)) > limit:
+            return "Too many chats, try again shortly.", 429
 
+        try:
             current_app.logger.info("Creating chat...")
-            response = openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": message}]
-            )
-
-            if not response.choices or not hasattr(response.choices[0], "message"):
-                return "Invalid response from OpenAI.", 500
+            messages = await chat_context.build(user_id, message)
+            # A short reply like "yes" is keyed by the assistant turn before it, so it's only reused after the same question
+            context = messages[:-1]
+            chat_response = completion_cache.get(user_id, message, context)
+            if chat_response is not None:
+                current_app.logger.info("Chat answered from completion cache.")
+                if on_delta is not None:
+                    await on_delta(chat_response)
+            else:
+                if on_delta is None:
+                    chat_response = await ai_client.get_response(messages, priority=priority)
+                else:
+                    parts = []
+                    async for delta in ai_client.stream_response(messages, priority=priority):
+                        parts.append(delta)
+                        await on_delta(delta)
+                    chat_response = "".join(parts)
+                completion_cache.set(user_id, message, chat_response, context)
 
-            chat_response = response.choices[0].message.content 
-            chat = cls(user_id=user_id, message=message, response=chat_response)
-            db.session.add(chat)
-            db.session.commit()
-            current_app.logger.info(f"Chat saved to database: {chat}")
+            # Stamped here for both paths, so batched and directly saved rows share one clock (UTC, whole seconds)
+            created_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+            chat = cls(user_id=user_id, message=message, response=chat_response, created_at=created_at)
+            written = chat_writer.submit(chat)
+            if written is not None:
+                await written
+                current_app.logger.info(f"Chat written in a batch: {chat}")
+            else:
+                async with db.session() as session:
+                    session.add(chat)
+                    await session.commit()
+                current_app.logger.info(f"Chat saved to database: {chat}")
+            history_cache.invalidate(user_id)
+            chat_context.append(user_id, message, chat_response)
+            # Every open socket of this user, on any worker, sees the chat whichever way it was made
+            backplane.notify_user(user_id, {"type": "notify", "topic": "chat", "chat": dump_chat(chat)})
             return chat, 200
 
         except Exception as e:
-            db.session.rollback()
             current_app.logger.error(f"Failed to create chat: {str(e)}")
             return str(e), 500
 
         
 
     @classmethod
-    def get_chat_history(cls, user_id, params=None):
-        user = cls.query.filter_by(user_id=user_id).all()
-        if not user:
-            return "User not found.", 404
+    async def get_chat_history(cls, user_id, params=None):
+        """Return one page of a user's chats, newest first, paginated with before/after cursors.
 
+        Cursors encode the (created_at, id) of a row, so each page is a range
+        scan on ix_chat_user_id_created_at_id no matter how deep it is. Pages
+        are cached per user until the user's next chat is saved.
+        """
+        params = params or {}
         max_amount = 100
-        amount = max_amount
-        date = None
-
-        if params is not None:
-            try:
-                date_str = params.get("date")
-                date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else None
-            except ValueError:
-                return "Invalid date format. Use YYYY-MM-DD.", 400
-            
-            try:
-                amount = int(params.get("amount", 0))
-                amount = min(amount, max_amount)
-            except ValueError:
-                amount = max_amount
-
-        query = cls.query.filter_by(user_id=user_id).order_by(cls.created_at.desc()).limit(amount)
 
+        try:
+            date_str = params.get("date")
+            date = datetime.datetime.strptime(date_str, "%Y-%m-%d") if date_str else None
+        except ValueError:
+            return "Invalid date format. Use YYYY-MM-DD.", 400
+
+        try:
+            amount = int(params.get("amount", max_amount))
+            amount = max(1, min(amount, max_amount))
+        except ValueError:
+            amount = max_amount
+
+        try:
+            before = decode_cursor(params.get("before"))
+            after = decode_cursor(params.get("after"))
+        except ValueError:
+            return "Invalid cursor.", 400
+
+        cache_key = (date_str, amount, params.get("before"), params.get("after"))
+        cached = history_cache.get(user_id, cache_key)
+        if cached is not None:
+            return cached, 200
+        # Taken before the query: a chat saved while it runs makes set() below drop this page
+        generation = history_cache.generation(user_id)
+
+        query = db.select(cls).filter_by(user_id=user_id)
         if date:
-            query = query.filter(db.func.date(cls.created_at) == date)
+            query = query.filter(cls.created_at >= date, cls.created_at < date + datetime.timedelta(days=1))
+
+        # Both bounds apply when both are given: the page is then taken from the `after` end of the range
+        if before:
+            created_at, chat_id = before
+            query = query.filter(
+                cls.created_at <= created_at,
+                db.or_(cls.created_at < created_at, cls.id < chat_id),
+            )
+        if after:
+            created_at, chat_id = after
+            query = query.filter(
+                cls.created_at >= created_at,
+                db.or_(cls.created_at > created_at, cls.id > chat_id),
+            ).order_by(cls.created_at.asc(), cls.id.asc())
+        else:
+            query = query.order_by(cls.created_at.desc(), cls.id.desc())
+
+        # Fetch one extra row to learn whether another page exists without counting
+        query = query.limit(amount + 1)
 
         try:
-            messages = query.all()
+            async with db.session() as session:
+                messages = (await session.scalars(query)).all()
         except Exception as e:
             return str(e), 500
 
-        if not messages:
+        has_more = len(messages) > amount
+        messages = list(messages[:amount])
+        if after:
+            messages.reverse()
+
+        if not messages and not (before or after):
             if date:
                 return "No messages found for the given date.", 404
             else:
                 return "No messages found.", 404
 
-        return messages, 200
+        page = {
+            "messages": messages,
+            "has_more": has_more,
+            "before": encode_cursor(messages[-1]) if messages else None,
+            "after": encode_cursor(messages[0]) if messages else None,
+        }
+        history_cache.set(user_id, cache_key, page, generation)
+        return page, 200
+
+    @classmethod
+    async def search_chats(cls, user_id, params=None):
+        """Return one page of a user's chats matching `q` in message or response, best match first.
+
+        Backed by a FULLTEXT index on MySQL and an FTS5 table on SQLite; the
+        `after` cursor from the previous page holds the (score, id) of its last
+        row, so the next page continues the same ranking without an OFFSET.
+        """
+        params = params or {}
+        max_amount = 100
+
+        terms = search_terms(params.get("q"))
+        if not terms:
+            return "Search query is required.", 400
+
+        try:
+            amount = int(params.get("amount", 20))
+            amount = max(1, min(amount, max_amount))
+        except ValueError:
+            amount = 20
+
+        try:
+            after = decode_search_cursor(params.get("after"))
+        except ValueError:
+            return "Invalid cursor.", 400
+
+        query = search_query(cls, db.engine.dialect.name, user_id, terms, after)
+        # Fetch one extra row to learn whether another page exists without counting
+        query = query.limit(amount + 1)
+        try:
+            async with db.session() as session:
+                rows = (await session.execute(query)).all()
+        except Exception as e:
+            return str(e), 500
+
+        has_more = len(rows) > amount
+        rows = rows[:amount]
+        page = {
+            "messages": [chat for chat, _ in rows],
+            "has_more": has_more,
+            "after": encode_search_cursor(*rows[-1]) if has_more else None,
+        }
+        return page, 200
+
+
+install_search_index(Chat.__table__)
+
+
+def encode_cursor(chat):
+    raw = f"{chat.created_at.isoformat()}|{chat.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, chat_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), int(chat_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {token}")
+
+
+def encode_search_cursor(chat, score):
+    raw = f"search|{float(score)!r}|{chat.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        kind, score, chat_id = raw.split("|")
+        if kind != "search":
+            raise ValueError(token)
+        return float(score), int(chat_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {token}")
@@ -1,31 +1,73 @@
-from quart import current_app, Blueprint, jsonify, request
+import asyncio
+from quart import current_app, Blueprint, jsonify, request, stream_with_context
+from marshmallow import ValidationError
 from src.modules.chats.models import Chat
-from src.modules.chats.schemas import ChatSchema
+from src.modules.chats.schemas import chat_schema, dump_chat
 
 chat_bp = Blueprint("chat", __name__)
 
 @chat_bp.route("/", methods=["POST"])
 async def create_chat():
     try: 
-        chat_schema = ChatSchema()
         data = await request.get_json()
         params = chat_schema.load(data)  # validates input
-        chat, status_code = Chat.create_chat(params)  # chat is the model instance with .response
+        if params.pop("stream"):
+            return stream_with_context(stream_chat)(params), 200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        chat, status_code = await Chat.create_chat(params)  # chat is the model instance with .response
         current_app.logger.info(f"Chat created: {chat}")
-        return jsonify(chat_schema.dump(chat)), status_code  # response field will be included
+        if status_code != 200:
+            return chat, status_code
+        return jsonify(dump_chat(chat)), status_code  # response field will be included
         
     except ValidationError as err:
         return jsonify(err.messages), 400
     except Exception as e:
         return str(e), 500
 
+async def stream_chat(params):
+    # Server-sent events: one "data" event per delta, then a "done" (or "error") event with the saved chat
+    queue = asyncio.Queue()
+
+    async def on_delta(delta):
+        await queue.put(delta)
+
+    async def run():
+        result = await Chat.create_chat(params, on_delta=on_delta)
+        await queue.put(result)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            item = await queue.get()
+            if isinstance(item, str):
+                yield f"data: {current_app.json.dumps({'delta': item})}\n\n"
+                continue
+            chat, status_code = item
+            if status_code != 200:
+                yield f"event: error\ndata: {current_app.json.dumps({'status': status_code, 'error': chat})}\n\n"
+            else:
+                yield f"event: done\ndata: {current_app.json.dumps(dump_chat(chat))}\n\n"
+            break
+    finally:
+        if not task.done():
+            task.cancel()
+
 @chat_bp.route("/<int:user_id>/history", methods=["GET"])
 async def get_chat_history(user_id):
     try:
-        response, status_code = Chat.get_chat_history(user_id)
-        chat_schema = ChatSchema(many=True)
-        return jsonify(chat_schema.dump(response)), status_code
+        response, status_code = await Chat.get_chat_history(user_id, request.args)
+        if status_code != 200:
+            return response, status_code
+        return jsonify({**response, "messages": [dump_chat(chat) for chat in response["messages"]]}), status_code
     except Exception as e:
         return str(e), 500
-    
 
+@chat_bp.route("/<int:user_id>/search", methods=["GET"])
+async def search_chats(user_id):
+    try:
+        response, status_code = await Chat.search_chats(user_id, request.args)
+        if status_code != 200:
+            return response, status_code
+        return jsonify({**response, "messages": [dump_chat(chat) for chat in response["messages"]]}), status_code
+    except Exception as e:
+        return str(e), 500
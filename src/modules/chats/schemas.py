@@ -1,8 +1,14 @@
 from marshmallow import Schema, fields
+from src.utils.serialization import compile_schema
 
 class ChatSchema(Schema):
     id = fields.Int(dump_only=True)
     user_id = fields.Int(required=True)
     message = fields.Str(required=True)
     response = fields.Str()
-    created_at = fields.DateTime(dump_only=True)
\ No newline at end of file
+    created_at = fields.DateTime(dump_only=True)
+    stream = fields.Bool(load_only=True, load_default=False)
+
+# Schemas hold no per-request state, so every request shares these
+chat_schema = ChatSchema()
+dump_chat = compile_schema(chat_schema)
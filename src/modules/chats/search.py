@@ -0,0 +1,76 @@
+import re
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# MySQL: an InnoDB FULLTEXT index, kept current by the engine on every insert/update
+MYSQL_FULLTEXT_INDEX = "ft_chat_message_response"
+
+# SQLite: an external-content FTS5 table over chat, kept current by triggers. user_id is indexed
+# too, so a search matches the user's token and the words together instead of filtering every user's hits
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5("
+    "user_id, message, response, content='chat', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS chat_fts_ai AFTER INSERT ON chat BEGIN "
+    "INSERT INTO chat_fts(rowid, user_id, message, response) VALUES (new.id, new.user_id, new.message, new.response); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_fts_ad AFTER DELETE ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, user_id, message, response) "
+    "VALUES ('delete', old.id, old.user_id, old.message, old.response); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_fts_au AFTER UPDATE OF user_id, message, response ON chat BEGIN "
+    "INSERT INTO chat_fts(chat_fts, rowid, user_id, message, response) "
+    "VALUES ('delete', old.id, old.user_id, old.message, old.response); "
+    "INSERT INTO chat_fts(rowid, user_id, message, response) VALUES (new.id, new.user_id, new.message, new.response); END",
+)
+
+_fts = sa.table("chat_fts", sa.column("rowid"))
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def install_search_index(table):
+    """Create the full-text index whenever metadata.create_all creates the chat table (migrations do the same)."""
+    sa.event.listen(
+        table, "after_create",
+        sa.DDL(f"CREATE FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} ON chat (message, response)").execute_if(dialect="mysql"),
+    )
+    for statement in SQLITE_FTS_DDL:
+        sa.event.listen(table, "after_create", sa.DDL(statement).execute_if(dialect="sqlite"))
+
+
+def search_query(model, dialect, user_id, terms, after=None):
+    """SELECT of (`model` row, score) for one user matching `terms`, best match first.
+
+    Lower scores rank first on every backend. `after` is the (score, id) of
+    the last row of the previous page; the next page starts right after it
+    instead of skipping an OFFSET.
+    """
+    if dialect == "sqlite":
+        # Quote every word so user input can't use (or break) FTS5 query syntax; words are ANDed
+        words = " ".join(f'"{word}"' for word in terms)
+        match = f'user_id:"{int(user_id)}" AND {{message response}}: ({words})'
+        # Weights per column: the user_id token only selects rows, it doesn't rank them
+        score = sa.func.bm25(sa.literal_column("chat_fts"), 0.0, 1.0, 1.0)
+        query = (
+            sa.select(model, score.label("score"))
+            .join(_fts, _fts.c.rowid == model.id)
+            .where(sa.literal_column("chat_fts").op("MATCH")(match))
+        )
+    elif dialect == "mysql":
+        relevance = mysql.match(model.message, model.response, against=" ".join(terms)).in_natural_language_mode()
+        score = -sa.type_coerce(relevance, sa.Float)
+        query = sa.select(model, score.label("score")).where(relevance, model.user_id == user_id)
+    else:
+        # No full-text index on other backends: match every word anywhere, newest first
+        conditions = [
+            sa.or_(*(sa.func.lower(column).contains(word.lower(), autoescape=True) for column in (model.message, model.response)))
+            for word in terms
+        ]
+        score = sa.literal(0.0, sa.Float)
+        query = sa.select(model, score.label("score")).where(model.user_id == user_id, *conditions)
+
+    if after is not None:
+        last_score, last_id = after
+        query = query.where(sa.or_(score > last_score, sa.and_(score == last_score, model.id < last_id)))
+    return query.order_by(sa.literal_column("score"), model.id.desc())
+
+
+def search_terms(text):
+    return _WORD.findall(text or "")[:16]
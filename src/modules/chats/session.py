@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import time
+from marshmallow import ValidationError
+from quart import current_app, websocket
+from src.extensions.ai_client import INTERACTIVE
+from src.extensions.backplane import backplane
+from src.extensions.metrics import metrics
+from src.modules.chats.models import Chat
+from src.modules.chats.schemas import chat_schema, dump_chat
+
+
+class ChatSession:
+    """Long-lived /ws/chat connection that multiplexes chats by request_id.
+
+    Client messages:
+        {"type": "chat", "request_id": "1", "user_id": 1, "message": "...", "stream": true}
+        {"type": "cancel", "request_id": "1"}
+        {"type": "ping"} / {"type": "pong"}
+
+    Every reply carries the request_id it belongs to. Replies go through a
+    bounded queue, so a client that stops reading slows its own chats down
+    instead of growing server memory.
+
+    The session also follows its user ("?user_id=" on connect, or the first
+    chat's user_id): {"type": "notify", ...} messages sent to that user from
+    any worker through the backplane are forwarded to this socket, including
+    the notification for each chat made on this socket.
+    """
+
+    def __init__(self, config):
+        self.max_in_flight = config.get("WS_MAX_IN_FLIGHT", 4)
+        self.heartbeat_interval = config.get("WS_HEARTBEAT_INTERVAL", 20)
+        self.idle_timeout = config.get("WS_IDLE_TIMEOUT", 60)
+        self.outbox = asyncio.Queue(maxsize=config.get("WS_SEND_QUEUE_SIZE", 64))
+        self.in_flight = {}
+        self.followed = set()
+        self.logger = current_app.logger
+        self._ids = itertools.count(1)
+
+    async def run(self):
+        user_id = websocket.args.get("user_id", type=int)
+        if user_id:
+            self.follow(user_id)
+        background = [
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        try:
+            await self._receive_loop()
+        finally:
+            # Client went away (or idled out): stop any generation still running for it
+            tasks = background + list(self.in_flight.values())
+            for task in tasks:
+                task.cancel()
+            for user_id in self.followed:
+                backplane.unsubscribe(f"user:{user_id}", self._push)
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def send(self, message):
+        await self.outbox.put(message)
+
+    def follow(self, user_id):
+        if user_id not in self.followed:
+            self.followed.add(user_id)
+            backplane.subscribe(f"user:{user_id}", self._push)
+
+    def _push(self, message):
+        # Runs on the backplane's reader; never block it on a slow client
+        if self.outbox.full():
+            self.logger.warning("Chat websocket outbox full, dropped a notification.")
+            return
+        self.outbox.put_nowait(message)
+
+    async def _receive_loop(self):
+        while True:
+            try:
+                data = await asyncio.wait_for(websocket.receive_json(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                current_app.logger.info("Closing idle chat websocket.")
+                await websocket.close(1000, "idle timeout")
+                return
+            except ValueError:
+                await self.send({"type": "error", "request_id": None, "status": 400, "error": "Invalid JSON."})
+                continue
+
+            if not isinstance(data, dict):
+                await self.send({"type": "error", "request_id": None, "status": 400, "error": "Invalid message format."})
+                continue
+
+            message_type = data.pop("type", "chat")
+            if message_type == "ping":
+                await self.send({"type": "pong"})
+            elif message_type == "pong":
+                continue
+            elif message_type == "cancel":
+                task = self.in_flight.get(data.get("request_id"))
+                if task:
+                    task.cancel()
+            elif message_type == "chat":
+                await self._start_chat(data)
+            else:
+                await self.send({"type": "error", "request_id": data.get("request_id"), "status": 400,
+                                 "error": f"Unknown message type: {message_type}"})
+
+    async def _start_chat(self, data):
+        request_id = data.pop("request_id", None) or f"auto-{next(self._ids)}"
+        if request_id in self.in_flight:
+            await self.send({"type": "error", "request_id": request_id, "status": 409, "error": "Duplicate request ID."})
+            return
+        if len(self.in_flight) >= self.max_in_flight:
+            await self.send({"type": "error", "request_id": request_id, "status": 429, "error": "Too many chats in flight."})
+            return
+
+        try:
+            params = chat_schema.load(data)
+        except ValidationError as err:
+            await self.send({"type": "error", "request_id": request_id, "status": 400, "error": err.messages})
+            return
+
+        self.follow(params["user_id"])
+        task = asyncio.create_task(self._handle_chat(request_id, params))
+        self.in_flight[request_id] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(request_id, None))
+
+    async def _handle_chat(self, request_id, params):
+        on_delta = None
+        if params.pop("stream"):
+            async def on_delta(delta):
+                await self.send({"type": "delta", "request_id": request_id, "delta": delta})
+
+        start = time.perf_counter()
+        try:
+            response, status = await Chat.create_chat(params, on_delta=on_delta, priority=INTERACTIVE)
+        except asyncio.CancelledError:
+            if not self.outbox.full():
+                self.outbox.put_nowait({"type": "cancelled", "request_id": request_id})
+            raise
+
+        if status != 200:
+            await self.send({"type": "error", "request_id": request_id, "status": status, "error": response})
+        else:
+            await self.send({"type": "done", "request_id": request_id, "chat": dump_chat(response)})
+        metrics.websocket_message_seconds.labels("/ws/chat", "chat").observe(time.perf_counter() - start)
+
+    async def _send_loop(self):
+        while True:
+            message = await self.outbox.get()
+            await websocket.send_json(message)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.send({"type": "ping"})
@@ -1,8 +1,5 @@
-from quart import websocket
-from src.modules.chats.models import Chat
-from src.modules.chats.schemas import ChatSchema
+from quart import current_app
+from src.modules.chats.session import ChatSession
 
 async def chat_ws():
-    data = await websocket.receive_json()
-    response, status = Chat.create_chat(data)
-    await websocket.send_json(ChatSchema().dump(response))
\ No newline at end of file
+    await ChatSession(current_app.config).run()
\ No newline at end of file
@@ -0,0 +1,146 @@
+import asyncio
+from src.extensions.db import db
+from src.extensions.metrics import metrics
+from src.modules.chats.history import history_cache
+
+
+class ChatWriter:
+    """Optional write-behind persistence for Chat rows.
+
+    A background task inserts queued rows in batches once
+    CHAT_WRITE_BATCH_SIZE rows are waiting or CHAT_WRITE_FLUSH_INTERVAL seconds
+    have passed, one transaction per batch instead of one per chat. submit()
+    returns a future that resolves once the row is committed, with chat.id
+    set, so a reply never goes out without its id. When the queue is full, or
+    the writer isn't running, submit() returns None and the caller commits the
+    row itself. Everything still queued is written before the app stops.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.queue = None
+        self.queue_size = None
+        self.batch_size = None
+        self.flush_interval = None
+        self.model = None
+        self.logger = None
+        self._task = None
+        self.rows_written = 0
+        self.batches = 0
+        self.fallbacks = 0
+
+    def init_app(self, app, model):
+        self.enabled = app.config.get("CHAT_WRITE_BEHIND", False)
+        self.batch_size = app.config.get("CHAT_WRITE_BATCH_SIZE", 200)
+        self.flush_interval = app.config.get("CHAT_WRITE_FLUSH_INTERVAL", 0.05)
+        self.queue_size = app.config.get("CHAT_WRITE_QUEUE_SIZE", 5000)
+        self.model = model
+        self.logger = app.logger
+        if not self.enabled:
+            return
+
+        metrics.register_collector(
+            "chat_write_queue_depth", "Chats waiting to be written.", lambda: {(): self.stats()["queued"]})
+
+        @app.before_serving
+        async def start_chat_writer():
+            self.start()
+
+        # Flushed from the database's shutdown hook, before the engine and the backplane go away
+        @db.before_dispose
+        async def stop_chat_writer():
+            await self.stop()
+
+    def start(self):
+        # Unbounded so the shutdown sentinel always fits; submit() enforces queue_size itself
+        self.queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if task.done():
+            # The flush loop died and submit() has been handing rows back since; nothing is queued
+            if not task.cancelled() and task.exception() is not None:
+                self.logger.error(f"Chat writer stopped unexpectedly: {task.exception()}")
+            return
+        # Rows submitted before this point are ahead of the sentinel and get written first
+        self.queue.put_nowait(None)
+        await task
+
+    def submit(self, chat):
+        # A flush loop that died would leave the row queued forever
+        if self._task is None or self._task.done():
+            return None
+        if self.queue.qsize() >= self.queue_size:
+            self.fallbacks += 1
+            return None
+        written = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((chat, written))
+        return written
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "rows_written": self.rows_written,
+            "batches": self.batches,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch):
+        chats = [chat for chat, _ in batch]
+        try:
+            async with db.session() as session:
+                # One multi-row INSERT instead of a transaction per chat; the ORM sets each chat.id from it
+                session.add_all(chats)
+                await session.commit()
+        except Exception as e:
+            self.logger.error(f"Failed to write {len(chats)} chats in one batch, retrying one by one: {e}")
+            await self._write_each(batch)
+        else:
+            self.rows_written += len(chats)
+            self.batches += 1
+            for _, written in batch:
+                if not written.done():
+                    written.set_result(None)
+        for user_id in {chat.user_id for chat in chats}:
+            history_cache.invalidate(user_id)
+
+    async def _write_each(self, batch):
+        for chat, written in batch:
+            try:
+                async with db.session() as session:
+                    session.add(chat)
+                    await session.commit()
+            except Exception as e:
+                self.logger.error(f"Failed to write chat for user {chat.user_id}: {e}")
+                if not written.done():
+                    written.set_exception(e)
+            else:
+                self.rows_written += 1
+                if not written.done():
+                    written.set_result(None)
+
+
+chat_writer = ChatWriter()
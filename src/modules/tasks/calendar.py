@@ -0,0 +1,66 @@
+import datetime
+import itertools
+from src.extensions.backplane import backplane
+from src.utils.cache import LRUCache
+
+
+class CalendarCache:
+    """Each user's expanded event occurrences for the current week, dropped on every worker whenever their events change.
+
+    The week view is what clients poll; any window inside the current week is
+    answered by filtering the cached list. Until init_app runs the cache is
+    disabled and every lookup misses.
+
+    As with the history cache, a week loaded across an invalidation is not
+    stored: callers take generation(user_id) before loading and pass it to set().
+    """
+
+    def __init__(self):
+        self.users = None
+        self.generations = None
+        self._notify = None
+        self._counter = itertools.count(1)
+
+    def init_app(self, app):
+        users = app.config.get("CALENDAR_CACHE_USERS", 1024)
+        self.users = LRUCache(maxsize=users, ttl=app.config.get("CALENDAR_CACHE_TTL", 300))
+        # Outlives the weeks so a user evicted from `users` still remembers recent invalidations
+        self.generations = LRUCache(maxsize=users * 4)
+        self._notify = backplane.invalidation("calendar", self._drop)
+
+    @staticmethod
+    def current_week(now=None):
+        """[Monday 00:00, next Monday 00:00) in UTC, as naive datetimes like the stored columns."""
+        now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        monday = datetime.datetime.combine(now.date() - datetime.timedelta(days=now.weekday()), datetime.time())
+        return monday, monday + datetime.timedelta(days=7)
+
+    def get(self, user_id, week):
+        if self.users is None:
+            return None
+        entry = self.users.get(user_id)
+        # A new week makes last week's entry stale even before its TTL
+        if entry is None or entry[0] != week:
+            return None
+        return entry[1]
+
+    def generation(self, user_id):
+        if self.generations is None:
+            return 0
+        return self.generations.get(user_id, 0)
+
+    def set(self, user_id, week, items, generation):
+        if self.users is not None and self.generation(user_id) == generation:
+            self.users.set(user_id, (week, items))
+
+    def invalidate(self, user_id):
+        if self.users is not None:
+            self._drop(user_id)
+            self._notify(user_id)
+
+    def _drop(self, user_id):
+        self.users.pop(user_id)
+        self.generations.set(user_id, next(self._counter))
+
+
+calendar_cache = CalendarCache()
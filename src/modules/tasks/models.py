@@ -0,0 +1,241 @@
+from src.extensions.backplane import backplane
+from src.extensions.db import db
+from src.modules.tasks.calendar import calendar_cache
+from src.modules.tasks.recurrence import add_months, as_naive_utc, occurrences, series_end
+import datetime
+
+# Longest window one calendar request may expand
+MAX_WINDOW = datetime.timedelta(days=62)
+
+# Columns a PATCH may change; everything else (owner, bookkeeping) is never taken from the request
+TASK_UPDATABLE = ("title", "description", "priority", "due_at")
+EVENT_UPDATABLE = ("title", "description", "start_at", "end_at", "recurrence", "interval", "count", "until")
+
+
+def view_window(view, date):
+    day = datetime.datetime.combine(date.date(), datetime.time())
+    if view == "day":
+        return day, day + datetime.timedelta(days=1)
+    if view == "week":
+        monday = day - datetime.timedelta(days=day.weekday())
+        return monday, monday + datetime.timedelta(days=7)
+    if view == "month":
+        first = day.replace(day=1)
+        return first, add_months(first, 1)
+    raise ValueError(view)
+
+
+class Task(db.Model):
+    __tablename__ = "tasks"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.String(1000))
+    # Lower runs first: 1 = urgent ... 5 = someday
+    priority = db.Column(db.SmallInteger, nullable=False, default=3)
+    due_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        # Open tasks in priority order: WHERE user_id = ? AND completed_at IS NULL ORDER BY priority, due_at
+        db.Index("ix_tasks_user_id_completed_at_priority_due_at", "user_id", "completed_at", "priority", "due_at"),
+    )
+
+    __mapper_args__ = {"eager_defaults": True}
+
+    @classmethod
+    async def create_task(cls, params):
+        task = cls(**params)
+        async with db.session() as session:
+            session.add(task)
+            await session.commit()
+        return task, 201
+
+    @classmethod
+    async def get_tasks(cls, user_id, params=None):
+        """Open tasks (or all with status=all) in priority order, then by due date."""
+        params = params or {}
+        status = params.get("status", "open")
+        if status not in ("open", "done", "all"):
+            return "Invalid status. Use open, done or all.", 400
+
+        query = db.select(cls).filter_by(user_id=user_id)
+        if status == "open":
+            query = query.filter(cls.completed_at.is_(None))
+        elif status == "done":
+            query = query.filter(cls.completed_at.is_not(None))
+        query = query.order_by(cls.priority.asc(), cls.due_at.is_(None), cls.due_at.asc(), cls.id.asc())
+
+        async with db.session() as session:
+            tasks = (await session.scalars(query)).all()
+        return tasks, 200
+
+    @classmethod
+    async def update_task(cls, task_id, params):
+        async with db.session() as session:
+            task = await session.get(cls, task_id)
+            if task is None:
+                return "Task not found.", 404
+            completed = params.pop("completed", None)
+            for name in TASK_UPDATABLE:
+                if name in params:
+                    setattr(task, name, params[name])
+            if completed is not None:
+                task.completed_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0) if completed else None
+            await session.commit()
+        return task, 200
+
+    @classmethod
+    async def delete_task(cls, task_id):
+        async with db.session() as session:
+            task = await session.get(cls, task_id)
+            if task is None:
+                return "Task not found.", 404
+            await session.delete(task)
+            await session.commit()
+        return "", 204
+
+
+class Event(db.Model):
+    """A calendar event, optionally repeating daily/weekly/monthly.
+
+    A repeating event is stored once; its occurrences are computed for the
+    requested window only. series_end_at is the end of the last occurrence
+    (NULL if it repeats forever), so one range scan on (user_id, start_at,
+    series_end_at) finds every event that can show up in a window.
+    """
+
+    __tablename__ = "events"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.String(1000))
+    # First occurrence
+    start_at = db.Column(db.DateTime, nullable=False)
+    end_at = db.Column(db.DateTime, nullable=False)
+    recurrence = db.Column(db.String(16))
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    count = db.Column(db.Integer)
+    until = db.Column(db.DateTime)
+    series_end_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        # Window reads: WHERE user_id = ? AND start_at < :end AND (series_end_at > :start OR series_end_at IS NULL)
+        db.Index("ix_events_user_id_start_at_series_end_at", "user_id", "start_at", "series_end_at"),
+    )
+
+    __mapper_args__ = {"eager_defaults": True}
+
+    def occurrences(self, window_start, window_end):
+        for index, start, end in occurrences(
+            self.start_at, self.end_at, self.recurrence, self.interval,
+            window_start, window_end, count=self.count, until=self.until,
+        ):
+            yield {
+                "event_id": self.id,
+                "title": self.title,
+                "description": self.description,
+                "start": start,
+                "end": end,
+                "recurrence": self.recurrence,
+                "occurrence": index,
+            }
+
+    @classmethod
+    async def create_event(cls, params):
+        event = cls(**params)
+        event.interval = event.interval or 1
+        event.series_end_at = series_end(
+            event.start_at, event.end_at, event.recurrence, event.interval, count=event.count, until=event.until)
+        async with db.session() as session:
+            session.add(event)
+            await session.commit()
+        calendar_cache.invalidate(event.user_id)
+        backplane.notify_user(event.user_id, {"type": "notify", "topic": "calendar", "action": "created", "event_id": event.id})
+        return event, 201
+
+    @classmethod
+    async def update_event(cls, event_id, params):
+        async with db.session() as session:
+            event = await session.get(cls, event_id)
+            if event is None:
+                return "Event not found.", 404
+            for name in EVENT_UPDATABLE:
+                if name in params:
+                    setattr(event, name, params[name])
+            if event.end_at <= event.start_at:
+                return "end_at must be after start_at.", 400
+            event.interval = event.interval or 1
+            event.series_end_at = series_end(
+                event.start_at, event.end_at, event.recurrence, event.interval, count=event.count, until=event.until)
+            await session.commit()
+        calendar_cache.invalidate(event.user_id)
+        backplane.notify_user(event.user_id, {"type": "notify", "topic": "calendar", "action": "updated", "event_id": event_id})
+        return event, 200
+
+    @classmethod
+    async def delete_event(cls, event_id):
+        async with db.session() as session:
+            event = await session.get(cls, event_id)
+            if event is None:
+                return "Event not found.", 404
+            await session.delete(event)
+            await session.commit()
+        calendar_cache.invalidate(event.user_id)
+        backplane.notify_user(event.user_id, {"type": "notify", "topic": "calendar", "action": "deleted", "event_id": event_id})
+        return "", 204
+
+    @classmethod
+    async def get_calendar(cls, user_id, params=None):
+        """Occurrences for a day/week/month view around `date`, or for an explicit start/end window."""
+        params = params or {}
+        try:
+            if params.get("start") or params.get("end"):
+                view = "range"
+                window_start = as_naive_utc(datetime.datetime.fromisoformat(params["start"]))
+                window_end = as_naive_utc(datetime.datetime.fromisoformat(params["end"]))
+            else:
+                view = params.get("view", "week")
+                date_str = params.get("date")
+                date = datetime.datetime.strptime(date_str, "%Y-%m-%d") if date_str else \
+                    datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                window_start, window_end = view_window(view, date)
+        except (KeyError, ValueError):
+            return "Use view=day|week|month with date=YYYY-MM-DD, or ISO start and end.", 400
+        if window_end <= window_start or window_end - window_start > MAX_WINDOW:
+            return "The window must be positive and at most 62 days.", 400
+
+        occurrences = await cls.get_occurrences(user_id, window_start, window_end)
+        return {"view": view, "start": window_start, "end": window_end, "occurrences": occurrences}, 200
+
+    @classmethod
+    async def get_occurrences(cls, user_id, window_start, window_end):
+        """Every occurrence overlapping [window_start, window_end), in start order, from one indexed query.
+
+        The current week is cached per user until one of their events changes.
+        """
+        week = calendar_cache.current_week()
+        if week[0] <= window_start and window_end <= week[1]:
+            cached = calendar_cache.get(user_id, week)
+            if cached is None:
+                # Taken before the load: an event changed while it runs makes set() drop this week
+                generation = calendar_cache.generation(user_id)
+                cached = await cls._load_occurrences(user_id, *week)
+                calendar_cache.set(user_id, week, cached, generation)
+            return [item for item in cached if item["start"] < window_end and item["end"] > window_start]
+        return await cls._load_occurrences(user_id, window_start, window_end)
+
+    @classmethod
+    async def _load_occurrences(cls, user_id, window_start, window_end):
+        query = db.select(cls).filter(
+            cls.user_id == user_id,
+            cls.start_at < window_end,
+            db.or_(cls.series_end_at > window_start, cls.series_end_at.is_(None)),
+        )
+        async with db.session() as session:
+            events = (await session.scalars(query)).all()
+        items = [item for event in events for item in event.occurrences(window_start, window_end)]
+        items.sort(key=lambda item: (item["start"], item["event_id"]))
+        return items
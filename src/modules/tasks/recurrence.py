@@ -0,0 +1,95 @@
+import calendar
+import datetime
+
+DAILY = "daily"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+FREQUENCIES = (DAILY, WEEKLY, MONTHLY)
+
+_DAYS = {DAILY: 1, WEEKLY: 7}
+
+
+def as_naive_utc(moment):
+    """Times are stored and compared as naive UTC: convert an aware datetime, take a naive one as UTC already."""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def add_months(moment, months):
+    """Same day and time `months` later, clamped to the last day of shorter months (Jan 31 -> Feb 29)."""
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def nth_start(start, frequency, interval, n):
+    if frequency == MONTHLY:
+        return add_months(start, n * interval)
+    return start + datetime.timedelta(days=_DAYS[frequency] * interval * n)
+
+
+def series_end(start, end, frequency, interval, count=None, until=None):
+    """End of the series' last occurrence, or None if it repeats forever."""
+    if not frequency:
+        return end
+    duration = end - start
+    last = None
+    if count:
+        last = count - 1
+    if until is not None:
+        by_until = _last_index_before(start, frequency, interval, until)
+        last = by_until if last is None else min(last, by_until)
+    if last is None:
+        return None
+    return nth_start(start, frequency, interval, max(last, 0)) + duration
+
+
+def occurrences(start, end, frequency, interval, window_start, window_end, count=None, until=None):
+    """Yield (index, start, end) for each occurrence overlapping [window_start, window_end).
+
+    Jumps straight to the first candidate occurrence, so the cost is the number
+    of occurrences in the window, not the number since the series began.
+    """
+    duration = end - start
+    if not frequency:
+        if start < window_end and end > window_start:
+            yield 0, start, end
+        return
+
+    n = max(0, _first_index_after(start, frequency, interval, window_start - duration))
+    while True:
+        if count and n >= count:
+            return
+        occurrence_start = nth_start(start, frequency, interval, n)
+        if occurrence_start >= window_end or (until is not None and occurrence_start > until):
+            return
+        occurrence_end = occurrence_start + duration
+        if occurrence_end > window_start:
+            yield n, occurrence_start, occurrence_end
+        n += 1
+
+
+def _first_index_after(start, frequency, interval, moment):
+    # Lowest n whose start may be after `moment`; may undershoot by one, never overshoot
+    if moment <= start:
+        return 0
+    if frequency == MONTHLY:
+        months = (moment.year - start.year) * 12 + moment.month - start.month
+        return max(0, months // interval - 1)
+    step = datetime.timedelta(days=_DAYS[frequency] * interval)
+    return (moment - start) // step
+
+
+def _last_index_before(start, frequency, interval, moment):
+    # Highest n whose start is at or before `moment` (-1 if none)
+    if moment < start:
+        return -1
+    if frequency == MONTHLY:
+        n = ((moment.year - start.year) * 12 + moment.month - start.month) // interval
+        while n > 0 and add_months(start, n * interval) > moment:
+            n -= 1
+        return n
+    step = datetime.timedelta(days=_DAYS[frequency] * interval)
+    return (moment - start) // step
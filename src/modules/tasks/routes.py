@@ -0,0 +1,100 @@
+from quart import Blueprint, jsonify, request
+from marshmallow import ValidationError
+from src.modules.tasks.models import Event, Task
+from src.modules.tasks.schemas import dump_event, dump_task, event_schema, event_update_schema, task_schema, task_update_schema
+
+tasks_bp = Blueprint("tasks", __name__)
+events_bp = Blueprint("events", __name__)
+
+@tasks_bp.route("/", methods=["POST"])
+async def create_task():
+    try:
+        params = task_schema.load(await request.get_json())
+        params.pop("completed", None)
+        task, status_code = await Task.create_task(params)
+        return jsonify(dump_task(task)), status_code
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    except Exception as e:
+        return str(e), 500
+
+@tasks_bp.route("/user/<int:user_id>", methods=["GET"])
+async def get_tasks(user_id):
+    try:
+        response, status_code = await Task.get_tasks(user_id, request.args)
+        if status_code != 200:
+            return response, status_code
+        return jsonify({"tasks": [dump_task(task) for task in response]}), status_code
+    except Exception as e:
+        return str(e), 500
+
+@tasks_bp.route("/<int:task_id>", methods=["PATCH"])
+async def update_task(task_id):
+    try:
+        params = task_update_schema.load(await request.get_json())
+        response, status_code = await Task.update_task(task_id, params)
+        if status_code != 200:
+            return response, status_code
+        return jsonify(dump_task(response)), status_code
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    except Exception as e:
+        return str(e), 500
+
+@tasks_bp.route("/<int:task_id>", methods=["DELETE"])
+async def delete_task(task_id):
+    try:
+        return await Task.delete_task(task_id)
+    except Exception as e:
+        return str(e), 500
+
+@events_bp.route("/", methods=["POST"])
+async def create_event():
+    try:
+        params = event_schema.load(await request.get_json())
+        event, status_code = await Event.create_event(params)
+        return jsonify(dump_event(event)), status_code
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    except Exception as e:
+        return str(e), 500
+
+@events_bp.route("/<int:event_id>", methods=["PATCH"])
+async def update_event(event_id):
+    try:
+        params = event_update_schema.load(await request.get_json())
+        response, status_code = await Event.update_event(event_id, params)
+        if status_code != 200:
+            return response, status_code
+        return jsonify(dump_event(response)), status_code
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    except Exception as e:
+        return str(e), 500
+
+@events_bp.route("/<int:event_id>", methods=["DELETE"])
+async def delete_event(event_id):
+    try:
+        return await Event.delete_event(event_id)
+    except Exception as e:
+        return str(e), 500
+
+@events_bp.route("/user/<int:user_id>", methods=["GET"])
+async def get_calendar(user_id):
+    # ?view=day|week|month&date=YYYY-MM-DD, or ?start=...&end=... (ISO datetimes)
+    try:
+        response, status_code = await Event.get_calendar(user_id, request.args)
+        if status_code != 200:
+            return response, status_code
+        occurrences = [
+            {**item, "start": item["start"].isoformat(), "end": item["end"].isoformat()}
+            for item in response["occurrences"]
+        ]
+        return jsonify({
+            "view": response["view"],
+            "start": response["start"].isoformat(),
+            "end": response["end"].isoformat(),
+            "occurrences": occurrences,
+        }), status_code
+    except Exception as e:
+        return str(e), 500
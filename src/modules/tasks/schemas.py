@@ -0,0 +1,46 @@
+from marshmallow import Schema, ValidationError, fields, validate, validates_schema
+from src.modules.tasks.recurrence import FREQUENCIES, as_naive_utc
+from src.utils.serialization import compile_schema
+
+class UTCDateTime(fields.DateTime):
+    """ISO datetime loaded as naive UTC, so "10:00+02:00" is stored as 08:00."""
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        return as_naive_utc(super()._deserialize(value, attr, data, **kwargs))
+
+class TaskSchema(Schema):
+    id = fields.Int(dump_only=True)
+    user_id = fields.Int(required=True)
+    title = fields.Str(required=True, validate=validate.Length(min=1, max=200))
+    description = fields.Str(allow_none=True, validate=validate.Length(max=1000))
+    priority = fields.Int(validate=validate.Range(min=1, max=5))
+    due_at = UTCDateTime(allow_none=True)
+    completed_at = fields.DateTime(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    completed = fields.Bool(load_only=True)
+
+class EventSchema(Schema):
+    id = fields.Int(dump_only=True)
+    user_id = fields.Int(required=True)
+    title = fields.Str(required=True, validate=validate.Length(min=1, max=200))
+    description = fields.Str(allow_none=True, validate=validate.Length(max=1000))
+    start_at = UTCDateTime(required=True)
+    end_at = UTCDateTime(required=True)
+    recurrence = fields.Str(allow_none=True, validate=validate.OneOf(FREQUENCIES))
+    interval = fields.Int(validate=validate.Range(min=1))
+    count = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    until = UTCDateTime(allow_none=True)
+    series_end_at = fields.DateTime(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+
+    @validates_schema
+    def validate_times(self, data, **kwargs):
+        if data.get("start_at") and data.get("end_at") and data["end_at"] <= data["start_at"]:
+            raise ValidationError("end_at must be after start_at.", "end_at")
+
+task_schema = TaskSchema()
+task_update_schema = TaskSchema(partial=True, exclude=("user_id",))
+dump_task = compile_schema(task_schema)
+event_schema = EventSchema()
+event_update_schema = EventSchema(partial=True, exclude=("user_id",))
+dump_event = compile_schema(event_schema)
@@ -1,9 +1,14 @@
+from src.extensions.credentials import credentials
 from src.extensions.db import db
 from src.modules.chats.models import Chat
-from datetime import datetime
 from sqlalchemy.exc import IntegrityError
+import base64
+import binascii
 # import logging
 
+# Columns GET /api/users/ may return; password is never listed
+LISTABLE_FIELDS = ("id", "username", "email", "created_at", "updated_at")
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -12,80 +17,132 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
-    chat_history = db.relationship(Chat, backref="user", lazy="dynamic")
+    chat_history = db.relationship(Chat, backref="user", lazy="raise")
+
+    __mapper_args__ = {"eager_defaults": True}
 
     @classmethod
-    def create_user(cls, data):
+    async def create_user(cls, data):
         new_user = User(
             username=data['username'], 
-            password=data['password'], 
+            password=await credentials.hash(data['password']),
             email=data['email'])
-        db.session.add(new_user)
+        async with db.session() as session:
+            session.add(new_user)
+            try:
+                await session.commit()
+                return new_user, 201
+            except IntegrityError:
+                await session.rollback()
+                return "Username or email already exists.", 400
+
+    @classmethod
+    async def authenticate(cls, data):
+        """Check a username/password pair, upgrading the stored hash if it was made with old parameters."""
+        username = data.get("username") if isinstance(data, dict) else None
+        password = data.get("password") if isinstance(data, dict) else None
+        if not username or not password:
+            return "Username and password are required.", 400
+
+        # No session (and so no pooled connection) is held across the slow hash calls below
+        async with db.session() as session:
+            user = (await session.scalars(db.select(cls).filter_by(username=username))).first()
+        if user is None:
+            await credentials.verify_missing(password)
+            return "Invalid username or password.", 401
+
+        matches, needs_rehash = await credentials.verify(password, user.password)
+        if not matches:
+            return "Invalid username or password.", 401
+        if needs_rehash:
+            stored, rehashed = user.password, await credentials.hash(password)
+            async with db.session() as session:
+                # Only replaces the hash that was verified, never a password changed meanwhile
+                await session.execute(
+                    db.update(cls).where(cls.id == user.id, cls.password == stored).values(password=rehashed))
+                await session.commit()
+            user.password = rehashed
+        return user, 200
+
+    @classmethod
+    async def get_users(cls, params=None):
+        """Return one page of users in id order, loading only the requested columns.
+
+        `fields` is a comma-separated subset of LISTABLE_FIELDS (id is always
+        included); `after` is the cursor from the previous page. Each page is a
+        primary key range scan, so its cost doesn't grow with the table.
+        """
+        params = params or {}
+        max_amount = 100
+
         try:
-            db.session.commit()
-            return new_user, 201
-        except IntegrityError:
-            db.session.rollback()
-            return "Username or email already exists.", 400
+            amount = int(params.get("amount", max_amount))
+            amount = max(1, min(amount, max_amount))
+        except ValueError:
+            amount = max_amount
 
-    @staticmethod
-    def get_all_users():
-        users = User.query.all()
-        if not users:
+        requested = params.get("fields")
+        if requested:
+            names = {name.strip() for name in requested.split(",") if name.strip()}
+            unknown = names - set(LISTABLE_FIELDS)
+            if unknown:
+                return f"Unknown fields: {', '.join(sorted(unknown))}.", 400
+            fields = tuple(name for name in LISTABLE_FIELDS if name in names or name == "id")
+        else:
+            fields = LISTABLE_FIELDS
+
+        try:
+            after = decode_user_cursor(params.get("after"))
+        except ValueError:
+            return "Invalid cursor.", 400
+
+        query = db.select(*(getattr(cls, name) for name in fields))
+        if after is not None:
+            query = query.filter(cls.id > after)
+        # Fetch one extra row to learn whether another page exists without counting
+        query = query.order_by(cls.id.asc()).limit(amount + 1)
+
+        async with db.session() as session:
+            users = (await session.execute(query)).all()
+
+        has_more = len(users) > amount
+        users = users[:amount]
+        if not users and after is None:
             return "No users found.", 404
-        return users, 200
+
+        page = {
+            "users": users,
+            "fields": list(fields),
+            "has_more": has_more,
+            "after": encode_user_cursor(users[-1].id) if users else None,
+        }
+        return page, 200
         
     @staticmethod
-    def get_user_by_name(username):
-        user = User.query.filter_by(username=username).first()
+    async def get_user_by_name(username):
+        async with db.session() as session:
+            user = (await session.scalars(db.select(User).filter_by(username=username))).first()
         if not user:
             return "User not found.", 404
         return user, 200
 
     @staticmethod
-    def get_user_by_id(user_id):
-        user = User.query.get(user_id)
+    async def get_user_by_id(user_id):
+        async with db.session() as session:
+            user = await session.get(User, user_id)
         if not user:
             return "User not found.", 404
         return user, 200
 
-    @classmethod
-    def get_chat_history(cls, user_id, params):
-        user = cls.query.get(user_id)
-        if not user:
-            return "User not found.", 404
 
-        try:
-            date_str = params.get("date")
-            date = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else None
-        except ValueError:
-            return "Error with date. Make sure the date is in the format: YYYY-MM-DD.", 400
+def encode_user_cursor(user_id):
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip("=")
 
-        try:
-            amount = int(params.get("amount", 0))
-            amount = min(amount, 100)  # Limit to 100 messages
-        except ValueError:
-            amount = 100
 
-        query = Chat.query.filter_by(user_id=user_id).order_by(Chat.created_at.desc()).limit(amount)
-
-        if date:
-            query = query.filter(db.func.date(Chat.created_at) == date)
-
-        try:
-            messages = query.all()
-        except IntegrityError as e:
-            # logging.error(f"Database integrity error: {e}")
-            return "Database integrity error.", 500
-        except Exception as e:
-            # logging.error(f"Unexpected error: {e}")
-            return "An unexpected error occurred.", 500
-
-        if not messages:
-            if date:
-                return "No messages found for the given date.", 404
-            else:
-                return "No messages found.", 404
-
-        return messages, 200
-            
\ No newline at end of file
+def decode_user_cursor(token):
+    if not token:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode())
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {token}")
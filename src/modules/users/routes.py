@@ -1,6 +1,6 @@
 from quart import current_app, Blueprint, jsonify, request
 from .models import User
-from .schemas import UserSchema
+from .schemas import user_list_dumper, user_schema
 
 user_bp = Blueprint('user', __name__)
 
@@ -8,8 +8,18 @@ user_bp = Blueprint('user', __name__)
 async def create_user():
     try:
         data = await request.get_json()
-        response, status_code = User.create_user(data)
-        user_schema = UserSchema()
+        response, status_code = await User.create_user(data)
+        return jsonify(user_schema.dump(response)), status_code
+    except Exception as e:
+        return str(e), 500
+
+@user_bp.route("/login", methods=["POST"])
+async def login():
+    try:
+        data = await request.get_json()
+        response, status_code = await User.authenticate(data)
+        if status_code != 200:
+            return response, status_code
         return jsonify(user_schema.dump(response)), status_code
     except Exception as e:
         return str(e), 500
@@ -17,17 +27,18 @@ async def create_user():
 @user_bp.route("/", methods=["GET"])
 async def get_users():
     try:
-        response, status_code = User.get_all_users()
-        user_schema = UserSchema(many=True)
-        return jsonify(user_schema.dump(response)), status_code
+        response, status_code = await User.get_users(request.args)
+        if status_code != 200:
+            return response, status_code
+        dump = user_list_dumper(tuple(response["fields"]))
+        return jsonify({**response, "users": [dump(user) for user in response["users"]]}), status_code
     except Exception as e:
         return str(e), 500
     
 @user_bp.route("/<int:user_id>", methods=["GET"])
 async def get_user_by_id(user_id):
     try:
-        response, status_code = User.get_user_by_id(user_id)
-        user_schema = UserSchema()
+        response, status_code = await User.get_user_by_id(user_id)
         return jsonify(user_schema.dump(response)), status_code
     except Exception as e:
         return str(e), 500
@@ -35,17 +46,7 @@ async def get_user_by_id(user_id):
 @user_bp.route("/<string:username>", methods=["GET"])
 async def get_user_by_name(username):
     try:
-        response, status_code = User.get_user_by_name(username)
-        user_schema = UserSchema()
+        response, status_code = await User.get_user_by_name(username)
         return jsonify(user_schema.dump(response)), status_code
     except Exception as e:
         return str(e), 500
-
-async def get_chat_history(user_id):
-    params = request.args
-    try:
-        response, status_code = User.get_chat_history(user_id, params)
-        chat_schema = ChatSchema(many=True)
-        return jsonify(chat_schema.dump(response)), status_code
-    except Exception as e:
-        return str(e), 500
\ No newline at end of file
@@ -1,9 +1,19 @@
-from flask_marshmallow import Marshmallow
-from .routes import User
+import functools
+from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
+from .models import User
+from src.utils.serialization import compile_schema
 
-ma = Marshmallow()
-
-class UserSchema(ma.SQLAlchemyAutoSchema):
+class UserSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = User
-        load_instance = True
\ No newline at end of file
+        load_instance = True
+        # Accepted on input, never returned
+        load_only = ("password",)
+
+user_schema = UserSchema()
+
+
+@functools.lru_cache(maxsize=32)
+def user_list_dumper(fields):
+    """Compiled dumper for a projection of the user list (fields is a tuple of column names)."""
+    return compile_schema(UserSchema(only=fields))
@@ -1,50 +1,165 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
-import codecs
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import glob
 
-class UTF8Formatter(logging.Formatter):
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from extra=...
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Running QueueListeners, stopped (and so flushed) at interpreter exit
+_listeners = set()
+
+# Handlers already write UTF-8, so records need no encode/decode round trip; kept for existing imports
+UTF8Formatter = logging.Formatter
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, any extra fields and the traceback."""
+
     def format(self, record):
-        return super().format(record).encode('utf-8').decode('utf-8')
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only every Nth record from noisy loggers, e.g. {"src.audio.frames": 100}.
+
+    Rates apply to the named logger and its children; kept records get a
+    ``sampled`` attribute with the rate so readers can scale counts back up.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self.counts = {}
+
+    def filter(self, record):
+        every = self._rate(record.name)
+        if every <= 1:
+            return True
+        count = self.counts.get(record.name, 0)
+        self.counts[record.name] = count + 1
+        if count % every:
+            return False
+        record.sampled = every
+        return True
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Only merge args and render the traceback here (they can't cross threads); formatting happens in the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logger(name, file='app.log', level="INFO", terminal=False, json_format=False,
+                 queued=True, clear=False, sample_rates=None):
+    """Configure logger `name` to write to logs/<file> (and stderr if terminal).
 
-def setup_logger(name, file='app.log', level="INFO", terminal=False):
+    With queued=True the caller only enqueues records; formatting, file writes
+    and rotation run on a QueueListener thread, off the event loop. clear=True
+    deletes the previous log file and its rotations first.
+    """
     # Ensure the logs directory exists
     logs_dir = os.path.join(os.getcwd(), 'logs')
     os.makedirs(logs_dir, exist_ok=True)
-    
-    file_path = os.path.join(logs_dir, file)
 
-    # Clear the log file if it exists
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    file_path = os.path.join(logs_dir, file)
 
-    # Delete any extra log files
-    log_pattern = file_path + '.*'
-    for log_file in glob.glob(log_pattern):
-        os.remove(log_file)
+    if clear:
+        # Clear the log file and any rotated copies
+        for log_file in [file_path, *glob.glob(file_path + '.*')]:
+            if os.path.exists(log_file):
+                os.remove(log_file)
 
-    # Create a formatter for consistent log formatting
-    formatter = UTF8Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    formatter = JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
 
     # File handler for writing logs to a file (with rotation and UTF-8 encoding)
     file_handler = RotatingFileHandler(file_path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8', errors='replace')
     file_handler.setFormatter(formatter)
+    handlers = [file_handler]
 
-    # Create the logger
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.addHandler(file_handler)
-
-    # Console handler for writing logs to the terminal (with UTF-8 encoding)
+    # Console handler for writing logs to the terminal
     if terminal:
         console_handler = logging.StreamHandler(sys.stderr)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    # Create the logger, replacing handlers from an earlier call
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    _remove_handlers(logger)
+
+    if queued:
+        log_queue = queue.SimpleQueue()
+        front = _QueueHandler(log_queue)
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.add(listener)
+        logger._queue_listener = listener
+        handlers = [front]
+
+    for handler in handlers:
+        if sample_rates:
+            handler.addFilter(SamplingFilter(sample_rates))
+        handler._setup_logger = True
+        logger.addHandler(handler)
 
     return logger
 
+
+def _remove_handlers(logger):
+    listener = getattr(logger, '_queue_listener', None)
+    if listener is not None:
+        listener.stop()
+        _listeners.discard(listener)
+        for handler in listener.handlers:
+            handler.close()
+        logger._queue_listener = None
+    for handler in list(logger.handlers):
+        if getattr(handler, '_setup_logger', False):
+            logger.removeHandler(handler)
+            handler.close()
+
+
+@atexit.register
+def _stop_listeners():
+    for listener in list(_listeners):
+        listener.stop()
+    _listeners.clear()
+
+
 # Set console encoding to UTF-8
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -0,0 +1,103 @@
+import asyncio
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it
+    runs wait on the same result. The shared work is only cancelled once every
+    caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if not call.waiters:
+                call.task.cancel()
+            raise
+
+    async def stream(self, key, fn):
+        """Like do(), for async generators: every caller gets the full sequence of items."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _StreamCall()
+            call.task = asyncio.ensure_future(call.pump(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            async for item in call.subscribe():
+                yield item
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamCall:
+    def __init__(self):
+        self.task = None
+        self.waiters = 0
+        self.items = []
+        self.error = None
+        self.finished = False
+        self._changed = asyncio.Condition()
+
+    async def pump(self, source):
+        try:
+            async for item in source:
+                async with self._changed:
+                    self.items.append(item)
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self._changed:
+                self.finished = True
+                self._changed.notify_all()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.items) or self.finished)
+                items = self.items[index:]
+                finished = self.finished
+            for item in items:
+                yield item
+            index += len(items)
+            if finished and index >= len(self.items):
+                if self.error is not None:
+                    raise self.error
+                return
@@ -0,0 +1,76 @@
+import contextlib
+import time
+from collections import deque
+
+
+class LatencyStats:
+    """Rolling latency samples (in seconds) with cheap percentile summaries."""
+
+    def __init__(self, size=1024):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": max(self.samples) if self.samples else 0.0,
+        }
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, stats):
+        self.stats = stats
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(time.perf_counter() - self.start)
+        return False
+
+
+class PhaseTimer:
+    """Wall-clock seconds per named phase, in the order the phases ran."""
+
+    def __init__(self):
+        self.phases = {}
+
+    def record(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def summary(self):
+        return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items()) + f" total={self.total * 1000:.1f}ms"
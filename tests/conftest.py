@@ -0,0 +1,51 @@
+import asyncio
+import os
+
+# Config reads the environment once, when it's first imported
+os.environ.update(
+    OPENAI_FAKE_UPSTREAM="1",
+    OPENAI_FAKE_LATENCY="0",
+    LOG_TERMINAL="0",
+    LOG_QUEUE="0",
+    PASSWORD_SCRYPT_N="1024",
+    BACKPLANE_URL="memory://",
+    COMPLETION_CACHE_BACKEND="none",
+    CHAT_WRITE_BEHIND="0",
+    CHAT_RATE_LIMIT="0",
+)
+
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite file; logs/ and cache/ land in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    from config import Config
+    from src.main import create_app
+
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    return create_app()
+
+
+@pytest.fixture
+def serve(app):
+    """serve(scenario) creates the tables, starts the app and runs `await scenario(client)`."""
+    from src.extensions.db import db
+
+    def run(scenario):
+        async def main():
+            await db.create_all()
+            async with app.test_app() as test_app:
+                return await scenario(test_app.test_client())
+
+        return asyncio.run(main())
+
+    return run
+
+
+async def create_user(client, username="ada"):
+    response = await client.post(
+        "/api/users/", json={"username": username, "password": "correct horse", "email": f"{username}@example.com"})
+    assert response.status_code == 201
+    return (await response.get_json())["id"]
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from src.extensions.ai_client import BACKGROUND, INTERACTIVE, NORMAL, TokenBucket, UpstreamScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_refills_over_time(clock):
+    bucket = TokenBucket(60)
+    bucket.consume(60)
+    assert bucket.delay(1) == pytest.approx(1.0)
+    clock[0] += 0.5
+    assert bucket.delay(1) == pytest.approx(0.5)
+    clock[0] += 30
+    assert bucket.delay(30) == 0.0
+    # Never holds more than a minute's worth
+    clock[0] += 3600
+    bucket.consume(0)
+    assert bucket.level == 60
+    assert TokenBucket(0).delay(10 ** 6) == 0.0
+
+
+def test_an_empty_bucket_admits_waiters_by_priority():
+    async def main():
+        # 100 requests a second, starting empty
+        scheduler = UpstreamScheduler(max_concurrency=4, requests_per_minute=6000)
+        scheduler.requests.level = 0.0
+        admitted = []
+
+        async def call(name, priority):
+            async with scheduler.slot(priority, tokens=0):
+                admitted.append(name)
+
+        await asyncio.gather(call("background", BACKGROUND), call("normal", NORMAL), call("interactive", INTERACTIVE))
+        assert admitted == ["interactive", "normal", "background"]
+        assert scheduler.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiters_give_their_reservation_back():
+    async def main():
+        scheduler = UpstreamScheduler(max_concurrency=1, tokens_per_minute=600)
+        holder = scheduler.slot(NORMAL, tokens=100)
+        await holder.__aenter__()
+
+        # Cancelled while still queued
+        queued = asyncio.create_task(_enter(scheduler, 100))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert scheduler.stats()["queue_depth"] == 0 and scheduler.in_flight == 1
+
+        # Admitted by the release below, but cancelled before it got to run
+        admitted = asyncio.create_task(_enter(scheduler, 100))
+        await asyncio.sleep(0)
+        level = scheduler.tokens.level
+        await holder.__aexit__(None, None, None)
+        admitted.cancel()
+        await asyncio.gather(admitted, return_exceptions=True)
+        assert scheduler.in_flight == 0
+        assert scheduler.tokens.level == pytest.approx(level, abs=1.0)
+
+        # The slot is free for the next caller straight away
+        async with scheduler.slot(NORMAL, tokens=100):
+            assert scheduler.in_flight == 1
+
+    asyncio.run(main())
+
+
+async def _enter(scheduler, tokens):
+    async with scheduler.slot(NORMAL, tokens):
+        await asyncio.sleep(10)
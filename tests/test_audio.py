@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+from quart import Quart
+
+from src.modules.audio.phrase_cache import phrase_cache
+from src.modules.audio.pipeline import AudioPipeline
+
+
+def test_malformed_control_frames_get_an_error_and_keep_the_connection(serve):
+    async def scenario(client):
+        async with client.websocket("/ws/audio") as audio:
+            for frame, error in (('"hello"', "Invalid message format."), ("[1]", "Invalid message format."),
+                                 ("{not json", "Invalid JSON.")):
+                await audio.send(frame)
+                message = await asyncio.wait_for(audio.receive_json(), 2)
+                assert message == {"type": "error", "status": 400, "error": error}
+            # Still open
+            await audio.send('{"type": "stats"}')
+            assert (await asyncio.wait_for(audio.receive_json(), 2))["type"] == "stats"
+            await audio.send('{"type": "close"}')
+
+    serve(scenario)
+
+
+class FrameSource:
+    """Stands in for the websocket: hands out the given frames, then a close."""
+
+    def __init__(self, frames):
+        self.frames = [*frames, '{"type": "close"}']
+
+    async def receive(self):
+        return self.frames.pop(0)
+
+
+def test_speak_frames_beyond_the_limit_are_refused(tmp_path):
+    async def main():
+        app = Quart(__name__)
+        app.config.update(TTS_CACHE_DIR=str(tmp_path), TTS_MAX_AHEAD=2)
+        phrase_cache.init_app(app)
+        sent = []
+
+        async def send_json(message):
+            sent.append(message)
+
+        async def send_bytes(chunk):
+            pass
+
+        async with app.app_context():
+            pipeline = AudioPipeline(app.config, send_json, send_bytes)
+            await pipeline._receive_loop(FrameSource(
+                json.dumps({"type": "speak", "text": f"Reminder number {n} is due."}) for n in range(20)))
+            # Nothing was spoken yet (the speech stage isn't running), so only the first two were taken
+            assert len(pipeline.speaking) == 2
+            assert sent == [{"type": "error", "status": 429, "error": "Too many replies pending."}] * 18
+            speaking = list(pipeline.speaking)
+            for task in speaking:
+                task.cancel()
+            await asyncio.gather(*speaking, return_exceptions=True)
+            await asyncio.sleep(0)  # for the done callbacks
+            assert not pipeline.speaking and not pipeline.reply_slots.locked()
+
+    asyncio.run(main())
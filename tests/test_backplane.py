@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+
+from quart import Quart
+
+from conftest import create_user
+from src.extensions.backplane import Backplane, RedisError, RESPConnection, encode_command, read_reply
+from src.extensions.fake_redis import FakeRedisServer
+
+
+async def start_worker(url):
+    app = Quart(__name__)
+    app.config["BACKPLANE_URL"] = url
+    backplane = Backplane()
+    backplane.init_app(app)
+    await backplane.backend.start(backplane._dispatch)
+    return backplane
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_resp_round_trip():
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"+OK\r\n-ERR nope\r\n:42\r\n$5\r\nhello\r\n$-1\r\n*2\r\n$1\r\na\r\n:1\r\n")
+        reader.feed_eof()
+        replies = [await read_reply(reader) for _ in range(6)]
+        assert replies[0] == b"OK"
+        assert isinstance(replies[1], RedisError) and str(replies[1]) == "ERR nope"
+        assert replies[2:] == [42, b"hello", None, [b"a", 1]]
+
+    assert encode_command("SET", "k", 1) == b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\n1\r\n"
+    asyncio.run(main())
+
+
+def test_redis_fan_out_and_shared_counters():
+    async def main():
+        server = FakeRedisServer()
+        url = f"redis://127.0.0.1:{await server.start()}/0"
+        sender, receiver = await start_worker(url), await start_worker(url)
+        received, dropped = [], []
+        receiver.subscribe("user:7", received.append)
+        notify = sender.invalidation("history", lambda key: dropped.append(("sender", key)))
+        receiver.invalidation("history", lambda key: dropped.append(("receiver", key)))
+        await wait_for(lambda: server.subscribers.get(b"assistant:user:7")
+                       and len(server.subscribers.get(b"assistant:invalidate:history", ())) == 2)
+
+        sender.notify_user(7, {"type": "notify", "n": 1})
+        notify(3)
+        await wait_for(lambda: received and dropped)
+        assert received == [{"type": "notify", "n": 1}]
+        # Only the other worker drops its copy
+        assert dropped == [("receiver", 3)]
+
+        assert [await sender.hit("chat:1", 60) for _ in range(2)] == [1, 2]
+        assert await receiver.hit("chat:1", 60) == 3
+        for backplane in (sender, receiver):
+            await backplane.backend.stop()
+        await server.stop()
+
+    asyncio.run(main())
+
+
+def test_hit_fails_open_and_backs_off_while_redis_is_down(monkeypatch):
+    connects = []
+    monkeypatch.setattr(RESPConnection, "connect", counted(RESPConnection.connect, connects))
+
+    async def main():
+        server = FakeRedisServer()
+        port = await server.start()
+        await server.stop()
+        app = Quart(__name__)
+        app.config["BACKPLANE_URL"] = f"redis://127.0.0.1:{port}/0"
+        app.logger.setLevel(logging.CRITICAL)
+        # Not started: only the command connection (the one hit() uses) connects
+        backplane = Backplane()
+        backplane.init_app(app)
+
+        assert await backplane.hit("chat:1", 60) == 0
+        assert await backplane.hit("chat:1", 60) == 0
+        # The second hit fell inside the cooldown and didn't try to connect again
+        assert len(connects) == 1
+
+        # Once the server is back and the cooldown is over, counting resumes
+        server = FakeRedisServer()
+        await server.start(port=port)
+        backplane.backend._retry_at = 0.0
+        assert await backplane.hit("chat:1", 60) == 1
+        await backplane.backend.stop()
+        await server.stop()
+
+    asyncio.run(main())
+
+
+def counted(method, calls):
+    async def wrapper(self, *args, **kwargs):
+        calls.append(args)
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+def test_execute_waits_for_a_congested_socket():
+    async def main():
+        server = FakeRedisServer()
+        backplane = await start_worker(f"redis://127.0.0.1:{await server.start()}/0")
+        connection = await backplane.backend._command_connection()
+        payload = b"x" * (256 * 1024)
+        replies = []
+        # Nothing has yielded to the loop yet, so once the kernel's socket buffer is full the rest waits in ours
+        while not connection.congested:
+            assert len(replies) < 1000
+            replies.append(connection.send("SET", f"k{len(replies)}", payload))
+        assert await connection.execute("PING") == b"PONG"
+        assert not connection.congested
+        assert await asyncio.gather(*replies) == [b"OK"] * len(replies)
+        await backplane.backend.stop()
+        await server.stop()
+
+    asyncio.run(main())
+
+
+def test_chats_notify_every_socket_of_the_user(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        async with client.websocket(f"/ws/audio?user_id={user_id}") as audio, \
+                client.websocket(f"/ws/chat?user_id={user_id}") as chat_socket:
+            # Let both sockets subscribe before the chat is made
+            await asyncio.sleep(0.05)
+            response = await client.post("/api/chat/", json={"user_id": user_id, "message": "hello"})
+            assert response.status_code == 200
+            chat = await response.get_json()
+            for socket in (audio, chat_socket):
+                message = await asyncio.wait_for(socket.receive_json(), 2)
+                assert message == {"type": "notify", "topic": "chat", "chat": chat}
+
+            # A chat made over the websocket notifies too
+            await chat_socket.send_json({"type": "chat", "request_id": "1", "user_id": user_id, "message": "again"})
+            messages = [await asyncio.wait_for(chat_socket.receive_json(), 2) for _ in range(2)]
+            assert sorted(message["type"] for message in messages) == ["done", "notify"]
+            notify = await asyncio.wait_for(audio.receive_json(), 2)
+            assert notify["chat"]["message"] == "again"
+            await audio.send('{"type": "close"}')
+
+    serve(scenario)
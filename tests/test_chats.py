@@ -0,0 +1,102 @@
+from conftest import create_user
+from src.modules.chats.history import history_cache
+
+
+async def chat(client, user_id, message):
+    response = await client.post("/api/chat/", json={"user_id": user_id, "message": message})
+    assert response.status_code == 200
+    return await response.get_json()
+
+
+async def history(client, user_id, **params):
+    response = await client.get(f"/api/chat/{user_id}/history", query_string=params)
+    assert response.status_code == 200
+    return await response.get_json()
+
+
+def messages(page):
+    return [item["message"] for item in page["messages"]]
+
+
+def test_history_pages_with_before_and_after_cursors(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        # Saved within the same second, so the id alone orders most of them
+        for n in range(1, 6):
+            await chat(client, user_id, f"m{n}")
+
+        first = await history(client, user_id, amount=2)
+        assert messages(first) == ["m5", "m4"] and first["has_more"]
+        second = await history(client, user_id, amount=2, before=first["before"])
+        assert messages(second) == ["m3", "m2"] and second["has_more"]
+        last = await history(client, user_id, amount=2, before=second["before"])
+        assert messages(last) == ["m1"] and not last["has_more"]
+
+        newer = await history(client, user_id, amount=2, after=second["after"])
+        assert messages(newer) == ["m5", "m4"] and not newer["has_more"]
+
+        # Both bounds: the page is taken from the `after` end of the range between them
+        between = await history(client, user_id, amount=2, before=first["after"], after=last["before"])
+        assert messages(between) == ["m3", "m2"] and between["has_more"]
+
+        response = await client.get(f"/api/chat/{user_id}/history", query_string={"before": "not a cursor"})
+        assert response.status_code == 400
+
+    serve(scenario)
+
+
+def test_history_cache_drops_pages_read_across_an_invalidation(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        await chat(client, user_id, "m1")
+        assert messages(await history(client, user_id)) == ["m1"]
+        # The page is cached until the user's next chat
+        assert history_cache.get(user_id, (None, 100, None, None)) is not None
+        await chat(client, user_id, "m2")
+        assert history_cache.get(user_id, (None, 100, None, None)) is None
+        assert messages(await history(client, user_id)) == ["m2", "m1"]
+
+        # A page read before an invalidation (a chat saved while the query ran) isn't stored
+        generation = history_cache.generation(user_id)
+        history_cache.invalidate(user_id)
+        history_cache.set(user_id, "stale", {"messages": []}, generation)
+        assert history_cache.get(user_id, "stale") is None
+        history_cache.set(user_id, "fresh", {"messages": []}, history_cache.generation(user_id))
+        assert history_cache.get(user_id, "fresh") is not None
+
+    serve(scenario)
+
+
+def test_search_pages_by_score_within_the_user(serve):
+    async def scenario(client):
+        user_id, other_id = await create_user(client), await create_user(client, "grace")
+        for n in range(5):
+            await chat(client, user_id, f"dentist appointment {n}")
+        await chat(client, user_id, "groceries")
+        await chat(client, other_id, "dentist appointment elsewhere")
+
+        found, after = [], None
+        while True:
+            params = {"q": "Dentist", "amount": 2, **({"after": after} if after else {})}
+            response = await client.get(f"/api/chat/{user_id}/search", query_string=params)
+            assert response.status_code == 200
+            page = await response.get_json()
+            found += messages(page)
+            if not page["has_more"]:
+                assert page["after"] is None
+                break
+            after = page["after"]
+        # Every match once, none of the other user's
+        assert sorted(found) == [f"dentist appointment {n}" for n in range(5)]
+
+        response = await client.get(f"/api/chat/{user_id}/search", query_string={"q": "dentist groceries"})
+        assert messages(await response.get_json()) == []
+        # FTS5 syntax in the query is searched for as words, never parsed
+        response = await client.get(f"/api/chat/{user_id}/search", query_string={"q": 'dentist" OR "groceries*'})
+        assert response.status_code == 200 and messages(await response.get_json()) == []
+        response = await client.get(f"/api/chat/{user_id}/search", query_string={"q": '" *'})
+        assert response.status_code == 400
+        response = await client.get(f"/api/chat/{user_id}/search", query_string={"q": "dentist", "after": "bm90IGEgY3Vyc29y"})
+        assert response.status_code == 400
+
+    serve(scenario)
@@ -0,0 +1,105 @@
+from quart import Quart
+
+from conftest import create_user
+from src.extensions.completion_cache import CompletionCache, SemanticBackend, completion_cache, normalize_prompt
+
+FIRST = [
+    {"role": "user", "content": "Can you move my dentist appointment?"},
+    {"role": "assistant", "content": "Should I move it to Friday?"},
+]
+SECOND = [
+    {"role": "user", "content": "Anything tonight?"},
+    {"role": "assistant", "content": "Gym at seven. Should I cancel it?"},
+]
+
+
+def make_cache(backend, scope="user", size=16):
+    app = Quart(__name__)
+    app.config.update(COMPLETION_CACHE_BACKEND=backend, COMPLETION_CACHE_SCOPE=scope, COMPLETION_CACHE_SIZE=size)
+    cache = CompletionCache()
+    cache.init_app(app)
+    return cache
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("What's on my  schedule, today?") == "whats on my schedule today"
+
+
+def test_disabled_by_default():
+    cache = make_cache("none")
+    cache.set(1, "yes", "Done.", FIRST)
+    assert cache.get(1, "yes", FIRST) is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_replies_are_keyed_by_user_and_prompt():
+    for backend in ("exact", "semantic"):
+        cache = make_cache(backend)
+        cache.set(1, "What's on my schedule today?", "Two meetings.", FIRST)
+        # A standalone prompt hits whatever was said before it, so repeating a command is answered from cache
+        assert cache.get(1, "whats on my schedule today", SECOND) == "Two meetings."
+        assert cache.get(2, "whats on my schedule today", FIRST) is None
+        assert cache.stats()["hits"]["exact"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_short_follow_ups_are_keyed_by_the_question_they_answer():
+    for backend in ("exact", "semantic"):
+        cache = make_cache(backend)
+        cache.set(1, "Yes", "Moved it to Friday.", FIRST)
+        # Earlier turns don't matter, only the last assistant one
+        assert cache.get(1, "yes!", [{"role": "user", "content": "Hi"}, *FIRST]) == "Moved it to Friday."
+        assert cache.get(1, "yes", SECOND) is None
+        assert cache.get(1, "yes") is None
+
+
+def test_shared_scope():
+    cache = make_cache("exact", scope="global")
+    cache.set(1, "What can you do for me?", "I manage tasks and events.")
+    assert cache.get(2, "what can you do for me", FIRST) == "I manage tasks and events."
+
+
+def test_semantic_matches_rewordings_within_the_same_scope_only():
+    cache = make_cache("semantic")
+    cache.set(1, "what is on my schedule today", "Two meetings.", FIRST)
+    assert cache.get(1, "what is on my schedule for today", SECOND) == "Two meetings."
+    assert cache.stats()["hits"]["semantic"] == 1
+    assert cache.get(2, "what is on my schedule for today", FIRST) is None
+
+
+def test_semantic_scope_ids_are_released_with_their_last_slot():
+    backend = SemanticBackend(maxsize=2, ttl=0)
+    backend.set("a", "one", "1")
+    backend.set("a", "two", "2")
+    backend.set("b", "three", "3")
+    assert set(backend.scope_ids) == {"a", "b"} and backend.scope_ids["a"][1] == 1
+    backend.set("b", "four", "4")
+    # Scope "a" lost its last slot; a new scope never reuses a live scope's id
+    assert set(backend.scope_ids) == {"b"}
+    backend.set("c", "five", "5")
+    assert backend.scope_ids["c"][0] != backend.scope_ids["b"][0]
+    assert backend.get("a", "two") == (None, None)
+    assert backend.get("b", "four") == ("4", "exact")
+
+
+def test_a_repeated_prompt_is_answered_from_the_cache(app, serve):
+    app.config["COMPLETION_CACHE_BACKEND"] = "semantic"
+    completion_cache.init_app(app)
+
+    async def scenario(client):
+        user_id = await create_user(client)
+        before = completion_cache.stats()
+        replies = []
+        for _ in range(2):
+            response = await client.post("/api/chat/", json={"user_id": user_id, "message": "What's on my schedule today?"})
+            assert response.status_code == 200
+            replies.append((await response.get_json())["response"])
+        assert replies[0] == replies[1]
+        after = completion_cache.stats()
+        assert after["hits"]["exact"] - before["hits"]["exact"] == 1
+        assert after["misses"] - before["misses"] == 1
+
+    try:
+        serve(scenario)
+    finally:
+        app.config["COMPLETION_CACHE_BACKEND"] = "none"
+        completion_cache.init_app(app)
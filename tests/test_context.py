@@ -0,0 +1,56 @@
+from conftest import create_user
+from src.modules.chats.context import ConversationContext, chat_context
+from src.modules.chats.history import history_cache
+
+
+class WordCounter:
+    def count(self, text):
+        return len(text.split()) if text else 0
+
+
+def contents(messages):
+    return [message["content"] for message in messages]
+
+
+def test_turns_over_the_budget_are_summarized():
+    # Each turn costs 10 tokens (two words + 8); each summary line 6
+    context = ConversationContext(budget=35, summary_budget=100, counter=WordCounter())
+    for n in range(3):
+        context.append(f"q{n}", f"a{n}")
+    assert context.summary_tokens == 0 and len(context.turns) == 3
+
+    context.append("q3", "a3")
+    assert [turn[0] for turn in context.turns] == ["q2", "q3"]
+    messages = context.messages("next")
+    assert messages[0]["role"] == "system" and "q0" in messages[0]["content"] and "q1" in messages[0]["content"]
+    assert contents(messages[1:]) == ["q2", "a2", "q3", "a3", "next"]
+
+
+def test_a_long_message_leaves_out_the_oldest_turns():
+    context = ConversationContext(budget=40, summary_budget=0, counter=WordCounter())
+    for n in range(3):
+        context.append(f"q{n}", f"a{n}")
+    assert contents(context.messages("short")) == ["q0", "a0", "q1", "a1", "q2", "a2", "short"]
+    long_message = " ".join(["word"] * 15)
+    assert contents(context.messages(long_message)) == ["q1", "a1", "q2", "a2", long_message]
+    # Left out of this prompt only, not dropped
+    assert len(context.turns) == 3
+
+
+def test_context_is_loaded_from_the_database_and_kept_current(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        for message in ("first", "second"):
+            await client.post("/api/chat/", json={"user_id": user_id, "message": message})
+        chat_context.contexts.pop(user_id)
+        history_cache.invalidate(user_id)
+
+        messages = await chat_context.build(user_id, "third")
+        assert contents(messages) == ["first", "Echo: first", "second", "Echo: second", "third"]
+        # Loading the context doesn't go through (or fill) the history cache
+        assert history_cache.users.get(user_id) is None
+
+        await client.post("/api/chat/", json={"user_id": user_id, "message": "third"})
+        assert contents(await chat_context.build(user_id, "fourth"))[-3:] == ["third", "Echo: third", "fourth"]
+
+    serve(scenario)
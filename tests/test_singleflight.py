@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from src.utils.singleflight import SingleFlight
+
+
+class Upstream:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def complete(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return f"reply {self.calls}"
+
+    async def stream(self):
+        self.calls += 1
+        for part in ("Hel", "lo"):
+            await self.release.wait()
+            yield part
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    async def main():
+        flight, upstream = SingleFlight(), Upstream()
+        calls = [asyncio.create_task(flight.do("prompt", upstream.complete)) for _ in range(5)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        assert await asyncio.gather(*calls) == ["reply 1"] * 5
+        assert upstream.calls == 1 and (flight.started, flight.coalesced) == (1, 4)
+        # Done calls are forgotten: the next one goes upstream again
+        assert await flight.do("prompt", upstream.complete) == "reply 2"
+
+    asyncio.run(main())
+
+
+def test_an_error_reaches_every_waiter_and_the_next_call_retries():
+    async def main():
+        flight, upstream = SingleFlight(), Upstream(fail=True)
+        calls = [asyncio.create_task(flight.do("prompt", upstream.complete)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert upstream.calls == 1
+        assert "prompt" not in flight._calls
+
+        upstream.fail = False
+        assert await flight.do("prompt", upstream.complete) == "reply 2"
+
+    asyncio.run(main())
+
+
+def test_one_cancelled_waiter_doesnt_cancel_the_shared_call():
+    async def main():
+        flight, upstream = SingleFlight(), Upstream()
+        first = asyncio.create_task(flight.do("prompt", upstream.complete))
+        second = asyncio.create_task(flight.do("prompt", upstream.complete))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        assert await second == "reply 1"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
+
+
+def test_streams_are_shared_item_by_item():
+    async def main():
+        flight, upstream = SingleFlight(), Upstream()
+
+        async def read():
+            return [part async for part in flight.stream("prompt", upstream.stream)]
+
+        readers = [asyncio.create_task(read()) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        assert await asyncio.gather(*readers) == [["Hel", "lo"]] * 3
+        assert upstream.calls == 1
+
+    asyncio.run(main())
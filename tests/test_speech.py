@@ -0,0 +1,127 @@
+import asyncio
+import mmap
+import os
+import warnings
+
+import numpy as np
+import pytest
+from quart import Quart
+
+from src.modules.audio.phrase_cache import PhraseCache, phrase_cache
+from src.modules.audio.processing import encode_audio, mulaw_encode, synthesize_tones
+from src.modules.audio.speech import SentenceSplitter, SpeechOutput
+
+
+def test_splitter_emits_complete_sentences_only():
+    splitter = SentenceSplitter(min_chars=12, max_chars=240)
+    assert splitter.feed("Sure, I've added that") == []
+    assert splitter.feed(" to your calendar. Okay") == ["Sure, I've added that to your calendar."]
+    assert splitter.feed("?\n") == []  # too short on its own: held for the next sentence
+    assert splitter.feed("I can also remind you. ") == ["Okay?\nI can also remind you."]
+    assert splitter.flush() == ""
+
+
+def test_splitter_cuts_run_on_text_at_a_space():
+    splitter = SentenceSplitter(min_chars=12, max_chars=20)
+    sentences = splitter.feed("one two three four five six seven eight")
+    assert sentences == ["one two three four", "five six seven"]
+    assert all(len(sentence) <= 20 for sentence in sentences)
+    assert splitter.flush() == "eight"
+
+
+def test_mulaw_matches_the_reference_encoder():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        audioop = pytest.importorskip("audioop")
+    samples = np.arange(-32768, 32768, dtype=np.int32).astype("<i2")
+    assert mulaw_encode(samples).tobytes() == audioop.lin2ulaw(samples.tobytes(), 2)
+
+
+def test_encode_audio():
+    pcm = synthesize_tones("Done.", 8000)
+    assert encode_audio(pcm, "pcm16") == pcm
+    assert len(encode_audio(pcm, "mulaw")) == len(pcm) // 2
+    with pytest.raises(ValueError):
+        encode_audio(pcm, "opus")
+
+
+def make_cache(directory, max_bytes=1024):
+    app = Quart(__name__)
+    app.config.update(TTS_CACHE_DIR=str(directory), TTS_CACHE_MAX_BYTES=max_bytes)
+    cache = PhraseCache()
+    cache.init_app(app)
+    return cache
+
+
+async def stored(cache, key, audio):
+    cache.store(key, audio)
+    while not os.path.exists(cache._path(key)):
+        await asyncio.sleep(0.005)
+    # The rename lands before the index update; wait for that too
+    while key not in (cache.index or {}):
+        await asyncio.sleep(0.005)
+
+
+def test_phrase_cache_round_trip_and_eviction(tmp_path):
+    async def main():
+        cache = make_cache(tmp_path, max_bytes=1000)
+        first = cache.key("Done.", "stub:default", 16000, "mulaw")
+        assert first == cache.key("  Done. ", "stub:default", 16000, "mulaw")
+        assert await cache.open(first) is None
+
+        await stored(cache, first, b"a" * 600)
+        audio = await cache.open(first)
+        assert isinstance(audio, mmap.mmap) and audio[:3] == b"aaa"
+        audio.close()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        second = cache.key("Sure.", "stub:default", 16000, "mulaw")
+        await stored(cache, second, b"b" * 600)
+        # Over max_bytes: the least recently used phrase went
+        assert await cache.open(first) is None
+        assert not os.path.exists(cache._path(first))
+        assert cache.total_bytes == 600
+
+        # A fresh cache (another worker, or a restart) finds what's on disk
+        other = make_cache(tmp_path, max_bytes=1000)
+        audio = await other.open(second)
+        assert len(audio) == 600
+        audio.close()
+
+    asyncio.run(main())
+
+
+def test_discard_cancels_queued_sentences_and_closes_their_audio(tmp_path):
+    async def main():
+        app = Quart(__name__)
+        app.config.update(TTS_CACHE_DIR=str(tmp_path), TTS_MAX_AHEAD=4)
+        phrase_cache.init_app(app)
+        sent = []
+
+        async def send_json(message):
+            sent.append(message)
+
+        async def send_bytes(chunk):
+            sent.append(chunk)
+
+        speech = SpeechOutput(app.config, send_json, send_bytes)
+        text = "Sure, I've added that to your calendar."
+        await stored(phrase_cache, phrase_cache.key(text, speech.voice, speech.sample_rate, speech.encoding), b"x" * 64)
+
+        await speech.feed(text + " ")
+        await speech.feed("This one is still being synthesized. ")
+        items = [speech.queue.get_nowait() for _ in range(2)]
+        for item in items:
+            speech.queue.put_nowait(item)
+        (_, cached), (_, pending) = items
+        audio, was_cached = await cached
+        assert was_cached and not audio.closed
+
+        speech.discard()
+        await asyncio.gather(pending, return_exceptions=True)
+        assert speech.queue.empty()
+        assert audio.closed
+        assert pending.cancelled() or pending.result()[0] is not None
+        assert sent == []
+
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+import datetime
+
+from conftest import create_user
+from src.modules.tasks.calendar import calendar_cache
+from src.modules.tasks.models import Event
+from src.modules.tasks.recurrence import add_months, as_naive_utc, occurrences, series_end
+
+
+def at(*args):
+    return datetime.datetime(*args)
+
+
+def test_add_months_clamps_to_month_end():
+    assert add_months(at(2024, 1, 31, 9), 1) == at(2024, 2, 29, 9)
+    assert add_months(at(2024, 11, 30), 3) == at(2025, 2, 28)
+
+
+def test_occurrences_only_expand_the_window():
+    start, end = at(2020, 1, 6, 9), at(2020, 1, 6, 10)
+    found = list(occurrences(start, end, "weekly", 1, at(2026, 10, 12), at(2026, 10, 26)))
+    assert [(o_start, o_end) for _, o_start, o_end in found] == [
+        (at(2026, 10, 12, 9), at(2026, 10, 12, 10)),
+        (at(2026, 10, 19, 9), at(2026, 10, 19, 10)),
+    ]
+    # Indexes count from the first occurrence, not from the window
+    assert found[0][0] == (at(2026, 10, 12) - at(2020, 1, 6)).days // 7
+
+
+def test_occurrences_respect_count_and_until():
+    start, end = at(2026, 1, 1, 9), at(2026, 1, 1, 10)
+    window = at(2026, 1, 1), at(2026, 2, 1)
+    assert len(list(occurrences(start, end, "daily", 1, *window, count=3))) == 3
+    assert len(list(occurrences(start, end, "daily", 2, *window, until=at(2026, 1, 9, 9)))) == 5
+
+
+def test_series_end():
+    start, end = at(2026, 1, 31, 9), at(2026, 1, 31, 10)
+    assert series_end(start, end, None, 1) == end
+    assert series_end(start, end, "monthly", 1, count=2) == at(2026, 2, 28, 10)
+    assert series_end(start, end, "daily", 1, until=at(2026, 2, 2, 8)) == at(2026, 2, 1, 10)
+    assert series_end(start, end, "weekly", 1) is None
+
+
+def test_as_naive_utc():
+    plus_two = datetime.timezone(datetime.timedelta(hours=2))
+    assert as_naive_utc(datetime.datetime(2026, 10, 19, 10, tzinfo=plus_two)) == at(2026, 10, 19, 8)
+    assert as_naive_utc(at(2026, 10, 19, 10)) == at(2026, 10, 19, 10)
+    assert as_naive_utc(None) is None
+
+
+def test_event_times_with_offsets_are_stored_as_utc(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        response = await client.post("/api/events/", json={
+            "user_id": user_id, "title": "Standup",
+            "start_at": "2026-10-19T10:00:00+02:00", "end_at": "2026-10-19T10:15:00+02:00",
+            "recurrence": "daily", "until": "2026-10-21T10:00:00+02:00",
+        })
+        assert response.status_code == 201
+        event = await response.get_json()
+        assert event["start_at"] == "2026-10-19T08:00:00"
+        assert event["end_at"] == "2026-10-19T08:15:00"
+        assert event["until"] == "2026-10-21T08:00:00"
+        assert event["series_end_at"] == "2026-10-21T08:15:00"
+
+        response = await client.post("/api/tasks/", json={"user_id": user_id, "title": "Call", "due_at": "2026-10-19T09:30:00-04:00"})
+        assert (await response.get_json())["due_at"] == "2026-10-19T13:30:00"
+
+    serve(scenario)
+
+
+def test_calendar_window_with_offsets(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        await client.post("/api/events/", json={
+            "user_id": user_id, "title": "Standup",
+            "start_at": "2026-10-19T08:00:00", "end_at": "2026-10-19T08:15:00", "recurrence": "daily", "count": 5,
+        })
+        # 09:00+02:00 is 07:00 UTC: the first standup (08:00 UTC) falls inside a two hour window
+        response = await client.get(f"/api/events/user/{user_id}", query_string={
+            "start": "2026-10-19T09:00:00+02:00", "end": "2026-10-19T11:00:00+02:00"})
+        assert response.status_code == 200
+        body = await response.get_json()
+        assert body["start"] == "2026-10-19T07:00:00"
+        assert [item["start"] for item in body["occurrences"]] == ["2026-10-19T08:00:00"]
+
+        response = await client.get(f"/api/events/user/{user_id}", query_string={
+            "start": "2026-10-19T00:00:00Z", "end": "2026-10-22T00:00:00Z"})
+        assert response.status_code == 200
+        assert len((await response.get_json())["occurrences"]) == 3
+
+    serve(scenario)
+
+
+def test_update_event_recomputes_the_series(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        response = await client.post("/api/events/", json={
+            "user_id": user_id, "title": "Gym",
+            "start_at": "2026-10-19T18:00:00", "end_at": "2026-10-19T19:00:00", "recurrence": "daily", "count": 2,
+        })
+        event_id = (await response.get_json())["id"]
+
+        response = await client.patch(f"/api/events/{event_id}", json={"count": 4, "user_id": 99})
+        assert response.status_code == 400  # user_id isn't an updatable field
+        response = await client.patch(f"/api/events/{event_id}", json={"count": 4})
+        assert response.status_code == 200
+        event = await response.get_json()
+        assert event["series_end_at"] == "2026-10-22T19:00:00"
+        assert event["user_id"] == user_id
+
+        response = await client.patch(f"/api/events/{event_id}", json={"end_at": "2026-10-19T17:00:00"})
+        assert response.status_code == 400
+
+    serve(scenario)
+
+
+def test_task_routes(serve):
+    async def scenario(client):
+        user_id = await create_user(client)
+        for title, priority in (("later", 4), ("now", 1)):
+            await client.post("/api/tasks/", json={"user_id": user_id, "title": title, "priority": priority})
+
+        response = await client.get(f"/api/tasks/user/{user_id}")
+        tasks = (await response.get_json())["tasks"]
+        assert [task["title"] for task in tasks] == ["now", "later"]
+
+        response = await client.patch(f"/api/tasks/{tasks[0]['id']}", json={"completed": True})
+        assert response.status_code == 200
+        assert (await response.get_json())["completed_at"] is not None
+
+        response = await client.get(f"/api/tasks/user/{user_id}")
+        assert [task["title"] for task in (await response.get_json())["tasks"]] == ["later"]
+        response = await client.delete(f"/api/tasks/{tasks[1]['id']}")
+        assert response.status_code == 204
+
+    serve(scenario)
+
+
+def test_a_week_loaded_across_an_invalidation_isnt_cached(serve, monkeypatch):
+    load = Event._load_occurrences.__func__
+
+    async def load_then_change(cls, user_id, *window):
+        items = await load(cls, user_id, *window)
+        # An event created while the week was being read
+        calendar_cache.invalidate(user_id)
+        return items
+
+    async def scenario(client):
+        user_id = await create_user(client)
+        week_start, _ = calendar_cache.current_week()
+        await client.post("/api/events/", json={
+            "user_id": user_id, "title": "Standup", "start_at": week_start.isoformat(),
+            "end_at": (week_start + datetime.timedelta(minutes=15)).isoformat()})
+
+        with monkeypatch.context() as patch:
+            patch.setattr(Event, "_load_occurrences", classmethod(load_then_change))
+            response = await client.get(f"/api/events/user/{user_id}", query_string={"view": "week"})
+            assert len((await response.get_json())["occurrences"]) == 1
+        assert calendar_cache.get(user_id, calendar_cache.current_week()) is None
+
+        await client.get(f"/api/events/user/{user_id}", query_string={"view": "week"})
+        assert len(calendar_cache.get(user_id, calendar_cache.current_week())) == 1
+
+    serve(scenario)
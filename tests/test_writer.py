@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+
+import pytest
+
+from conftest import create_user
+from src.modules.chats.models import Chat
+from src.modules.chats.writer import chat_writer
+
+
+@pytest.fixture
+def write_behind(app):
+    app.config.update(CHAT_WRITE_BEHIND=True, CHAT_WRITE_FLUSH_INTERVAL=0.01)
+    chat_writer.init_app(app, Chat)
+    chat_writer.rows_written = chat_writer.batches = chat_writer.fallbacks = 0
+    yield chat_writer
+    chat_writer.enabled = False
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def test_batched_chats_come_back_with_their_ids(serve, write_behind):
+    async def scenario(client):
+        user_id = await create_user(client)
+        responses = await asyncio.gather(*(
+            client.post("/api/chat/", json={"user_id": user_id, "message": f"m{n}"}) for n in range(20)))
+        chats = [await response.get_json() for response in responses]
+        assert all(response.status_code == 200 for response in responses)
+        assert len({chat["id"] for chat in chats}) == 20 and None not in {chat["id"] for chat in chats}
+        assert write_behind.stats()["rows_written"] == 20
+        assert write_behind.stats()["batches"] < 20
+
+        response = await client.get(f"/api/chat/{user_id}/history")
+        assert len((await response.get_json())["messages"]) == 20
+
+    serve(scenario)
+
+
+def test_a_failed_row_fails_only_its_own_chat(serve, write_behind):
+    async def scenario(client):
+        user_id = await create_user(client)
+        good = Chat(user_id=user_id, message="hello", response="hi", created_at=now())
+        bad = Chat(user_id=user_id, message=None, response="hi", created_at=now())
+        written = [write_behind.submit(good), write_behind.submit(bad)]
+        results = await asyncio.gather(*written, return_exceptions=True)
+        assert results[0] is None and good.id is not None
+        assert isinstance(results[1], Exception)
+        assert write_behind.stats()["rows_written"] == 1
+
+    serve(scenario)
+
+
+def test_chats_are_saved_directly_once_the_writer_is_gone(serve, write_behind):
+    async def scenario(client):
+        user_id = await create_user(client)
+        write_behind._task.cancel()
+        await asyncio.sleep(0)
+        assert write_behind.submit(Chat(user_id=user_id, message="lost?", created_at=now())) is None
+
+        response = await client.post("/api/chat/", json={"user_id": user_id, "message": "hello"})
+        assert response.status_code == 200
+        assert (await response.get_json())["id"] is not None
+        # Shutdown (when scenario returns) doesn't trip over the dead task
+
+    serve(scenario)